@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+bench.py
+
+Time and measure the memory of parsing, analysing and rendering universes,
+and compare the results with a stored baseline.
+
+    python benchmarks/bench.py                     # bundled universes
+    python benchmarks/bench.py --save              # record a new baseline
+    python benchmarks/bench.py --repeat 3 big.unv  # exit 1 on regressions
+    python benchmarks/bench.py --scale             # growth of each stage
+    python benchmarks/bench.py --startup           # command line start-up
+
+Every Reader stage (find_content_offsets, each section reader and each
+analysis pass) is timed through ReaderStats; Manifest.save and CsvWriter
+are timed on their own. After one warm-up run (which compiles the manifest
+template), times are the best of the repeats, as with timeit. Peak memory
+is measured with tracemalloc in a separate run, since tracing slows
+everything down.
+
+--scale parses synthetic universes (pyunv.generator) of 1, 2, 4 and 8
+times a base size, up to 10,000 tables and 100,000 objects, and reports
+how fast each stage grows: an exponent of 1 is linear time. Cyclic
+garbage collection is switched off while scaling, since its pauses depend
+on everything else on the heap.
+
+--startup times fresh interpreters running docunv --help and importing
+pyunv.reader, and lists the modules they import (with -X importtime)
+that should only be loaded when they are used, such as Mako and
+ElementTree.
+"""
+
+import gc
+import getopt
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.csvwriter import CsvWriter
+from pyunv.generator import UniverseGenerator
+from pyunv.manifest import Manifest
+from pyunv.reader import Reader
+from pyunv.stats import ReaderStats
+
+
+UNIVERSES = os.path.join(os.path.dirname(__file__), '..', 'tests',
+    'universes')
+BUNDLED = ['eFashion.unv', 'universe_xir2.unv', 'Univers5.unv']
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# the synthetic universe at scale 1; scale 8 has 10,000 tables and
+# 100,000 objects
+SCALE = {'tables': 1250, 'columns': 5, 'joins': 1500, 'contexts': 10,
+    'classes': 250, 'objects': 12500, 'conditions': 1250}
+SCALE_FACTORS = (1, 2, 4, 8)
+# stages growing faster than this exponent are reported as superlinear
+# (stages under 10 ms at the largest scale are too noisy to judge)
+SUPERLINEAR = 1.25
+MIN_SCALED = 0.010
+
+# a stage only counts as slower when it is both threshold (relative) and
+# min_delta (absolute) slower, so microsecond stages do not flap
+THRESHOLD = 0.25
+MIN_DELTA = 0.0005
+MEMORY_THRESHOLD = 0.10
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# the commands timed by --startup, run by a fresh interpreter in ROOT
+STARTUP = [
+    ('docunv --help', [os.path.join(ROOT, 'docunv.py'), '--help']),
+    ('import pyunv.reader', ['-c', 'import pyunv.reader']),
+]
+# modules (and their submodules) that a command should not import before
+# it needs them
+DEFERRED = ('mako', 'xml.etree', 'concurrent.futures', 'pdb', 'unittest')
+
+
+def _render(universe, render):
+    f = io.StringIO()
+    started = time.perf_counter()
+    if render == 'manifest':
+        Manifest(universe).save(f)
+    else:
+        CsvWriter(universe, f)
+    return time.perf_counter() - started
+
+
+def time_universe(data, repeat=10):
+    """Return {stage: best seconds} for one universe, including the
+    manifest and csv renderers"""
+    samples = {}
+    for render in ('manifest', 'csv'):
+        _render(Reader(data).universe, render)
+    for i in range(repeat):
+        stats = ReaderStats()
+        universe = Reader(data, stats=stats).universe
+        for stage in stats:
+            samples.setdefault(stage.name, []).append(stage.seconds)
+        samples.setdefault('total', []).append(stats.total_seconds)
+        for render in ('manifest', 'csv'):
+            samples.setdefault(render, []).append(_render(universe, render))
+    return dict((name, min(values))
+        for name, values in samples.items())
+
+
+def measure_memory(data):
+    """Return the tracemalloc peak, in bytes, of parsing and rendering"""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        universe = Reader(data).universe
+        peaks['parse'] = tracemalloc.get_traced_memory()[1]
+        for render in ('manifest', 'csv'):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            _render(universe, render)
+            peaks[render] = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def run(paths, repeat=10):
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'universes': {},
+    }
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        results['universes'][os.path.basename(path)] = {
+            'size': len(data),
+            'seconds': time_universe(data, repeat),
+            'memory': measure_memory(data),
+        }
+    return results
+
+
+def scaling(factors=SCALE_FACTORS, repeat=2, base=SCALE):
+    """Return {'factors': [...], 'sizes': [...], 'seconds': {stage:
+    [best seconds at each factor]}} over synthetic universes"""
+    result = {'factors': list(factors), 'sizes': [], 'seconds': {}}
+    for factor in factors:
+        kwargs = dict((name, count * factor) for name, count in base.items()
+            if name not in ('columns', 'contexts'))
+        kwargs.update(columns=base['columns'], contexts=base['contexts'])
+        data = UniverseGenerator(**kwargs).tobytes()
+        result['sizes'].append(len(data))
+        gc.collect()
+        gc.disable()
+        try:
+            seconds = time_universe(data, repeat)
+        finally:
+            gc.enable()
+        for stage, value in seconds.items():
+            result['seconds'].setdefault(stage, []).append(value)
+    return result
+
+
+def growth(seconds, factors):
+    """Return the exponent k of seconds ~ factor ** k, fitted by least
+    squares over every scale"""
+    points = [(math.log(f), math.log(t)) for f, t in zip(factors, seconds)
+        if t > 0]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, y in points)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def report_scaling(result, out=sys.stdout):
+    """Print the time of every stage at each scale; returns the stages that
+    grew faster than linear time"""
+    factors = result['factors']
+    print('%-52s %s  growth' % ('scale', ' '.join('%9dx' % f
+        for f in factors)), file=out)
+    print('%-52s %s' % ('file size (MB)', ' '.join('%10.1f' % (size / 1e6)
+        for size in result['sizes'])), file=out)
+    superlinear = []
+    for stage, seconds in sorted(result['seconds'].items(),
+            key=lambda item: -item[1][-1]):
+        exponent = growth(seconds, factors)
+        flag = ''
+        if exponent > SUPERLINEAR and seconds[-1] > MIN_SCALED:
+            superlinear.append(stage)
+            flag = '  SUPERLINEAR'
+        print('%-52s %s %7.2f%s' % (stage, ' '.join('%10.1f' % (s * 1000)
+            for s in seconds), exponent, flag), file=out)
+    return superlinear
+
+
+def imported_modules(args):
+    """Return {module: cumulative microseconds} for the modules a fresh
+    interpreter imports to run args"""
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    modules = {}
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            self_us, cumulative, name = line[12:].split('|')
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def startup(repeat=10):
+    """Return {command: {'seconds': best wall time, 'modules': number of
+    modules imported, 'deferred': DEFERRED modules imported}} for the
+    STARTUP commands"""
+    results = {}
+    for name, args in STARTUP:
+        command = [sys.executable] + args
+        # the first run writes the bytecode caches
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL)
+        seconds = []
+        for i in range(repeat):
+            started = time.perf_counter()
+            subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL)
+            seconds.append(time.perf_counter() - started)
+        modules = imported_modules(args)
+        results[name] = {
+            'seconds': min(seconds),
+            'modules': len(modules),
+            'deferred': [deferred for deferred in DEFERRED
+                if any(module == deferred or module.startswith(deferred + '.')
+                for module in modules)],
+        }
+    return results
+
+
+def report_startup(results, out=sys.stdout):
+    """Print the start-up times; returns the commands that import
+    DEFERRED modules"""
+    eager = []
+    for name, result in sorted(results.items()):
+        print('%-52s %10.1f ms %5d modules' % (name,
+            result['seconds'] * 1000, result['modules']), file=out)
+        if result['deferred']:
+            eager.append(name)
+            print('    imports %s' % ', '.join(result['deferred']),
+                file=out)
+    return eager
+
+
+def compare(results, baseline, threshold=THRESHOLD, min_delta=MIN_DELTA,
+        memory_threshold=MEMORY_THRESHOLD):
+    """Return a list of (universe, metric, baseline, current) for every
+    time or memory peak that got worse than the thresholds allow"""
+    regressions = []
+    for name, current in sorted(results['universes'].items()):
+        previous = baseline.get('universes', {}).get(name)
+        if previous is None or previous.get('size') != current['size']:
+            continue
+        for stage, seconds in sorted(current['seconds'].items()):
+            before = previous['seconds'].get(stage)
+            if before is not None and seconds > before * (1 + threshold) \
+                    and seconds - before > min_delta:
+                regressions.append((name, stage, before, seconds))
+        for stage, peak in sorted(current['memory'].items()):
+            before = previous['memory'].get(stage)
+            if before is not None and peak > before * (1 + memory_threshold):
+                regressions.append((name, 'memory.' + stage, before, peak))
+    return regressions
+
+
+def report(results, out=sys.stdout):
+    for name, result in sorted(results['universes'].items()):
+        print('%s (%d bytes)' % (name, result['size']), file=out)
+        for stage, seconds in sorted(result['seconds'].items(),
+                key=lambda item: -item[1]):
+            print('    %-52s %10.3f ms' % (stage, seconds * 1000), file=out)
+        for stage, peak in sorted(result['memory'].items()):
+            print('    %-52s %10.1f KiB' % ('peak memory: ' + stage,
+                peak / 1024.0), file=out)
+
+
+help_message = '''
+Benchmark pyunv on the bundled universes, or on the universes given.
+
+python benchmarks/bench.py [options] [universe.unv ...]
+
+    --repeat N      runs per universe (default 10, or 2 with --scale);
+                    times are the best run
+    --baseline F    baseline file (default benchmarks/baseline.json)
+    --save          write the results to the baseline file
+    --json F        also write the results to F
+    --threshold T   allowed slowdown, as a fraction (default 0.25)
+    --scale         time synthetic universes of growing size instead, and
+                    exit 1 if a stage grows faster than linear time
+    --startup       time the start of docunv and of importing pyunv
+                    instead, and exit 1 if they import Mako, ElementTree
+                    or other modules they do not need yet
+'''
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    try:
+        opts, args = getopt.getopt(argv[1:], 'h', ['help', 'repeat=',
+            'baseline=', 'save', 'json=', 'threshold=', 'scale', 'startup'])
+    except getopt.error as msg:
+        print(msg, file=sys.stderr)
+        return 2
+    options = dict(opts)
+    if '-h' in options or '--help' in options:
+        print(help_message)
+        return 0
+    if '--scale' in options:
+        result = scaling(repeat=int(options.get('--repeat', 2)))
+        superlinear = report_scaling(result)
+        if '--json' in options:
+            with open(options['--json'], 'w') as f:
+                json.dump(result, f, indent=1, sort_keys=True)
+        return 1 if superlinear else 0
+    if '--startup' in options:
+        result = startup(int(options.get('--repeat', 10)))
+        eager = report_startup(result)
+        if '--json' in options:
+            with open(options['--json'], 'w') as f:
+                json.dump(result, f, indent=1, sort_keys=True)
+        return 1 if eager else 0
+    paths = args or [os.path.join(UNIVERSES, name) for name in BUNDLED]
+    baseline_file = options.get('--baseline', BASELINE)
+    results = run(paths, int(options.get('--repeat', 10)))
+    report(results)
+    if '--json' in options:
+        with open(options['--json'], 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if '--save' in options:
+        with open(baseline_file, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print('baseline saved to %s' % baseline_file)
+        return 0
+    if not os.path.exists(baseline_file):
+        print('no baseline at %s (use --save)' % baseline_file)
+        return 0
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    if (baseline.get('python'), baseline.get('platform')) != \
+            (results['python'], results['platform']):
+        print('warning: the baseline was recorded with Python %s on %s' % (
+            baseline.get('python'), baseline.get('platform')))
+    regressions = compare(results, baseline,
+        float(options.get('--threshold', THRESHOLD)))
+    for name, metric, before, after in regressions:
+        print('REGRESSION %s %s: %.6g -> %.6g' % (name, metric, before,
+            after))
+    if not regressions:
+        print('no regressions against %s' % baseline_file)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
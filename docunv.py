@@ -9,32 +9,62 @@ Copyright (c) 2009 David Peckham. All rights reserved.
 Enhanced by Sanjay Sharma (indoos@gmail.com) 2025-10-17.
 """
 
+import contextlib
+import os
 import sys
 import getopt
+import time
 
 import pyunv
-from pyunv.universe import Universe
-from pyunv.reader import Reader
-from pyunv.manifest import Manifest
 
 __version__ = "0.1.0"
 
+FORMATS = ('manifest', 'csv', 'json')
+
 help_message = '''
 Create a text manifest for your BusinessObjects XI R2 universe.
 Copyright (c) 2009 David Peckham. All rights reserved
 
-pyunv options universe.unv
+pyunv options universe.unv [universe.unv | directory | pattern ...]
 
     where options are:
 
-    -m  --manifest   manifest output file 
+    -f  --format     documents to write next to each universe: manifest
+                     (universe.unv.txt, the default), csv (universe.unv.csv)
+                     or json (universe.unv.ndjson); comma separated or
+                     repeated
+    -m  --manifest   manifest output file (one universe only)
     -t  --template   manifest template
+    -j  --json       also write the universe as NDJSON records (one JSON
+                     record per line) to this file (one universe only)
+    -s  --sqlite     also load the universes into this SQLite database
+                     (replacing any it already has)
+    -p  --parquet    also write the universes into this directory of Parquet
+                     tables partitioned by universe (needs pyarrow)
+    -i  --index      also add the universes to this search index (see
+                     python -m pyunv.search)
+        --jobs N     document N universes at a time in separate processes
+                     (0 for one per CPU)
+        --cache DIR  keep parsed universes in DIR and reuse them while the
+                     files are unchanged
+        --stats      print the time and throughput of every universe
+    -w  --watch      keep the manifests and CSVs of every universe under a
+                     directory current as the universes change
     -h  --help       show this help
 
+Directories are searched for .unv files. The exit status is 1 if any
+universe could not be documented.
+
 Examples:
   docunv universe.unv
   docunv --manifest manifest.txt universe.unv 
   docunv --manifest manifest.txt --template manifest.mako universe.unv 
+  docunv --json universe.ndjson universe.unv
+  docunv --format manifest,csv --jobs 8 --cache /var/cache/pyunv /shared/universes
+  docunv --sqlite universes.db universe.unv
+  docunv --parquet estate universe.unv
+  docunv --index search.db universe.unv
+  docunv --watch /shared/universes
 '''
 
 def version():
@@ -51,16 +81,22 @@ def main(argv=None):
         argv = sys.argv
     try:
         try:
-            opts, args = getopt.getopt(argv[1:], "hm:t:v", ["help", "manifest=", "template="])
+            opts, args = getopt.getopt(argv[1:], "f:hi:j:m:p:s:t:vw:", ["cache=", "format=", "help", "index=", "jobs=", "json=", "manifest=", "parquet=", "sqlite=", "stats", "template=", "watch="])
         except getopt.error as msg:
             raise Usage(msg)
         
-        if len(args) == 0:
-            raise Usage(help_message)
-            
         verbose = False
         manifest = None
         template = None
+        watch = None
+        json_filename = None
+        sqlite_filename = None
+        parquet_directory = None
+        index_filename = None
+        formats = []
+        jobs = 1
+        cache = None
+        stats = False
             
         # option processing
         for option, value in opts:
@@ -74,27 +110,55 @@ def main(argv=None):
                     raise Usage(help_message)
             if option in ("-t", "--template"):
                 template = value
+            if option in ("-w", "--watch"):
+                watch = value
+            if option in ("-j", "--json"):
+                json_filename = value
+            if option in ("-s", "--sqlite"):
+                sqlite_filename = value
+            if option in ("-p", "--parquet"):
+                parquet_directory = value
+            if option in ("-i", "--index"):
+                index_filename = value
+            if option in ("-f", "--format"):
+                for format in value.split(','):
+                    if format not in FORMATS:
+                        raise Usage("unknown format %s (use %s)" % (format,
+                            ', '.join(FORMATS)))
+                    if format not in formats:
+                        formats.append(format)
+            if option == "--jobs":
+                try:
+                    jobs = int(value)
+                except ValueError:
+                    raise Usage("--jobs needs a number")
+            if option == "--cache":
+                cache = value
+            if option == "--stats":
+                stats = True
         
-        universe_filename = args[0]
-        reader = None
-        try:
-            with open(universe_filename, 'rb') as universe_file:
-                reader = Reader(universe_file)
-                
-            if manifest is None:
-                manifest_filename = universe_filename+'.txt'
-            else:
-                manifest_filename = manifest
-                
-            with open(manifest_filename, 'w') as manifest_file:
-                Manifest(reader.universe, template).save(manifest_file)
-        except IOError as error:
-            print("Unable to open %s: %s (error %d)" % (
-                error.filename, error.strerror, error.errno), file=sys.stderr)
-            return 1
-        except Exception:
-            print("Unable to document this universe. Please send the following error message to dave.peckham@me.com", file=sys.stderr)
-            raise
+        if watch is not None:
+            return watch_directory(watch, template, verbose)
+        
+        if len(args) == 0:
+            raise Usage(help_message)
+        
+        targets = {}
+        if manifest is not None:
+            targets['manifest'] = manifest
+        if json_filename is not None:
+            targets['json'] = json_filename
+        if targets and len(args) > 1:
+            raise Usage("--manifest and --json name the documents of one "
+                "universe; use --format with several")
+        if not formats:
+            formats.append('manifest')
+        for format in targets:
+            if format not in formats:
+                formats.append(format)
+
+        return document(args, formats, jobs, cache, template, targets,
+            sqlite_filename, parquet_directory, index_filename, stats)
 
     except Usage as err:
         print(sys.argv[0].split("/")[-1] + version() +": " + str(err.msg), file=sys.stderr)
@@ -102,5 +166,81 @@ def main(argv=None):
         return 2
 
 
+def document(paths, formats, jobs=1, cache=None, template=None, targets=None,
+        sqlite_filename=None, parquet_directory=None, index_filename=None,
+        stats=False):
+    """Document the universes named by paths; returns the exit status"""
+    # imported here so that --help does not wait for them
+    from pyunv.batch import document_files
+
+    started = time.perf_counter()
+    count = failed = size = 0
+    try:
+        with contextlib.ExitStack() as stack:
+            # the databases are only written by this process; workers send
+            # their universes back when there are any
+            sinks = []
+            if sqlite_filename is not None:
+                from pyunv.sqlitewriter import SqliteWriter
+                sinks.append(stack.enter_context(
+                    SqliteWriter(sqlite_filename)))
+            if parquet_directory is not None:
+                from pyunv.arrowwriter import ParquetDataset
+                sinks.append(ParquetDataset(parquet_directory))
+            if index_filename is not None:
+                from pyunv.search import SearchIndex
+                sinks.append(stack.enter_context(
+                    SearchIndex(index_filename)))
+
+            for result in document_files(paths, formats, jobs, cache,
+                    template, targets, keep=bool(sinks)):
+                count += 1
+                size += result.size
+                if result.error is not None:
+                    failed += 1
+                    print("Unable to document %s: %s" % (result.path,
+                        result.error), file=sys.stderr)
+                else:
+                    for sink in sinks:
+                        sink.add(result.universe,
+                            os.path.abspath(result.path))
+                if stats:
+                    print("%9.1f ms %9.1f ms %8.2f MB/s  %s%s" % (
+                        result.parse_seconds * 1000, result.seconds * 1000,
+                        result.size / 1e6 / result.seconds
+                            if result.seconds else 0.0,
+                        result.path, " (cached)" if result.cached else ""),
+                        file=sys.stderr)
+    except RuntimeError as error:
+        print("Unable to document: %s" % error, file=sys.stderr)
+        return 1
+
+    if count == 0:
+        print("No universes found", file=sys.stderr)
+        return 1
+    if stats or count > 1:
+        seconds = time.perf_counter() - started
+        print("%d universes documented, %d failed in %.2f s "
+            "(%.1f universes/s, %.2f MB/s)" % (count - failed, failed,
+            seconds, count / seconds, size / 1e6 / seconds), file=sys.stderr)
+    return 1 if failed else 0
+
+
+def watch_directory(directory, template=None, verbose=False):
+    from pyunv.watch import UniverseWatcher, write_documents
+    if not os.path.isdir(directory):
+        print("Unable to watch %s: not a directory" % directory, file=sys.stderr)
+        return 1
+    log = lambda message: print(message, file=sys.stderr)
+    watcher = UniverseWatcher(directory,
+        lambda filename, universe: write_documents(filename, universe, template),
+        log=log if verbose else None)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
 if __name__ == "__main__":
     sys.exit(main())
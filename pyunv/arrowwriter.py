@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+arrowwriter.py
+
+Write universes as Apache Arrow tables or Parquet files, for analytics in
+DuckDB, pandas or any other Arrow reader. Needs pyarrow.
+
+    tables = ArrowWriter(universe, 'sales.unv').tables()
+    ArrowWriter(universe, 'sales.unv').write_parquet('sales')
+
+    dataset = ParquetDataset('estate')
+    for path in paths:
+        dataset.add(Reader.from_path(path).universe, path)
+
+The tables are those of sqlitewriter.ENTITIES plus universes, with a
+universe column (the key) in place of universe_id. Strings are dictionary
+encoded. A ParquetDataset keeps one directory per table, partitioned by
+universe the way Hive does (objects/universe=sales.unv/part-0.parquet):
+
+    SELECT universe, count(*) FROM read_parquet('estate/objects/*/*.parquet',
+        hive_partitioning = true) GROUP BY universe
+"""
+
+import collections
+import os
+import urllib.parse
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from pyunv.sqlitewriter import ENTITIES, UNIVERSE_COLUMNS, entity_rows, \
+    universe_row
+
+
+def _require():
+    if pyarrow is None:
+        raise RuntimeError('Arrow export needs pyarrow: pip install pyarrow')
+
+
+def _type(sql_type):
+    if sql_type == 'INTEGER':
+        return pyarrow.int64()
+    return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+
+def schema(table, partitioned=False):
+    """Return the Arrow schema of a table; partitioned leaves out the
+    universe column, which a dataset keeps in its directory names"""
+    _require()
+    columns = UNIVERSE_COLUMNS if table == 'universes' else ENTITIES[table]
+    fields = [] if partitioned else [pyarrow.field('universe',
+        _type('TEXT'))]
+    fields.extend(pyarrow.field(name, _type(sql_type))
+        for name, sql_type in columns)
+    return pyarrow.schema(fields)
+
+
+class ArrowWriter(object):
+
+    """Convert a universe into one Arrow table per entity type
+
+    The rows of each table are transposed and handed to pyarrow a column at
+    a time, so no Python object is made per value.
+
+    """
+
+    def __init__(self, universe, key):
+        super(ArrowWriter, self).__init__()
+        _require()
+        self.universe = universe
+        self.key = key
+
+    def rows(self):
+        """Yield (table, rows) for universes and every entity table"""
+        yield 'universes', [universe_row(self.universe)]
+        for table, rows in entity_rows(self.universe):
+            yield table, rows
+
+    def tables(self, partitioned=False):
+        """Return an OrderedDict of table name to pyarrow.Table"""
+        tables = collections.OrderedDict()
+        for table, rows in self.rows():
+            tables[table] = self.table(table, rows, partitioned)
+        return tables
+
+    def table(self, table, rows, partitioned=False):
+        table_schema = schema(table, partitioned)
+        columns = list(zip(*rows)) if rows else \
+            [()] * (len(table_schema) - (0 if partitioned else 1))
+        if not partitioned:
+            columns.insert(0, [self.key] * len(rows))
+        return pyarrow.Table.from_arrays([pyarrow.array(column, field.type)
+            for column, field in zip(columns, table_schema)],
+            schema=table_schema)
+
+    def write_parquet(self, directory, compression='zstd'):
+        """Write every table to directory/<table>.parquet"""
+        os.makedirs(directory, exist_ok=True)
+        for table, arrow_table in self.tables().items():
+            pyarrow.parquet.write_table(arrow_table,
+                os.path.join(directory, table + '.parquet'),
+                compression=compression)
+
+
+class ParquetDataset(object):
+
+    """Parquet tables of many universes, partitioned by universe
+
+    add() writes a universe's rows under <root>/<table>/universe=<key>/,
+    replacing the files of an earlier add() with the same key, so a batch
+    can be run again and only changed universes need to be added.
+
+    """
+
+    def __init__(self, root, compression='zstd'):
+        super(ParquetDataset, self).__init__()
+        _require()
+        self.root = root
+        self.compression = compression
+        self.rows = 0
+
+    def partition(self, table, key):
+        return os.path.join(self.root, table,
+            'universe=' + urllib.parse.quote(key, safe=''))
+
+    def add(self, universe, key):
+        writer = ArrowWriter(universe, key)
+        for table, rows in writer.rows():
+            directory = self.partition(table, key)
+            os.makedirs(directory, exist_ok=True)
+            target = os.path.join(directory, 'part-0.parquet')
+            # a dot file, which dataset readers skip until it is complete
+            partial = os.path.join(directory, '.part-0.parquet')
+            pyarrow.parquet.write_table(writer.table(table, rows, True),
+                partial, compression=self.compression)
+            os.replace(partial, target)
+            self.rows += len(rows)
+
+    def table(self, table):
+        """Read a table of every universe back as a pyarrow.Table"""
+        import pyarrow.dataset
+        return pyarrow.dataset.dataset(os.path.join(self.root, table),
+            format='parquet', partitioning='hive').to_table()
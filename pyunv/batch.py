@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+batch.py
+
+Document many universes in one run, in a pool of processes, with a cache
+of parsed universes.
+
+    for result in document_files(['/shared/universes'], ['manifest', 'csv'],
+            jobs=4, cache='/var/cache/pyunv'):
+        print(result.path, result.error or 'ok')
+
+Paths may be universe files, directories (searched for .unv files) or glob
+patterns. The documents of a universe are written next to it, as docunv
+does: universe.unv.txt (manifest), universe.unv.csv (csv) and
+universe.unv.ndjson (json).
+"""
+
+import collections
+import concurrent.futures
+import functools
+import glob
+import hashlib
+import multiprocessing
+import os
+import pickle
+import time
+
+import pyunv
+from pyunv.csvwriter import CsvWriter
+from pyunv.jsonwriter import JsonWriter
+from pyunv.manifest import Manifest
+from pyunv.reader import Reader
+
+
+# the output formats and the suffix of the file each one writes
+FORMATS = collections.OrderedDict([
+    ('manifest', '.txt'),
+    ('csv', '.csv'),
+    ('json', '.ndjson'),
+])
+
+# bumped when snapshots of older releases can no longer be loaded
+SNAPSHOT_FORMAT = 2
+
+Result = collections.namedtuple('Result', ['path', 'size', 'seconds',
+    'parse_seconds', 'cached', 'outputs', 'error', 'universe'])
+
+
+def _walk(root):
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.unv'):
+                yield os.path.join(directory, filename)
+
+
+def expand_paths(paths):
+    """Return the universe files named by paths, in order and without
+    duplicates. Directories are searched for .unv files and glob patterns
+    are expanded; a path that matches nothing is kept, so it is reported
+    as missing."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(_walk(path))
+        elif not os.path.exists(path) and any(c in path for c in '*?['):
+            for match in sorted(glob.glob(path, recursive=True)):
+                if os.path.isdir(match):
+                    files.extend(_walk(match))
+                else:
+                    files.append(match)
+        else:
+            files.append(path)
+    seen = set()
+    unique = []
+    for path in files:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+class SnapshotCache(object):
+
+    """Parsed universes pickled in a directory, by the hash of their content
+
+    A universe is parsed once; later runs over the same file load its
+    snapshot instead. Snapshots are named after the pyunv release that wrote
+    them, so an upgrade parses every universe again. They are pickles: only
+    use a directory that no one else can write to.
+
+    """
+
+    def __init__(self, directory):
+        super(SnapshotCache, self).__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.directory, '%s-%s-%d.pickle' % (digest,
+            pyunv.__version__, SNAPSHOT_FORMAT))
+
+    def get(self, digest):
+        """Return the universe stored under digest, or None"""
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError, IndexError, KeyError, TypeError, ValueError):
+            # missing or damaged snapshots are parsed again (and replaced)
+            return None
+
+    def put(self, digest, universe):
+        """Store a universe; returns False if it cannot be pickled"""
+        target = self.path(digest)
+        partial = '%s.%d.partial' % (target, os.getpid())
+        try:
+            with open(partial, 'wb') as f:
+                pickle.dump(universe, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(partial, target)
+        except (OSError, pickle.PicklingError, RecursionError, TypeError):
+            # an unwritable cache, or a class tree too deep for the
+            # pickler, only costs the next run a parse
+            if os.path.exists(partial):
+                os.remove(partial)
+            return False
+        return True
+
+
+def load_universe(path, cache=None):
+    """Return (universe, file size, whether it came from the cache)"""
+    if cache is None:
+        size = os.path.getsize(path)
+        return Reader.from_path(path).universe, size, False
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    snapshots = SnapshotCache(cache)
+    universe = snapshots.get(digest)
+    if universe is not None:
+        return universe, len(data), True
+    universe = Reader.from_bytes(data).universe
+    snapshots.put(digest, universe)
+    return universe, len(data), False
+
+
+def write_document(universe, format, target, template=None):
+    """Write one document of a universe; the file is replaced in one step,
+    so readers never see half a document"""
+    partial = target + '.partial'
+    if format == 'json':
+        with open(partial, 'wb') as f:
+            JsonWriter(universe).save(f)
+    elif format == 'csv':
+        with open(partial, 'w', newline='') as f:
+            CsvWriter(universe, f)
+    else:
+        with open(partial, 'w') as f:
+            Manifest(universe, template).save(f)
+    os.replace(partial, target)
+
+
+def _describe(error):
+    if isinstance(error, OSError) and error.strerror:
+        return '%s (%s)' % (error.strerror, error.filename)
+    return '%s: %s' % (type(error).__name__, error)
+
+
+def document_file(path, formats=('manifest',), cache=None, template=None,
+        targets=None, keep=False):
+    """Parse a universe (or load it from the cache directory) and write its
+    documents. targets maps a format to a file name to use instead of the
+    one next to the universe; keep returns the universe in the Result."""
+    started = time.perf_counter()
+    size = 0
+    cached = False
+    parse_seconds = 0.0
+    outputs = []
+    try:
+        universe, size, cached = load_universe(path, cache)
+        parse_seconds = time.perf_counter() - started
+        for format in formats:
+            target = (targets or {}).get(format) or path + FORMATS[format]
+            write_document(universe, format, target, template)
+            outputs.append(target)
+    except Exception as error:
+        return Result(path, size, time.perf_counter() - started,
+            parse_seconds, cached, outputs, _describe(error), None)
+    return Result(path, size, time.perf_counter() - started, parse_seconds,
+        cached, outputs, None, universe if keep else None)
+
+
+def document_files(paths, formats=('manifest',), jobs=1, cache=None,
+        template=None, targets=None, keep=False):
+    """Document every universe named by paths (see expand_paths), in jobs
+    processes. Yields a Result per universe, in order; a universe that
+    cannot be read or parsed has an error instead of outputs."""
+    files = expand_paths(paths)
+    document = functools.partial(document_file, formats=tuple(formats),
+        cache=cache, template=template, targets=targets, keep=keep)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(files) < 2:
+        for path in files:
+            yield document(path)
+        return
+    # spawned, like the service's workers, so no state leaks into them
+    with concurrent.futures.ProcessPoolExecutor(min(jobs, len(files)),
+            mp_context=multiprocessing.get_context('spawn')) as pool:
+        for result in pool.map(document, files):
+            yield result
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+buffer.py
+
+A read-only file object over an in-memory buffer.
+"""
+
+import io
+import os
+
+
+def as_buffer(data):
+    """Return a searchable buffer (one with find) for a bytes-like object
+
+    bytes, bytearray and mmap objects are returned as they are, as is a
+    memoryview of a whole one; other memoryviews are copied.
+
+    """
+    if hasattr(data, 'find'):
+        return data
+    view = memoryview(data)
+    obj = view.obj
+    if hasattr(obj, 'find') and view.c_contiguous and \
+            view.nbytes == memoryview(obj).nbytes:
+        return obj
+    return view.tobytes()
+
+
+def open_cursor(buffer):
+    """Return a seekable file object over a buffer without copying it
+
+    io.BytesIO shares the memory of a bytes object until it is written to,
+    and is faster than BufferCursor, so it is used for bytes.
+
+    """
+    if isinstance(buffer, bytes):
+        return io.BytesIO(buffer)
+    return BufferCursor(buffer)
+
+
+class BufferCursor(io.RawIOBase):
+
+    """Seekable, read-only file object over a bytes-like buffer
+
+    Reads return slices of the buffer; seeking only moves the cursor, so
+    several cursors can share one buffer without copying it.
+
+    """
+
+    def __init__(self, buffer, offset=0):
+        super(BufferCursor, self).__init__()
+        self.view = buffer if isinstance(buffer, memoryview) \
+            else memoryview(buffer)
+        if self.view.ndim != 1 or self.view.itemsize != 1:
+            self.view = self.view.cast('B')
+        self.position = offset
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self.position + offset
+        elif whence == os.SEEK_END:
+            position = len(self.view) + offset
+        else:
+            raise ValueError('invalid whence (%r)' % whence)
+        if position < 0:
+            raise ValueError('negative seek position %d' % position)
+        self.position = position
+        return position
+
+    def read(self, size=-1):
+        start = self.position
+        if size is None or size < 0:
+            end = len(self.view)
+        else:
+            end = min(start + size, len(self.view))
+        if start >= end:
+            return b''
+        self.position = end
+        return self.view[start:end].tobytes()
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def view_at(self, start, length):
+        """Return a zero-copy view of length bytes at start"""
+        return self.view[start:start + length]
+
+
+class SectionBlob(object):
+
+    """The raw bytes of a universe section, copied out only on demand
+
+    A blob keeps a reference to the universe buffer and the bounds of the
+    section. bytes(blob) or blob.tobytes() copies the section once; view
+    gives a memoryview without copying. A pickled blob holds a copy of its
+    section, since the buffer may be a memory map, which cannot be pickled.
+
+    """
+
+    __slots__ = ('_buffer', 'offset', 'length', '_data')
+
+    def __init__(self, buffer, offset, length):
+        super(SectionBlob, self).__init__()
+        self._buffer = buffer
+        self.offset = offset
+        self.length = length
+        self._data = None
+
+    @property
+    def view(self):
+        return memoryview(self._buffer)[self.offset:self.offset + self.length]
+
+    def tobytes(self):
+        if self._data is None:
+            self._data = self.view.tobytes()
+        return self._data
+
+    __bytes__ = tobytes
+
+    def decode(self, *args, **kwargs):
+        return self.tobytes().decode(*args, **kwargs)
+
+    def __reduce__(self):
+        return SectionBlob, (self.tobytes(), 0, self.length)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.view[index].tobytes()
+        return self.view[index]
+
+    def __eq__(self, other):
+        if isinstance(other, SectionBlob):
+            other = other.tobytes()
+        if isinstance(other, (bytes, bytearray, memoryview)):
+            return self.tobytes() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash(self.tobytes())
+
+    def __repr__(self):
+        return '<SectionBlob offset=%d length=%d>' % (self.offset,
+            self.length)
@@ -9,11 +9,10 @@ Copyright (c) 2009 David Peckham. All rights reserved.
 Enhanced by Sanjay Sharma (indoos@gmail.com) 2025-10-17.
 """
 
-import sys
-import os
-import unittest
 import csv
 
+from pyunv.universe import walk_classes
+
 
 class CsvWriter(object):
     
@@ -30,21 +29,21 @@ class CsvWriter(object):
         self.file = csvfile
         writer = csv.writer(self.file, delimiter=',', quotechar='"', 
             quoting=csv.QUOTE_MINIMAL)
-        for c in universe.classes:
-            self.write_class(writer, c, '')
+        classpaths = []
+        for depth, c in walk_classes(universe.classes):
+            del classpaths[depth:]
+            classpaths.append(classpaths[-1] + '\\' + c.name if classpaths
+                else c.name)
+            self.write_class(writer, c, classpaths[-1])
 
     def write_class(self, writer, c, classpath):
-        if classpath:
-            classpath = classpath + '\\' + c.name
-        else:
-            classpath = c.name
+        """Write a class, its objects and its conditions; classpath is the
+        class's own path. The subclasses are written by the caller."""
         writer.writerow((classpath, None, 'class', c.description, None, None))
         for obj in c.objects:
             self.write_object(writer, obj, classpath)
         for condition in c.conditions:
             self.write_condition(writer, condition, classpath)
-        for subclass in c.subclasses:
-            self.write_class(writer, subclass, classpath)
 
     def write_object(self, writer, o, classpath):
         writer.writerow((classpath, o.name, 'object', o.description, 
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+dependencies.py
+
+Object, condition and table dependency graph for a universe.
+"""
+
+import collections
+import re
+
+from pyunv.universe import Condition, Table
+
+
+class DependencyGraph(object):
+
+    """Dependencies between the objects, conditions and tables of a universe
+
+    Nodes are ('object', id), ('condition', id) or ('table', id) tuples.
+    Internally each node has an integer index and the graph is kept as
+    integer adjacency sets, one forward (what a node uses) and one reverse
+    (what uses a node). An object depends on
+
+        the tables in its table ID list and 03 nn* tokens,
+        tables named in plain SQL (e.g. inside @aggregate_aware),
+        the objects in its object ID list and 02 nn* tokens,
+        the objects named by @Select(Class\\Object) and @Where(Class\\Object)
+
+    and an alias depends on the table it is an alias for. Transitive
+    closures are memoized, so repeated impact questions are set lookups.
+
+    """
+
+    _table_token = re.compile(chr(3) + r'([0-9]+)')
+    _object_token = re.compile(chr(2) + r'([0-9]+)')
+    _table_name = re.compile(
+        r'\b([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)?)\.')
+    _macro = re.compile(
+        r'@(select|where)\s*\(([^\\()]+)\\((?:[^()]|\([^()]*\))+)\)',
+        re.IGNORECASE)
+
+    def __init__(self, universe):
+        super(DependencyGraph, self).__init__()
+        self.universe = universe
+        self.nodes = []
+        self.index = {}
+        self.edges = []
+        self.reverse_edges = []
+        self._closure = {}
+        self._reverse_closure = {}
+        self._order = None
+        self._build()
+
+    @staticmethod
+    def node_key(entity):
+        """Return the node key for an Object, Condition or Table"""
+        if isinstance(entity, tuple):
+            return entity
+        if isinstance(entity, Table):
+            return ('table', entity.id_)
+        if isinstance(entity, Condition):
+            return ('condition', entity.id_)
+        return ('object', entity.id_)
+
+    def dependencies(self, entity, transitive=False):
+        """Return the nodes an entity uses (none if it is not in the
+        graph)"""
+        i = self.index.get(self.node_key(entity))
+        if i is None:
+            return set()
+        if transitive:
+            found = self._transitive(i, self.edges, self._closure)
+        else:
+            found = self.edges[i]
+        return set(self.nodes[j] for j in found)
+
+    def dependents(self, entity, transitive=True):
+        """Return the nodes that use an entity (none if it is not in the
+        graph)"""
+        i = self.index.get(self.node_key(entity))
+        if i is None:
+            return set()
+        if transitive:
+            found = self._transitive(i, self.reverse_edges,
+                self._reverse_closure)
+        else:
+            found = self.reverse_edges[i]
+        return set(self.nodes[j] for j in found)
+
+    def table_users(self, table_id):
+        """Return the objects and conditions that use a table, directly or
+        through other objects and aliases"""
+        return set(node for node in self.dependents(('table', table_id))
+            if node[0] != 'table')
+
+    def topological_order(self):
+        """Return every node, dependencies before the nodes that use them
+
+        Nodes that take part in a reference cycle come last, in index order.
+
+        """
+        if self._order is None:
+            pending = [len(deps) for deps in self.edges]
+            ready = collections.deque(
+                i for i, count in enumerate(pending) if count == 0)
+            order = []
+            while ready:
+                i = ready.popleft()
+                order.append(i)
+                for j in sorted(self.reverse_edges[i]):
+                    pending[j] -= 1
+                    if pending[j] == 0:
+                        ready.append(j)
+            if len(order) < len(self.nodes):
+                placed = set(order)
+                order.extend(i for i in range(len(self.nodes))
+                    if i not in placed)
+            self._order = order
+        return [self.nodes[i] for i in self._order]
+
+    @property
+    def cycles(self):
+        """Return the nodes that take part in a reference cycle"""
+        return set(self.nodes[i] for i in range(len(self.nodes))
+            if i in self._transitive(i, self.edges, self._closure))
+
+    def _node(self, key):
+        i = self.index.get(key)
+        if i is None:
+            i = len(self.nodes)
+            self.index[key] = i
+            self.nodes.append(key)
+            self.edges.append(set())
+            self.reverse_edges.append(set())
+        return i
+
+    def _add_edge(self, i, j):
+        self.edges[i].add(j)
+        self.reverse_edges[j].add(i)
+
+    def _build(self):
+        universe = self.universe
+        table_names = {}
+        for table in universe.tables:
+            self._node(('table', table.id_))
+            if table.name:
+                table_names.setdefault(table.name.lower(), table.id_)
+        for table in universe.tables:
+            if table.is_alias and table.parent_id in universe.table_map:
+                self._add_edge(self.index[('table', table.id_)],
+                    self._node(('table', table.parent_id)))
+
+        classes = universe.class_index
+        items = classes.objects + classes.conditions
+        object_paths = {}
+        for obj, position in zip(classes.objects, classes.object_parents):
+            object_paths.setdefault((classes.classes[position].name.lower(),
+                (obj.name or '').lower()), obj.id_)
+        for obj in items:
+            self._node(self.node_key(obj))
+
+        for obj in items:
+            i = self.index[self.node_key(obj)]
+            table_ids = set(obj.table_refs)
+            object_ids = set(obj.object_refs)
+            for sql in (obj.select, obj.where):
+                if not sql:
+                    continue
+                table_ids.update(int(t) for t in self._table_token.findall(sql))
+                object_ids.update(
+                    int(o) for o in self._object_token.findall(sql))
+                for name in self._table_name.findall(sql):
+                    table_id = table_names.get(name.lower())
+                    if table_id is not None:
+                        table_ids.add(table_id)
+                for macro, class_name, object_name in self._macro.findall(sql):
+                    object_id = object_paths.get((class_name.strip().lower(),
+                        object_name.strip().lower()))
+                    if object_id is not None:
+                        object_ids.add(object_id)
+            for table_id in sorted(table_ids):
+                self._add_edge(i, self._node(('table', table_id)))
+            for object_id in sorted(object_ids):
+                if object_id in universe.object_map:
+                    self._add_edge(i, self._node(('object', object_id)))
+
+    def _transitive(self, i, edges, memo):
+        found = memo.get(i)
+        if found is None:
+            found = set()
+            stack = list(edges[i])
+            while stack:
+                j = stack.pop()
+                if j in found:
+                    continue
+                found.add(j)
+                known = memo.get(j)
+                if known is not None:
+                    found.update(known)
+                else:
+                    stack.extend(edges[j])
+            found = frozenset(found)
+            memo[i] = found
+        return found
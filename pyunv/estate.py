@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+estate.py
+
+Persistent impact-analysis index over many universes.
+"""
+
+import collections
+import hashlib
+import re
+import sqlite3
+import time
+
+from pyunv.reader import Reader
+
+
+Reference = collections.namedtuple('Reference', ['universe', 'name',
+    'db_table', 'db_column', 'kind', 'entity_id', 'entity_name'])
+
+
+class EstateIndex(object):
+
+    """Map database tables and columns to the universes, objects, conditions
+    and joins that use them
+
+    The index lives in a SQLite file. Each universe is stored under a key
+    (usually its path) with the hash of its content, so re-indexing an
+    unchanged universe is free and re-indexing a changed one only replaces
+    that universe's rows.
+
+        index = EstateIndex('estate.db')
+        index.add_file('sales.unv')
+        for ref in index.impact('public.orderinfo', 'customer_id'):
+            print(ref.universe, ref.kind, ref.entity_name)
+
+    """
+
+    _schema = (
+        '''CREATE TABLE IF NOT EXISTS universes (
+            id INTEGER PRIMARY KEY,
+            key TEXT UNIQUE NOT NULL,
+            name TEXT,
+            content_hash TEXT,
+            indexed_at REAL)''',
+        '''CREATE TABLE IF NOT EXISTS refs (
+            universe_id INTEGER NOT NULL,
+            db_table TEXT NOT NULL,
+            db_column TEXT,
+            kind TEXT NOT NULL,
+            entity_id INTEGER,
+            entity_name TEXT)''',
+        'CREATE INDEX IF NOT EXISTS refs_column ON refs (db_table, db_column)',
+        'CREATE INDEX IF NOT EXISTS refs_universe ON refs (universe_id)',
+    )
+
+    _table_column_token = re.compile(chr(3) + r'([0-9]+)\.(\w+)')
+    _table_column_name = re.compile(
+        r'\b([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?)\.([A-Za-z_]\w*)')
+
+    def __init__(self, path):
+        super(EstateIndex, self).__init__()
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        for statement in EstateIndex._schema:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def content_hash(self, key):
+        """Return the content hash stored for a universe, or None"""
+        row = self.connection.execute(
+            'SELECT content_hash FROM universes WHERE key = ?',
+            (key,)).fetchone()
+        return row[0] if row else None
+
+    def add_file(self, path, key=None):
+        """Index a universe file unless it is unchanged since it was last
+        indexed. Returns True if the index was updated."""
+        key = key or path
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+        if self.content_hash(key) == digest:
+            return False
+        self.add(Reader.from_bytes(data).universe, key, digest)
+        return True
+
+    def add(self, universe, key, content_hash=None):
+        """Index a parsed universe, replacing any rows stored under key"""
+        rows = list(self._references(universe))
+        with self.connection:
+            self._delete(key)
+            cursor = self.connection.execute(
+                'INSERT INTO universes (key, name, content_hash, indexed_at) '
+                'VALUES (?, ?, ?, ?)', (key,
+                universe.parameters.universe_name if universe.parameters
+                    else None, content_hash, time.time()))
+            universe_id = cursor.lastrowid
+            self.connection.executemany(
+                'INSERT INTO refs VALUES (?, ?, ?, ?, ?, ?)',
+                [(universe_id,) + row for row in rows])
+
+    def remove(self, key):
+        with self.connection:
+            self._delete(key)
+
+    def universes(self):
+        """Return the keys of the indexed universes"""
+        return [row[0] for row in self.connection.execute(
+            'SELECT key FROM universes ORDER BY key')]
+
+    def impact(self, table, column=None):
+        """Return the References that break if a table, or one of its
+        columns, is dropped. With a column, references to the table whose
+        column could not be resolved (db_column is NULL) are included, as
+        they may use it."""
+        sql = ('SELECT u.key, u.name, r.db_table, r.db_column, r.kind, '
+            'r.entity_id, r.entity_name FROM refs r '
+            'JOIN universes u ON u.id = r.universe_id WHERE r.db_table = ?')
+        params = [table.lower()]
+        if column is not None:
+            sql += ' AND (r.db_column = ? OR r.db_column IS NULL)'
+            params.append(column.lower())
+        sql += ' ORDER BY u.key, r.kind, r.entity_id'
+        return [Reference(*row)
+            for row in self.connection.execute(sql, params)]
+
+    def _delete(self, key):
+        row = self.connection.execute(
+            'SELECT id FROM universes WHERE key = ?', (key,)).fetchone()
+        if row:
+            self.connection.execute(
+                'DELETE FROM refs WHERE universe_id = ?', row)
+            self.connection.execute(
+                'DELETE FROM universes WHERE id = ?', row)
+
+    def _references(self, universe):
+        """Yield (db_table, db_column, kind, entity_id, entity_name) rows"""
+        table_names = {}
+        for table_id, table in universe.table_map.items():
+            physical = table
+            if table.is_alias and table.parent_id in universe.table_map:
+                physical = universe.table_map[table.parent_id]
+            if physical.name:
+                name = physical.name
+                if physical.schema:
+                    name = '%s.%s' % (physical.schema, name)
+                table_names[table_id] = name.lower()
+        tables_by_name = {}
+        for table in universe.tables:
+            if table.name and table.id_ in table_names:
+                tables_by_name.setdefault(table.name.lower(),
+                    table_names[table.id_])
+
+        for table_id, columns in universe.table_columns.items():
+            db_table = table_names.get(table_id)
+            if db_table:
+                for column in columns:
+                    yield (db_table, (column['name'] or '').lower(),
+                        'column', column['id'], column['fullname'])
+
+        for join in universe.joins:
+            seen = set()
+            for column, table_id in join.terms:
+                db_table = table_names.get(table_id)
+                if db_table and column:
+                    seen.add((db_table, column.lower()))
+            for db_table, column in sorted(seen):
+                yield (db_table, column, 'join', join.id_, join.statement)
+
+        direct = {}
+        items = [('object', obj) for obj in universe.object_map.values()]
+        items.extend(('condition', condition)
+            for condition in universe.conditions)
+        for kind, obj in items:
+            direct[(kind, obj.id_)] = self._sql_references(obj, table_names,
+                tables_by_name)
+        for kind, obj in items:
+            seen = set(direct[(kind, obj.id_)])
+            # an object or condition also breaks when an object it uses does
+            if universe.dependencies is not None:
+                for node in universe.dependencies.dependencies(
+                        (kind, obj.id_), transitive=True):
+                    seen.update(direct.get(node, ()))
+            for db_table, column in sorted(seen,
+                    key=lambda r: (r[0], r[1] or '')):
+                yield (db_table, column, kind, obj.id_, obj.fullname)
+
+    def _sql_references(self, obj, table_names, tables_by_name):
+        """Return the (db_table, db_column) pairs an object uses directly"""
+        seen = set()
+        for sql in (obj.select, obj.where):
+            if not sql:
+                continue
+            for table_id, column in self._table_column_token.findall(sql):
+                db_table = table_names.get(int(table_id))
+                if db_table:
+                    seen.add((db_table, column.lower()))
+            for name, column in self._table_column_name.findall(sql):
+                db_table = tables_by_name.get(name.lower())
+                if db_table:
+                    seen.add((db_table, column.lower()))
+        referenced_tables = set(db_table for db_table, column in seen)
+        for table_id in obj.table_refs:
+            db_table = table_names.get(table_id)
+            if db_table and db_table not in referenced_tables:
+                seen.add((db_table, None))
+        return seen
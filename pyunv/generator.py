@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+generator.py
+
+Write synthetic universe files of any size, for scale testing.
+
+    python -m pyunv.generator --tables 10000 --objects 100000 big.unv
+
+The sections follow the layouts documented in the Reader (read_parameters,
+read_table, read_column, read_join, read_context, read_class,
+read_object and read_condition) and are stored in a zip container behind
+a short header, like the universes Designer writes. Only the sections the
+Reader needs are written.
+"""
+
+import collections
+import getopt
+import io
+import random
+import struct
+import sys
+import zipfile
+
+
+_header = b'\x00' * 30
+
+
+def pack_string(value):
+    """Return a string as the Reader's read_string expects it: a 16-bit
+    length and the UTF-8 bytes (a length of 0 reads as None)"""
+    if not value:
+        return b'\x00\x00'
+    data = value.encode('utf-8')
+    if len(data) > 0xffff:
+        raise ValueError('string longer than 65535 bytes')
+    return struct.pack('<H', len(data)) + data
+
+
+class UniverseGenerator(object):
+
+    """Build a synthetic universe
+
+    tables and columns (per table) make the schema; joins link the tables
+    (a spanning tree first, then random extra joins) and are spread over
+    contexts. Objects and conditions select columns of random tables and
+    are spread over classes, which form a tree with at most subclasses
+    children per class. description_length pads every description, to
+    reach a file size without adding records. The same seed always gives
+    the same file.
+
+        generator = UniverseGenerator(tables=10000, objects=100000)
+        with open('big.unv', 'wb') as f:
+            generator.write(f)
+
+    """
+
+    def __init__(self, tables=10, columns=5, joins=None, contexts=1,
+            classes=5, objects=20, conditions=0, subclasses=4,
+            description_length=0, name='Synthetic', seed=0):
+        super(UniverseGenerator, self).__init__()
+        if tables < 1 or columns < 1 or classes < 1:
+            raise ValueError('a universe needs a table, a column and a class')
+        self.tables = tables
+        self.columns = columns
+        self.joins = tables - 1 if joins is None else joins
+        self.contexts = contexts
+        self.classes = classes
+        self.objects = objects
+        self.conditions = conditions
+        self.subclasses = max(1, subclasses)
+        self.description_length = description_length
+        self.name = name
+        self.seed = seed
+
+    def description(self, text):
+        if self.description_length <= len(text):
+            return text
+        filler = ' lorem ipsum dolor sit amet'
+        padding = filler * (self.description_length // len(filler) + 1)
+        return (text + padding)[:self.description_length]
+
+    def sections(self):
+        """Return an OrderedDict of section marker to section data"""
+        rng = random.Random(self.seed)
+        sections = collections.OrderedDict()
+        sections['Parameters;'] = self.parameters()
+        sections['Parameters_6_0;'] = self.custom_parameters()
+        sections['Tables;'] = self.table_section()
+        sections['Virtual Tables;'] = struct.pack('<I', 0)
+        sections['Columns Id;'] = self.column_section()
+        sections['Joins;'] = self.join_section(rng)
+        sections['Contexts;'] = self.context_section()
+        sections['Links;'] = struct.pack('<2I', 0, 0)
+        sections['Hierarchies;'] = struct.pack('<2I', 0, 0)
+        sections['Objects;'] = self.class_section(rng)
+        return sections
+
+    def parameters(self):
+        return b''.join([
+            struct.pack('<2I', 0x22, 0),
+            pack_string(self.name),
+            pack_string(self.name),
+            struct.pack('<IH', 1, 0),
+            pack_string(self.description('Synthetic universe')),
+            pack_string('pyunv'),
+            pack_string('pyunv'),
+            # day indexes: 2 January 2024 and 3 January 2024
+            struct.pack('<2I', 2460312, 2460313),
+            struct.pack('<2I', 300, 10000),
+            pack_string(None),
+            pack_string('(Built-in) Standard Renaming'),
+            b'\x00',
+            struct.pack('<2I', 300, 1000),
+            b'\x00' * 4,
+            pack_string(None),
+            struct.pack('<3I', 0, 0, 0),
+            pack_string(None),
+            pack_string('Generic ODBC datasource'),
+            pack_string('ODBC'),
+        ])
+
+    def custom_parameters(self):
+        parameters = [('ANSI92', 'Yes'), ('MAX_INLIST_VALUES', '999')]
+        return struct.pack('<I', len(parameters)) + b''.join(
+            pack_string(name) + pack_string(value)
+            for name, value in parameters)
+
+    def table_name(self, table_id):
+        return 'TABLE_%d' % table_id
+
+    def column_name(self, index):
+        return 'COLUMN_%d' % index
+
+    def table_section(self):
+        parts = [b'\x01\x01', pack_string('dbo'), pack_string('SALES'),
+            struct.pack('<2I', self.tables, self.tables)]
+        for table_id in range(1, self.tables + 1):
+            parts.append(struct.pack('<I', table_id) + b'\x00' * 19 +
+                pack_string(self.table_name(table_id)) +
+                struct.pack('<I', 0) + b'\x00' * 9 + b'\x00\x00')
+        return b''.join(parts)
+
+    def column_section(self):
+        count = self.tables * self.columns
+        parts = [struct.pack('<2I', count, count)]
+        column_id = 0
+        for table_id in range(1, self.tables + 1):
+            for index in range(1, self.columns + 1):
+                column_id += 1
+                parts.append(struct.pack('<2I', column_id, table_id) +
+                    pack_string(self.column_name(index)))
+        return b''.join(parts)
+
+    def join_section(self, rng):
+        parts = [struct.pack('<3I', self.tables, 0, self.joins)]
+        for join_id in range(1, self.joins + 1):
+            if join_id < self.tables:
+                # join_id links table join_id + 1 to a table before it, so
+                # the first tables - 1 joins make a spanning tree
+                left, right = rng.randint(1, join_id), join_id + 1
+            else:
+                left, right = rng.sample(range(1, self.tables + 1), 2) \
+                    if self.tables > 1 else (1, 1)
+            column = self.column_name(rng.randint(1, self.columns))
+            parts.append(struct.pack('<I', join_id) + b'\x00' * 20 +
+                pack_string('=') + b'\x00' * 8 + struct.pack('<I', 2) +
+                pack_string(column) + struct.pack('<I', left) +
+                pack_string(column) + struct.pack('<I', right))
+        parts.append(b'\x00' * 8)
+        return b''.join(parts)
+
+    def context_section(self):
+        parts = [struct.pack('<2I', self.contexts, self.contexts)]
+        for context_id in range(1, self.contexts + 1):
+            joins = range(context_id, self.joins + 1, self.contexts)
+            parts.append(pack_string('Context %d' % context_id) +
+                struct.pack('<I', context_id) +
+                pack_string(self.description('Context %d' % context_id)) +
+                struct.pack('<I', len(joins)) +
+                struct.pack('<%dI' % len(joins), *joins))
+        return b''.join(parts)
+
+    def class_section(self, rng):
+        # classes are numbered breadth first: the first subclasses classes
+        # are roots and class i has classes (i + 1) * subclasses ... as
+        # children. They are written depth first, as read_class reads them.
+        children = collections.defaultdict(list)
+        for index in range(self.subclasses, self.classes):
+            children[index // self.subclasses - 1].append(index)
+        roots = list(range(min(self.classes, self.subclasses)))
+        objects = collections.defaultdict(list)
+        for object_id in range(1, self.objects + 1):
+            objects[(object_id - 1) % self.classes].append(object_id)
+        conditions = collections.defaultdict(list)
+        for condition_id in range(1, self.conditions + 1):
+            conditions[(condition_id - 1) % self.classes].append(condition_id)
+        parts = [struct.pack('<4I', self.classes, self.objects,
+            self.conditions, len(roots))]
+        stack = [(index, 0) for index in reversed(roots)]
+        while stack:
+            index, parent_id = stack.pop()
+            class_id = index + 1
+            parts.append(struct.pack('<I', class_id) +
+                pack_string('Class %d' % class_id) +
+                struct.pack('<I', parent_id) +
+                pack_string(self.description('Class %d' % class_id)) +
+                b'\x00' * 7 + struct.pack('<I', len(objects[index])))
+            for object_id in objects[index]:
+                parts.append(self.object_record(rng, object_id, class_id))
+            parts.append(struct.pack('<I', len(conditions[index])))
+            for condition_id in conditions[index]:
+                parts.append(self.condition_record(rng, condition_id,
+                    class_id))
+            parts.append(struct.pack('<I', len(children[index])))
+            stack.extend((child, class_id)
+                for child in reversed(children[index]))
+        return b''.join(parts)
+
+    def column_reference(self, rng):
+        table_id = rng.randint(1, self.tables)
+        column = self.column_name(rng.randint(1, self.columns))
+        return table_id, '\x03%d.%s' % (table_id, column)
+
+    def object_record(self, rng, object_id, class_id):
+        table_id, select = self.column_reference(rng)
+        return b''.join([
+            struct.pack('<I', object_id),
+            pack_string('Object %d' % object_id),
+            struct.pack('<I', class_id),
+            pack_string(self.description('Object %d' % object_id)),
+            struct.pack('<HI', 1, table_id),
+            struct.pack('<H', 0),
+            pack_string(select),
+            pack_string(None),
+            pack_string(None),
+            pack_string(None),
+            pack_string('LOV %d' % object_id),
+            b'\x00\x00\x76',
+            b'\x00' * 55,
+        ])
+
+    def condition_record(self, rng, condition_id, class_id):
+        table_id, column = self.column_reference(rng)
+        return b''.join([
+            struct.pack('<I', condition_id),
+            pack_string('Condition %d' % condition_id),
+            struct.pack('<I', class_id),
+            pack_string(self.description('Condition %d' % condition_id)),
+            struct.pack('<HI', 1, table_id),
+            struct.pack('<H', 0),
+            pack_string("%s = 'value %d'" % (column, condition_id)),
+        ])
+
+    def write(self, f):
+        """Write the universe to a binary file"""
+        f.write(_header)
+        with zipfile.ZipFile(f, 'w', zipfile.ZIP_STORED) as archive:
+            for marker, data in self.sections().items():
+                info = zipfile.ZipInfo(marker, (2024, 1, 2, 0, 0, 0))
+                archive.writestr(info, data)
+
+    def tobytes(self):
+        f = io.BytesIO()
+        self.write(f)
+        return f.getvalue()
+
+
+help_message = '''
+Write a synthetic universe file for scale testing.
+
+python -m pyunv.generator [options] universe.unv
+
+    --tables N        tables (default 10)
+    --columns N       columns per table (default 5)
+    --joins N         joins (default: tables - 1, a spanning tree)
+    --contexts N      contexts (default 1)
+    --classes N       classes (default 5)
+    --objects N       objects (default 20)
+    --conditions N    conditions (default 0)
+    --subclasses N    most subclasses per class (default 4)
+    --description N   pad descriptions to N characters (default 0)
+    --seed N          random seed (default 0)
+'''
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    numbers = ['tables', 'columns', 'joins', 'contexts', 'classes',
+        'objects', 'conditions', 'subclasses', 'description', 'seed']
+    try:
+        opts, args = getopt.getopt(argv[1:], 'h',
+            ['help'] + [name + '=' for name in numbers])
+        options = dict(opts)
+        if '-h' in options or '--help' in options:
+            print(help_message)
+            return 0
+        if len(args) != 1:
+            print(help_message, file=sys.stderr)
+            return 2
+        kwargs = dict((name, int(options['--' + name])) for name in numbers
+            if '--' + name in options)
+    except (getopt.error, ValueError) as msg:
+        print(msg, file=sys.stderr)
+        return 2
+    if 'description' in kwargs:
+        kwargs['description_length'] = kwargs.pop('description')
+    with open(args[0], 'wb') as f:
+        UniverseGenerator(**kwargs).write(f)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+jsonwriter.py
+
+Write a universe as JSON records, for search indexes and data catalogs.
+
+    with open('universe.ndjson', 'wb') as f:
+        JsonWriter(universe).save(f)
+
+Every record is a dict with a "type" (universe, table, column, join,
+context, link, hierarchy, class, object, condition, validation_error,
+cross_reference, context_incompatibility or section, how a section of the
+file was read). Records are encoded one at a time as the Universe is
+walked, so only one record is in memory at once.
+orjson is used when it is installed, else the standard json module.
+"""
+
+import datetime
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from pyunv.universe import walk_classes
+
+
+def _default(value):
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return str(value)
+
+
+def _analysis_record(type_, values, **extra):
+    """An analysis result as a record; its own type (the validation rule or
+    kind of reference) is kept as kind"""
+    record = dict(values)
+    if 'type' in record:
+        record['kind'] = record.pop('type')
+    record.update(extra)
+    record['type'] = type_
+    return record
+
+
+_encoder = json.JSONEncoder(default=_default, ensure_ascii=False,
+    separators=(',', ':'))
+
+
+def json_dumps(value):
+    """Return value encoded as compact UTF-8 JSON bytes with the standard
+    json module"""
+    return _encoder.encode(value).encode('utf-8')
+
+
+def orjson_dumps(value):
+    """Return value encoded as compact UTF-8 JSON bytes with orjson"""
+    return orjson.dumps(value, default=_default,
+        option=orjson.OPT_NON_STR_KEYS)
+
+
+dumps = orjson_dumps if orjson is not None else json_dumps
+
+
+class JsonWriter(object):
+
+    """Write the records of a universe as NDJSON (one record per line) or as
+    a JSON array
+
+    records() yields the records; save(f) encodes them to a binary file.
+
+    """
+
+    def __init__(self, universe, ndjson=True):
+        super(JsonWriter, self).__init__()
+        self.universe = universe
+        self.ndjson = ndjson
+
+    def records(self):
+        universe = self.universe
+        yield self.universe_record()
+        for table in universe.tables:
+            yield {'type': 'table', 'id': table.id_, 'name': table.name,
+                'schema': table.schema, 'fullname': table.fullname,
+                'alias_of': table.parent_id if table.is_alias else None}
+        for column in universe.columns:
+            yield {'type': 'column', 'id': column.id_, 'name': column.name,
+                'table_id': column.parent.id_ if column.parent else None,
+                'fullname': column.fullname}
+        for join in universe.joins:
+            yield {'type': 'join', 'id': join.id_,
+                'statement': join.statement,
+                'tables': [table_id for column, table_id in join.terms]}
+        for context in universe.contexts:
+            yield {'type': 'context', 'id': context.id_, 'name': context.name,
+                'description': context.description, 'joins': context.joins}
+        for link in universe.links:
+            yield {'type': 'link', 'id': link.id_, 'name': link.name,
+                'description': link.description,
+                'linked_universe': link.linked_universe}
+        for hierarchy in universe.hierarchies:
+            yield {'type': 'hierarchy', 'id': hierarchy.id_,
+                'name': hierarchy.name, 'description': hierarchy.description,
+                'levels': hierarchy.levels}
+        for record in self.class_records():
+            yield record
+        for error in universe.validation_errors:
+            yield _analysis_record('validation_error', error)
+        for key, reference in universe.cross_references.items():
+            yield _analysis_record('cross_reference', reference, key=key)
+        for incompatibility in universe.context_incompatibilities:
+            yield _analysis_record('context_incompatibility', incompatibility)
+        for status in universe.section_status.values():
+            yield {'type': 'section', 'name': status.section,
+                'marker': status.marker, 'status': status.status,
+                'reason': status.reason}
+
+    def universe_record(self):
+        parameters = self.universe.parameters
+        record = {'type': 'universe',
+            'statistics': self.universe.statistics}
+        if parameters is not None:
+            record.update({'name': parameters.universe_name,
+                'filename': parameters.universe_filename,
+                'description': parameters.description,
+                'revision': parameters.revision,
+                'created_by': parameters.created_by,
+                'modified_by': parameters.modified_by,
+                'created_date': parameters.created_date,
+                'modified_date': parameters.modified_date,
+                'domain': parameters.domain,
+                'dbms_engine': parameters.dbms_engine,
+                'network_layer': parameters.network_layer})
+        return record
+
+    def class_records(self):
+        """Yield the class records in hierarchy order, then the object and
+        condition records in ID order"""
+        universe = self.universe
+        paths = []
+        for depth, cls in walk_classes(universe.classes):
+            del paths[depth:]
+            paths.append(paths[-1] + '\\' + cls.name if paths else cls.name)
+            yield {'type': 'class', 'id': cls.id_, 'name': cls.name,
+                'parent_id': cls.parent.id_ if cls.parent else None,
+                'path': paths[-1], 'depth': depth,
+                'description': cls.description}
+        index = universe.class_index
+        for o, position in zip(index.objects, index.object_parents):
+            yield {'type': 'object', 'id': o.id_, 'name': o.name,
+                'class_id': index.classes[position].id_,
+                'description': o.description, 'select': o.select_sql,
+                'where': o.where_sql, 'tables': o.table_refs,
+                'visible': o.visible, 'lov_name': o.lov_name}
+        for c, position in zip(index.conditions, index.condition_parents):
+            yield {'type': 'condition', 'id': c.id_, 'name': c.name,
+                'class_id': index.classes[position].id_,
+                'description': c.description, 'where': c.where_sql,
+                'tables': c.table_refs}
+
+    def chunks(self):
+        """Yield the encoded output, a record at a time"""
+        if self.ndjson:
+            for record in self.records():
+                yield dumps(record) + b'\n'
+            return
+        separator = b'[\n'
+        for record in self.records():
+            yield separator + dumps(record)
+            separator = b',\n'
+        yield b'[]\n' if separator == b'[\n' else b'\n]\n'
+
+    def save(self, f):
+        """Write the records to a binary file"""
+        for chunk in self.chunks():
+            f.write(chunk)
+
+    def tobytes(self):
+        return b''.join(self.chunks())
@@ -7,6 +7,16 @@
     Copyright (c) 2009 David Peckham. All rights reserved.
 </%doc>
     <%page args="universe"/>
+<%!
+    from pyunv.universe import walk_classes
+
+    def class_pad(closed, depth=None):
+        """The blank line before a class (depth) or after the last one (None):
+        five spaces for each class closed since the last class (closed is
+        its depth), then the indent of the class"""
+        pad = ' ' * 5 * (closed - (depth or 0) + 1) if closed is not None else ''
+        return pad + ' ' * (4 if depth is None else 12 if depth else 8)
+%>\
     Universe Manifest created by pyunv ${universe.pyunv_version}
         <% parms = universe.parameters %>
         Name: ${parms.universe_name}
@@ -57,33 +67,31 @@
     % endfor
 
     Objects
-    % for uclass in universe.classes:
-        ${write_class_objects(uclass, 1)} \
-    % endfor
-    <%def name="write_class_objects(uclass, level)">
+<% closed = None %>\
+    % for depth, uclass in walk_classes(universe.classes):
+<% pad = class_pad(closed, depth) %>\
+${pad}
         ${uclass.name}
         % for obj in uclass.objects:
             ${obj.name}   id: ${obj.id_}, visible: ${obj.visible}, description: ${obj.description}, select: ${obj.select_sql}, where: ${obj.where_sql}
         % endfor
-        <% level = level+1 %> \
-        % for subclass in uclass.subclasses:
-            ${write_class_objects(subclass, level)} \
-        % endfor
-    </%def>
-    Conditions
-    % for uclass in universe.classes:
-        ${write_class_conditions(uclass, 1)} \
+         <% closed = depth %>\
     % endfor
-    <%def name="write_class_conditions(uclass, level)">
+<% pad = class_pad(closed) %>\
+${pad}
+    Conditions
+<% closed = None %>\
+    % for depth, uclass in walk_classes(universe.classes):
+<% pad = class_pad(closed, depth) %>\
+${pad}
         ${uclass.name}
         % for condition in uclass.conditions:
             ${condition.name}   id: ${condition.id_}, description: ${condition.description}, where: ${condition.where_sql}
         % endfor
-        <% level = level+1 %> \
-        % for subclass in uclass.subclasses:
-            ${write_class_conditions(subclass, level)} \
-        % endfor
-    </%def>
+         <% closed = depth %>\
+    % endfor
+<% pad = class_pad(closed) %>\
+${pad}
     Hierarchies
 
     % for hierarchy in universe.hierarchies:
@@ -9,11 +9,7 @@ Copyright (c) 2009 David Peckham. All rights reserved.
 Enhanced by Sanjay Sharma (indoos@gmail.com) 2025-10-17.
 """
 
-import sys
 import os
-import unittest
-
-from mako.template import Template
 
 
 class Manifest:
@@ -42,6 +38,9 @@ class Manifest:
     def save(self, f):
         """docstring for write_manifest"""
         if self.template:
+            # Mako takes longer to import than the rest of pyunv, so it is
+            # only loaded when a manifest is written
+            from mako.template import Template
             try:
                 template = Template(filename=self.template, 
                     encoding_errors='replace')
@@ -53,12 +52,3 @@ class Manifest:
             raise RuntimeError("No template found for Manifest. " + 
                 "Ensure manifest.mako is installed with the pyunv package.")
 
-
-class ManifestTests(unittest.TestCase):
-    
-    def setUp(self):
-        pass
-
-
-if __name__ == '__main__':
-    unittest.main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+planner.py
+
+Resolve the tables, joins and contexts that a query built from a set of
+universe objects would touch, and whether the query would be split into
+more than one SQL statement.
+"""
+
+import collections
+import re
+
+from pyunv.universe import Condition
+
+
+class QueryStatement(object):
+
+    """One SQL statement of a query plan"""
+
+    def __init__(self, context_id, objects, tables, joins):
+        super(QueryStatement, self).__init__()
+        self.context_id = context_id
+        self.objects = objects
+        self.tables = tables
+        self.joins = joins
+
+    def __str__(self):
+        return '%s context=%s, tables=%s, joins=%s' % (type(self).__name__,
+            self.context_id, self.tables, self.joins)
+
+
+class QueryPlan(object):
+
+    """The tables, joins and contexts used by a query
+
+    contexts lists every context that can answer the whole query (more than
+    one means Designer would ask the user to choose), or the contexts of the
+    individual statements when the query has to be split.
+
+    """
+
+    def __init__(self, objects, tables, statements, contexts,
+            unresolved_tables):
+        super(QueryPlan, self).__init__()
+        self.objects = objects
+        self.tables = tables
+        self.statements = statements
+        self.contexts = contexts
+        self.unresolved_tables = unresolved_tables
+
+    @property
+    def joins(self):
+        joins = set()
+        for statement in self.statements:
+            joins.update(statement.joins)
+        return sorted(joins)
+
+    @property
+    def is_split(self):
+        return len(self.statements) > 1
+
+    @property
+    def is_ambiguous(self):
+        return not self.is_split and len(self.contexts) > 1
+
+    def __str__(self):
+        return '%s tables=%s, joins=%s, contexts=%s, statements=%d' % (
+            type(self).__name__, self.tables, self.joins, self.contexts,
+            len(self.statements))
+
+
+class QueryPlanner(object):
+
+    """Plan queries against a universe
+
+    The join graph of the universe and of each of its contexts is built
+    once, so planning a set of objects costs one shortest-path search per
+    table it needs. Plans are cached by object set.
+
+    """
+
+    _table_token = re.compile(chr(3) + r'([0-9]+)')
+    _object_token = re.compile(chr(2) + r'([0-9]+)')
+
+    def __init__(self, universe, cache_size=4096):
+        super(QueryPlanner, self).__init__()
+        self.universe = universe
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._object_tables = {}
+        self._conditions = dict((c.id_, c) for c in universe.conditions)
+        self._graphs = {None: self._build_graph(universe.joins)}
+        for context in universe.contexts:
+            context_joins = set(context.joins)
+            self._graphs[context.id_] = self._build_graph(
+                [j for j in universe.joins if j.id_ in context_joins])
+
+    def plan(self, objects):
+        """Return the QueryPlan for a list of objects and conditions
+
+        objects may hold Object or Condition instances, IDs, or
+        ('object', id) and ('condition', id) nodes as in DependencyGraph.
+        Objects and conditions are numbered separately, so a bare ID is an
+        object's if there is one and a condition's otherwise. Raises
+        ValueError for an ID that is neither.
+
+        """
+        items = [self._resolve(o) for o in objects]
+        key = frozenset(self._key(o) for o in items)
+        plan = self._cache.get(key)
+        if plan is not None:
+            self._cache.move_to_end(key)
+            return plan
+        plan = self._plan(items)
+        self._cache[key] = plan
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return plan
+
+    def plan_many(self, object_sets):
+        """Plan a batch of queries, e.g. the queries of saved reports"""
+        return [self.plan(objects) for objects in object_sets]
+
+    def tables_for(self, obj):
+        """Return the IDs of the tables an object needs, including the
+        tables of the objects it references"""
+        key = self._key(obj)
+        tables = self._object_tables.get(key)
+        if tables is None:
+            tables = self._collect_tables(obj)
+            self._object_tables[key] = tables
+        return tables
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._object_tables.clear()
+
+    def _key(self, obj):
+        return (isinstance(obj, Condition), obj.id_)
+
+    def _resolve(self, item):
+        """Return the Object or Condition an item of plan() stands for"""
+        if isinstance(item, tuple):
+            kind, id_ = item
+        elif isinstance(item, int):
+            kind, id_ = None, item
+        else:
+            return item
+        found = None
+        if kind in (None, 'object'):
+            found = self.universe.object_map.get(id_)
+        if found is None and kind in (None, 'condition'):
+            found = self._conditions.get(id_)
+        if found is None:
+            raise ValueError('no %s with ID %r' % (kind or
+                'object or condition', id_))
+        return found
+
+    def _collect_tables(self, obj):
+        """Return the tables of obj and of the objects it references,
+        directly or through other objects; walks the references with an
+        explicit stack, so long chains do not reach the recursion limit"""
+        tables = set()
+        seen = set([self._key(obj)])
+        stack = [obj]
+        while stack:
+            item = stack.pop()
+            tables.update(item.table_refs)
+            object_refs = set(item.object_refs)
+            for sql in (item.select, item.where):
+                if sql:
+                    tables.update(
+                        int(t) for t in self._table_token.findall(sql))
+                    object_refs.update(
+                        int(o) for o in self._object_token.findall(sql))
+            for object_id in object_refs:
+                referenced = self.universe.object_map.get(object_id)
+                if referenced is not None and (False, object_id) not in seen:
+                    seen.add((False, object_id))
+                    stack.append(referenced)
+        return frozenset(tables)
+
+    def _build_graph(self, joins):
+        """Return table_id -> [(table_id, join_id), ...] for a list
+        of joins"""
+        graph = collections.defaultdict(list)
+        for join in joins:
+            tables = sorted(set(table_id for column, table_id in join.terms))
+            for table_id in tables:
+                for other in tables:
+                    if other != table_id:
+                        graph[table_id].append((other, join.id_))
+        return graph
+
+    def _join_tree(self, graph, terminals):
+        """Connect a set of tables with as few joins as possible
+
+        Grows the tree one terminal at a time along the shortest path from
+        the tree built so far (the classic shortest-path Steiner tree
+        heuristic). Returns (tables, joins, unresolved_tables).
+
+        """
+        if len(terminals) <= 1:
+            return set(terminals), set(), set()
+        start = min(terminals)
+        tables = {start}
+        joins = set()
+        remaining = set(terminals) - tables
+        while remaining:
+            parents = dict.fromkeys(tables)
+            queue = collections.deque(sorted(tables))
+            found = None
+            while queue:
+                table_id = queue.popleft()
+                if table_id in remaining:
+                    found = table_id
+                    break
+                for other, join_id in graph.get(table_id, ()):
+                    if other not in parents:
+                        parents[other] = (table_id, join_id)
+                        queue.append(other)
+            if found is None:
+                return tables, joins, remaining
+            while parents[found] is not None:
+                tables.add(found)
+                found, join_id = parents[found]
+                joins.add(join_id)
+            remaining -= tables
+        return tables, joins, set()
+
+    def _statement(self, context_id, items, terminals):
+        tables, joins, unresolved = self._join_tree(
+            self._graphs[context_id], terminals)
+        statement = QueryStatement(context_id, items, sorted(tables),
+            sorted(joins))
+        return statement, unresolved
+
+    def _plan(self, items):
+        item_tables = [(item, self.tables_for(item)) for item in items]
+        terminals = set()
+        for item, tables in item_tables:
+            terminals.update(tables)
+        contexts = self.universe.contexts
+
+        if len(terminals) <= 1 or not contexts:
+            statement, unresolved = self._statement(None, items, terminals)
+            return QueryPlan(items, sorted(terminals), [statement], [],
+                sorted(unresolved))
+
+        candidates = []
+        for context in contexts:
+            statement, unresolved = self._statement(context.id_, items,
+                terminals)
+            if not unresolved:
+                candidates.append(statement)
+        if candidates:
+            best = min(candidates,
+                key=lambda s: (len(s.joins), len(s.tables)))
+            return QueryPlan(items, sorted(terminals), [best],
+                [s.context_id for s in candidates], [])
+
+        # No single context covers the query: give each context the objects
+        # it can answer, largest group first, as Designer does when it
+        # generates one statement per context.
+        statements = []
+        unresolved_tables = set()
+        pending = item_tables
+        while pending:
+            best_context, best_group = None, []
+            for context in contexts:
+                graph = self._graphs[context.id_]
+                group, group_tables = [], set()
+                for item, tables in pending:
+                    merged = group_tables | tables
+                    if not self._join_tree(graph, merged)[2]:
+                        group.append((item, tables))
+                        group_tables = merged
+                if len(group) > len(best_group):
+                    best_context, best_group = context.id_, group
+            if not best_group:
+                best_group = pending
+            group_tables = set()
+            for item, tables in best_group:
+                group_tables.update(tables)
+            if len(group_tables) <= 1:
+                best_context = None
+            statement, unresolved = self._statement(best_context,
+                [item for item, tables in best_group], group_tables)
+            statements.append(statement)
+            unresolved_tables.update(unresolved)
+            grouped = set(id(item) for item, tables in best_group)
+            pending = [(item, tables) for item, tables in pending
+                if id(item) not in grouped]
+        return QueryPlan(items, sorted(terminals), statements,
+            [s.context_id for s in statements], sorted(unresolved_tables))
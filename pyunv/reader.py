@@ -10,16 +10,23 @@ Enhanced by Sanjay Sharma (indoos@gmail.com) 2025-10-17.
 """
 
 import datetime
+import mmap
 import os
-import pdb
 import re
 import struct
 import sys
-import xml.etree.ElementTree as ET
+import zipfile
 
 sys.path.insert(0, '..')
 from pyunv.universe import Universe, Parameters, Class, Join, Object
 from pyunv.universe import Condition, Table, VirtualTable, Column, Context, Link, Hierarchy
+from pyunv.universe import ListOfValues
+from pyunv.dependencies import DependencyGraph
+from pyunv.validation import ValidationEngine, DEFAULT_RULES, table_references
+from pyunv.stats import CountingFile, clock, count_records
+from pyunv.storage import EmbeddedStorage
+from pyunv.buffer import SectionBlob, as_buffer, open_cursor
+from pyunv.sections import SectionDirectory, SectionStatus
 
 # import pyunv
 
@@ -41,185 +48,221 @@ class Reader(object):
         'Upward_Mapping;', 'Upward_Override;', 'Upward_Override_New;',
         'WindowsPageFormat;')
     
-    def __init__(self, f):
+    # (universe attribute, reader method, default, marker) for the sections
+    # that only some universes have; default is a factory for the empty
+    # value. A section is only read when its marker is in the file.
+    _optional_sections = (
+        ('links', 'read_links', list, 'Links;'),
+        ('hierarchies', 'read_hierarchies', list, 'Hierarchies;'),
+        ('parameters_4_1', 'read_parameters_4_1', None, 'Parameters_4_1;'),
+        ('parameters_5_0', 'read_parameters_5_0', None, 'Parameters_5_0;'),
+        ('parameters_11_5', 'read_parameters_11_5', None, 'Parameters_11_5;'),
+        ('object_formats', 'read_object_formats', list, 'Object_Formats;'),
+        ('object_extra_formats', 'read_object_extra_formats', list,
+            'Object_ExtraFormats;'),
+        ('dynamic_class_descriptions', 'read_dynamic_class_descriptions',
+            dict, 'Dynamic_Class_Descriptions;'),
+        ('dynamic_object_descriptions', 'read_dynamic_object_descriptions',
+            dict, 'Dynamic_Object_Descriptions;'),
+        ('dynamic_property_descriptions', 'read_dynamic_property_descriptions',
+            dict, 'Dynamic_Property_Descriptions;'),
+        ('audit_info', 'read_audit_info', None, 'Audit;'),
+        ('dimensions', 'read_dimensions', list, 'Dimensions;'),
+        ('olap_info', 'read_olap_info', None, 'OLAPInfo;'),
+        ('graphical_info', 'read_graphical_info', None, 'Graphical_Info;'),
+        ('crystal_references', 'read_crystal_references', list,
+            'Crystal_References;'),
+        ('xml_lov', 'read_xml_lov', None, 'XML-LOV;'),
+        ('integrity_rules', 'read_integrity_rules', list, 'Integrity;'),
+        ('aggregate_navigation', 'read_aggregate_navigation', None,
+            'AggregateNavigation;'),
+        ('bounded_columns', 'read_bounded_columns', list, 'BoundedColumns;'),
+        ('build_origin_v6', 'read_build_origin_v6', None, 'BuildOrigin_v6;'),
+        ('compulsary_type', 'read_compulsary_type', None, 'CompulsaryType;'),
+        ('deleted_references', 'read_deleted_references', list,
+            'Deleted References;'),
+        ('deleted_history', 'read_deleted_history', list, 'DELETED_HISTORY;'),
+        ('dot_tables', 'read_dot_tables', list, 'Dot_Tables;'),
+        ('downward', 'read_downward', None, 'Downward;'),
+        ('format_locale_sort', 'read_format_locale_sort', None,
+            'FormatLocaleSort;'),
+        ('format_version', 'read_format_version', None, 'FormatVersion;'),
+        ('joins_extensions', 'read_joins_extensions', list,
+            'Joins Extensions;'),
+        ('key_references', 'read_key_references', list, 'Key References;'),
+        ('kernel_page_format', 'read_kernel_page_format', None,
+            'KernelPageFormat;'),
+        ('platform', 'read_platform', None, 'Platform;'),
+        ('unicode_on', 'read_unicode_on', None, 'UNICODE ON;'),
+        ('upward', 'read_upward', None, 'Upward;'),
+        ('upward_local_indexing', 'read_upward_local_indexing', None,
+            'Upward_LocalIndexing;'),
+        ('upward_mapping', 'read_upward_mapping', None, 'Upward_Mapping;'),
+        ('upward_override', 'read_upward_override', None, 'Upward_Override;'),
+        ('upward_override_new', 'read_upward_override_new', None,
+            'Upward_Override_New;'),
+        ('windows_page_format', 'read_windows_page_format', None,
+            'WindowsPageFormat;'),
+    )
+    
+    # (universe attribute, marker) of the sections every universe has; the
+    # parse fails if one of them cannot be read
+    _required_sections = (
+        ('parameters', 'Parameters;'),
+        ('custom_parameters', 'Parameters_6_0;'),
+        ('tables', 'Tables;'),
+        ('virtual_tables', 'Virtual Tables;'),
+        ('columns', 'Columns Id;'),
+        ('joins', 'Joins;'),
+        ('contexts', 'Contexts;'),
+        ('classes', 'Objects;'),
+    )
+    
+    def __init__(self, f, validation_rules=DEFAULT_RULES, stats=None):
+        """Parse a universe from f, an open binary file (or any object with
+        read) or a bytes-like object such as bytes, memoryview or mmap.
+        
+        The universe is read into a buffer once; the section readers work
+        on a cursor over that buffer.
+        """
         super(Reader, self).__init__()
-        self.file = f
-        self.find_content_offsets()
+        self.stats = stats
+        self.source = f
+        self.file = f if stats is None or not hasattr(f, 'read') \
+            else CountingFile(f)
+        self.validation_rules = validation_rules
+        self.buffer = None
+        self.sections = None
+        self.storage = None
+        self._stage('find_content_offsets', self.find_content_offsets,
+            lambda: len(self.content_offsets))
         self.universe = Universe()
-        self.universe.parameters = self.read_parameters()
-        self.universe.custom_parameters = self.read_customparameters()
-        self.universe.tables = self.read_tables()
+        self.universe.sections = self.sections
+        self._read_sections()
+
+        # Perform additional analysis
+        self._stage('parse_unw_storage_data', self.parse_unw_storage_data)
+        self._stage('parse_resource_header_data', 
+            self.parse_resource_header_data)
+        self._stage('perform_cross_reference_analysis', 
+            self.perform_cross_reference_analysis,
+            lambda: len(self.universe.cross_references))
+        self._stage('perform_validation_checks', 
+            self.perform_validation_checks,
+            lambda: len(self.universe.validation_errors))
+        self._stage('perform_dependency_analysis', 
+            self.perform_dependency_analysis,
+            lambda: len(self.universe.dependency_graph))
+        self._stage('perform_enhanced_analysis', 
+            self.perform_enhanced_analysis)
+
+    def _read_sections(self):
+        """Decode the sections one after another over the Reader's file"""
+        self.universe.parameters = self._stage('read_parameters', 
+            self.read_parameters)
+        self.universe.custom_parameters = self._stage('read_customparameters',
+            self.read_customparameters)
+        self.universe.tables = self._stage('read_tables', self.read_tables)
         self.universe.build_table_map()
-        self.universe.virtual_tables = self.read_virtual_tables()
-        self.universe.columns = self.read_columns()
+        self.universe.virtual_tables = self._stage('read_virtual_tables',
+            self.read_virtual_tables)
+        self.universe.columns = self._stage('read_columns', self.read_columns)
         self.universe.columns.sort(key=lambda c: c.id_)
         #self.universe.column_attributes = self.read_column_attributes()
-        self.universe.joins = self.read_joins()
-        self.universe.contexts = self.read_contexts()
-        self.universe.links = self.read_links()
-        try:
-            self.universe.hierarchies = self.read_hierarchies()
-        except:
-            self.universe.hierarchies = []
-        # Read additional parameter versions
-        try:
-            self.universe.parameters_4_1 = self.read_parameters_4_1()
-        except:
-            self.universe.parameters_4_1 = None
-        try:
-            self.universe.parameters_5_0 = self.read_parameters_5_0()
-        except:
-            self.universe.parameters_5_0 = None
-        try:
-            self.universe.parameters_11_5 = self.read_parameters_11_5()
-        except:
-            self.universe.parameters_11_5 = None
-        # Read formatting information
-        try:
-            self.universe.object_formats = self.read_object_formats()
-        except:
-            self.universe.object_formats = []
-        try:
-            self.universe.object_extra_formats = self.read_object_extra_formats()
-        except:
-            self.universe.object_extra_formats = []
-        # Read dynamic descriptions
-        try:
-            self.universe.dynamic_class_descriptions = self.read_dynamic_class_descriptions()
-        except:
-            self.universe.dynamic_class_descriptions = {}
-        try:
-            self.universe.dynamic_object_descriptions = self.read_dynamic_object_descriptions()
-        except:
-            self.universe.dynamic_object_descriptions = {}
-        try:
-            self.universe.dynamic_property_descriptions = self.read_dynamic_property_descriptions()
-        except:
-            self.universe.dynamic_property_descriptions = {}
-        # Read audit and metadata
-        try:
-            self.universe.audit_info = self.read_audit_info()
-        except:
-            self.universe.audit_info = None
-        try:
-            self.universe.dimensions = self.read_dimensions()
-        except:
-            self.universe.dimensions = []
-        try:
-            self.universe.olap_info = self.read_olap_info()
-        except:
-            self.universe.olap_info = None
-        try:
-            self.universe.graphical_info = self.read_graphical_info()
-        except:
-            self.universe.graphical_info = None
-        try:
-            self.universe.crystal_references = self.read_crystal_references()
-        except:
-            self.universe.crystal_references = []
-        try:
-            self.universe.xml_lov = self.read_xml_lov()
-        except:
-            self.universe.xml_lov = None
-        try:
-            self.universe.integrity_rules = self.read_integrity_rules()
-        except:
-            self.universe.integrity_rules = []
-        # Read additional metadata sections
-        try:
-            self.universe.aggregate_navigation = self.read_aggregate_navigation()
-        except:
-            self.universe.aggregate_navigation = None
-        try:
-            self.universe.bounded_columns = self.read_bounded_columns()
-        except:
-            self.universe.bounded_columns = []
-        try:
-            self.universe.build_origin_v6 = self.read_build_origin_v6()
-        except:
-            self.universe.build_origin_v6 = None
-        try:
-            self.universe.compulsary_type = self.read_compulsary_type()
-        except:
-            self.universe.compulsary_type = None
-        try:
-            self.universe.deleted_references = self.read_deleted_references()
-        except:
-            self.universe.deleted_references = []
-        try:
-            self.universe.deleted_history = self.read_deleted_history()
-        except:
-            self.universe.deleted_history = []
-        try:
-            self.universe.dot_tables = self.read_dot_tables()
-        except:
-            self.universe.dot_tables = []
-        try:
-            self.universe.downward = self.read_downward()
-        except:
-            self.universe.downward = None
-        try:
-            self.universe.format_locale_sort = self.read_format_locale_sort()
-        except:
-            self.universe.format_locale_sort = None
-        try:
-            self.universe.format_version = self.read_format_version()
-        except:
-            self.universe.format_version = None
-        try:
-            self.universe.joins_extensions = self.read_joins_extensions()
-        except:
-            self.universe.joins_extensions = []
-        try:
-            self.universe.key_references = self.read_key_references()
-        except:
-            self.universe.key_references = []
-        try:
-            self.universe.kernel_page_format = self.read_kernel_page_format()
-        except:
-            self.universe.kernel_page_format = None
-        try:
-            self.universe.platform = self.read_platform()
-        except:
-            self.universe.platform = None
-        try:
-            self.universe.unicode_on = self.read_unicode_on()
-        except:
-            self.universe.unicode_on = None
-        try:
-            self.universe.upward = self.read_upward()
-        except:
-            self.universe.upward = None
-        try:
-            self.universe.upward_local_indexing = self.read_upward_local_indexing()
-        except:
-            self.universe.upward_local_indexing = None
-        try:
-            self.universe.upward_mapping = self.read_upward_mapping()
-        except:
-            self.universe.upward_mapping = None
-        try:
-            self.universe.upward_override = self.read_upward_override()
-        except:
-            self.universe.upward_override = None
-        try:
-            self.universe.upward_override_new = self.read_upward_override_new()
-        except:
-            self.universe.upward_override_new = None
-        try:
-            self.universe.windows_page_format = self.read_windows_page_format()
-        except:
-            self.universe.windows_page_format = None
-        self.universe.classes = self.read_classes()
+        self.universe.joins = self._stage('read_joins', self.read_joins)
+        self.universe.contexts = self._stage('read_contexts', 
+            self.read_contexts)
+        self._read_optional_sections(
+            lambda method: self._stage(method, getattr(self, method)))
+        self.universe.classes = self._stage('read_classes', self.read_classes)
+        self._record_required_sections()
+        self.universe.build_class_index()
         self.universe.build_object_map()
 
-        # Perform additional analysis
-        self.parse_unw_storage_data()
-        self.parse_resource_header_data()
-        self.perform_cross_reference_analysis()
-        self.perform_validation_checks()
-        self.perform_dependency_analysis()
-        self.perform_enhanced_analysis()
+    def _read_optional_sections(self, read):
+        """Set every optional section on the Universe and record its
+        SectionStatus in universe.section_status
+        
+        read(method) returns the result of a section reader. A section
+        whose marker is not in the file is missing and not read at all; one
+        whose reader raises is failed, with the error as the reason. Either
+        way the section gets its default value and the parse goes on.
+        """
+        u = self.universe
+        for attribute, method, default, marker in Reader._optional_sections:
+            if marker not in self.sections:
+                value = default() if default else None
+                status = SectionStatus(attribute, marker, 'missing', None)
+            else:
+                try:
+                    value = read(method)
+                    status = SectionStatus(attribute, marker, 'ok', None)
+                except Exception as error:
+                    value = default() if default else None
+                    status = SectionStatus(attribute, marker, 'failed',
+                        '%s: %s' % (type(error).__name__, error))
+            setattr(u, attribute, value)
+            u.section_status[attribute] = status
+
+    def _record_required_sections(self):
+        """Record the status of the required sections, which were read: ok,
+        or missing if the file has no such section. They are never failed;
+        a required section whose reader raises fails the whole Reader."""
+        for attribute, marker in Reader._required_sections:
+            self.universe.section_status[attribute] = SectionStatus(
+                attribute, marker,
+                'ok' if marker in self.sections else 'missing', None)
+
+    def _stage(self, name, method, records=None):
+        """Run one stage of the parse, recording its statistics when
+        instrumentation is on. A stage that returns a SectionBlob reads
+        nothing through the file; the length of its section (from the
+        SectionDirectory) is recorded as the bytes it consumed."""
+        if self.stats is None:
+            return method()
+        f = self.file
+        bytes_before = getattr(f, 'bytes_read', 0)
+        started = clock()
+        result = None
+        try:
+            result = method()
+        finally:
+            elapsed = clock() - started
+            bytes_read = getattr(f, 'bytes_read', 0) - bytes_before
+            if isinstance(result, SectionBlob):
+                bytes_read = result.length
+            self.stats.record(name, elapsed, bytes_read,
+                records() if records else count_records(result))
+        return result
+
+    @classmethod
+    def from_bytes(cls, data, **kwargs):
+        """Parse a universe held in memory (bytes, bytearray, memoryview)"""
+        return cls(data, **kwargs)
+
+    @classmethod
+    def from_path(cls, path, **kwargs):
+        """Parse a universe file through a read-only memory map
+        
+        The universe's raw section blobs are views of the map, which stays
+        open as long as they do.
+        """
+        with open(path, 'rb') as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # empty files and files that cannot be mapped
+                data = f.read()
+        return cls(data, **kwargs)
+
+    @classmethod
+    def from_zip_member(cls, archive, name, **kwargs):
+        """Parse a universe stored in a zip archive; archive is a path, a
+        file object or a zipfile.ZipFile"""
+        if isinstance(archive, zipfile.ZipFile):
+            return cls(archive.read(name), **kwargs)
+        with zipfile.ZipFile(archive) as z:
+            return cls(z.read(name), **kwargs)
 
     def find_content_offsets(self):
         """find the offsets of the object, table, and column definitions 
@@ -232,7 +275,13 @@ class Reader(object):
         """
         
         self.content_offsets = dict()
-        contents = self.file.read()
+        found = dict()
+        # an mmap has read too, but is searched (and viewed) in place
+        if hasattr(self.source, 'read') and not isinstance(self.source,
+                (bytes, bytearray, memoryview, mmap.mmap)):
+            contents = self.file.read()
+        else:
+            contents = as_buffer(self.source)
         for marker in Reader._content_markers:
             marker_bytes = b'\x00' + marker.encode('utf-8')
             begin = contents.find(marker_bytes)
@@ -242,7 +291,15 @@ class Reader(object):
                 begin = contents.find(marker_bytes, end+20)
                 end = begin + len(marker_bytes)
             self.content_offsets[marker] = end
-        del contents
+            if begin != -1:
+                found[marker] = end
+        # section blobs are views of this buffer
+        self.buffer = contents
+        self.sections = SectionDirectory.build(contents, found)
+        self.storage = EmbeddedStorage.find(contents)
+        self.file = open_cursor(contents)
+        if self.stats is not None:
+            self.file = CountingFile(self.file)
         return
     
     def read_parameters(self):
@@ -449,7 +506,7 @@ class Reader(object):
         self.file.seek(self.content_offsets['Objects;'])
         class_count, object_count, condition_count, rootclass_count, = \
             struct.unpack('<4I', self.file.read(16))
-        return [self.read_class(None) for x in range(rootclass_count)]
+        return self.read_class_tree(None, rootclass_count)
         
     def read_table(self, schema):
         """read a table definition from the universe file
@@ -505,9 +562,9 @@ class Reader(object):
         return Column(id_, name, parent, self.universe)
 
     def read_class(self, parent):
-        """read a BusinessObjects class definition from the universe file
+        """read a BusinessObjects class definition, with its subclasses,
+        from the universe file
 
-        I subclass_count
         I id
         S name
         I parent_id
@@ -517,9 +574,34 @@ class Reader(object):
         ???B objects
         I condition_count
         ???B conditions
+        I subclass_count
         ???B subclasses
 
         """
+        return self.read_class_tree(parent, 1)[0]
+
+    def read_class_tree(self, parent, count):
+        """read count classes and their subclasses, which are stored in 
+        pre-order, and return the top ones
+        
+        The subclasses still to read at each level are kept on an explicit
+        stack, so deep hierarchies do not reach the recursion limit.
+        """
+        classes = []
+        stack = [(parent, classes, count)]
+        while stack:
+            parent, siblings, remaining = stack.pop()
+            if not remaining:
+                continue
+            stack.append((parent, siblings, remaining - 1))
+            c, subclass_count = self._read_class_record(parent)
+            siblings.append(c)
+            stack.append((c, c.subclasses, subclass_count))
+        return classes
+
+    def _read_class_record(self, parent):
+        """read a class up to its subclasses; returns the class and its 
+        subclass count"""
         id_, = struct.unpack('<I', self.file.read(4))
         name = self.read_string()
         parent_id, = struct.unpack('<I', self.file.read(4))
@@ -535,8 +617,7 @@ class Reader(object):
         condition_count, = struct.unpack('<I', self.file.read(4))
         c.conditions = [self.read_condition(c) for x in range(condition_count)]
         subclass_count, = struct.unpack('<I', self.file.read(4))
-        c.subclasses = [self.read_class(c) for x in range(subclass_count)]
-        return c
+        return c, subclass_count
 
     def read_object(self, parent):
         """read a BusinessObjects object definition from the universe file
@@ -545,10 +626,11 @@ class Reader(object):
         S name
         I parent_id
         S description
-        H select_table_count
-        ?I select_table_ids (repeats select_table_count times)
-        H where_table_count
-        ?I where_table_ids (repeats where_table_count times)
+        H table_count
+        ?I table_ids (repeats table_count times)
+        H object_count
+        ?I object_ids (repeats object_count times, objects referenced 
+            with 02 nn* in select or where)
         S select (starts 03 nn* 2E)
         S where (starts 02 nn* 20)
         S format
@@ -568,12 +650,12 @@ class Reader(object):
             assert(parent_id == 0)
         description = self.read_string()
         o = Object(self.universe, id_, parent, name, description)
-        select_tablecount, = struct.unpack('<H', self.file.read(2))
-        struct.unpack('<%dI' % select_tablecount, 
-            self.file.read(4 * select_tablecount))
-        where_tablecount, = struct.unpack('<H', self.file.read(2))
-        struct.unpack('<%dI' % where_tablecount, 
-            self.file.read(4 * where_tablecount))
+        table_count, = struct.unpack('<H', self.file.read(2))
+        o.select_table_refs = list(struct.unpack('<%dI' % table_count, 
+            self.file.read(4 * table_count)))
+        object_count, = struct.unpack('<H', self.file.read(2))
+        o.object_refs = list(struct.unpack('<%dI' % object_count, 
+            self.file.read(4 * object_count)))
         o.select = self.read_string()
         o.where = self.read_string()
         o.format = self.read_string()
@@ -595,8 +677,9 @@ class Reader(object):
         S description
         H where_tablecount
         ?I where_table_ids (repeats where_tablecount times)
-        H unknown_tablecount
-        ?I table_ids (repeats unknown_tablecount times)
+        H object_count
+        ?I object_ids (repeats object_count times, objects referenced 
+            with 02 nn* in where)
         S where
 
         """
@@ -610,11 +693,11 @@ class Reader(object):
         description = self.read_string()
         c = Condition(self.universe, id_, parent, name, description)
         where_tablecount, = struct.unpack('<H', self.file.read(2))
-        struct.unpack('<%dI' % where_tablecount, 
-            self.file.read(4 * where_tablecount))
-        unknown_tablecount, = struct.unpack('<H', self.file.read(2))
-        struct.unpack('<%dI' % unknown_tablecount, 
-            self.file.read(4 * unknown_tablecount))
+        c.where_table_refs = list(struct.unpack('<%dI' % where_tablecount, 
+            self.file.read(4 * where_tablecount)))
+        object_count, = struct.unpack('<H', self.file.read(2))
+        c.object_refs = list(struct.unpack('<%dI' % object_count, 
+            self.file.read(4 * object_count)))
         c.where = self.read_string()
         return c
 
@@ -723,566 +806,245 @@ class Reader(object):
 
     def read_parameters_4_1(self):
         """Read Parameters_4_1 section"""
-        if 'Parameters_4_1;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Parameters_4_1;'])
-        # Read the binary data
-        length = self._get_section_length('Parameters_4_1;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Parameters_4_1;')
 
     def read_parameters_5_0(self):
         """Read Parameters_5_0 section"""
-        if 'Parameters_5_0;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Parameters_5_0;'])
-        length = self._get_section_length('Parameters_5_0;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Parameters_5_0;')
 
     def read_parameters_11_5(self):
         """Read Parameters_11_5 section"""
-        if 'Parameters_11_5;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Parameters_11_5;'])
-        length = self._get_section_length('Parameters_11_5;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Parameters_11_5;')
 
     def read_object_formats(self):
         """Read Object_Formats section"""
-        if 'Object_Formats;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Object_Formats;'])
-        length = self._get_section_length('Object_Formats;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Object_Formats;', [])
 
     def read_object_extra_formats(self):
         """Read Object_ExtraFormats section"""
-        if 'Object_ExtraFormats;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Object_ExtraFormats;'])
-        length = self._get_section_length('Object_ExtraFormats;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Object_ExtraFormats;', [])
 
     def read_dynamic_class_descriptions(self):
         """Read Dynamic_Class_Descriptions section"""
-        if 'Dynamic_Class_Descriptions;' not in self.content_offsets:
-            return {}
-        self.file.seek(self.content_offsets['Dynamic_Class_Descriptions;'])
-        length = self._get_section_length('Dynamic_Class_Descriptions;')
-        if length > 0:
-            return self.file.read(length)
-        return {}
+        return self._read_section_blob('Dynamic_Class_Descriptions;', {})
 
     def read_dynamic_object_descriptions(self):
         """Read Dynamic_Object_Descriptions section"""
-        if 'Dynamic_Object_Descriptions;' not in self.content_offsets:
-            return {}
-        self.file.seek(self.content_offsets['Dynamic_Object_Descriptions;'])
-        length = self._get_section_length('Dynamic_Object_Descriptions;')
-        if length > 0:
-            return self.file.read(length)
-        return {}
+        return self._read_section_blob('Dynamic_Object_Descriptions;', {})
 
     def read_dynamic_property_descriptions(self):
         """Read Dynamic_Property_Descriptions section"""
-        if 'Dynamic_Property_Descriptions;' not in self.content_offsets:
-            return {}
-        self.file.seek(self.content_offsets['Dynamic_Property_Descriptions;'])
-        length = self._get_section_length('Dynamic_Property_Descriptions;')
-        if length > 0:
-            return self.file.read(length)
-        return {}
+        return self._read_section_blob('Dynamic_Property_Descriptions;', {})
 
     def read_audit_info(self):
         """Read Audit information"""
-        if 'Audit;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Audit;'])
-        length = self._get_section_length('Audit;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Audit;')
 
     def read_dimensions(self):
         """Read Dimensions section"""
-        if 'Dimensions;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Dimensions;'])
-        length = self._get_section_length('Dimensions;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Dimensions;', [])
 
     def read_olap_info(self):
         """Read OLAP information"""
-        if 'OLAPInfo;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['OLAPInfo;'])
-        length = self._get_section_length('OLAPInfo;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('OLAPInfo;')
 
     def read_graphical_info(self):
         """Read Graphical information"""
-        if 'Graphical_Info;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Graphical_Info;'])
-        length = self._get_section_length('Graphical_Info;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Graphical_Info;')
 
     def read_crystal_references(self):
         """Read Crystal References"""
-        if 'Crystal_References;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Crystal_References;'])
-        length = self._get_section_length('Crystal_References;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Crystal_References;', [])
 
     def read_xml_lov(self):
         """Read XML LOV information"""
-        if 'XML-LOV;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['XML-LOV;'])
-        length = self._get_section_length('XML-LOV;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('XML-LOV;')
 
     def read_integrity_rules(self):
         """Read Integrity rules"""
-        if 'Integrity;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Integrity;'])
-        length = self._get_section_length('Integrity;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Integrity;', [])
 
     def read_aggregate_navigation(self):
         """Read Aggregate Navigation information"""
-        if 'AggregateNavigation;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['AggregateNavigation;'])
-        length = self._get_section_length('AggregateNavigation;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('AggregateNavigation;')
 
     def read_bounded_columns(self):
         """Read Bounded Columns information"""
-        if 'BoundedColumns;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['BoundedColumns;'])
-        length = self._get_section_length('BoundedColumns;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('BoundedColumns;', [])
 
     def read_build_origin_v6(self):
         """Read Build Origin V6 information"""
-        if 'BuildOrigin_v6;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['BuildOrigin_v6;'])
-        length = self._get_section_length('BuildOrigin_v6;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('BuildOrigin_v6;')
 
     def read_compulsary_type(self):
         """Read Compulsary Type information"""
-        if 'CompulsaryType;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['CompulsaryType;'])
-        length = self._get_section_length('CompulsaryType;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('CompulsaryType;')
 
     def read_deleted_references(self):
         """Read Deleted References"""
-        if 'Deleted References;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Deleted References;'])
-        length = self._get_section_length('Deleted References;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Deleted References;', [])
 
     def read_deleted_history(self):
         """Read Deleted History"""
-        if 'DELETED_HISTORY;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['DELETED_HISTORY;'])
-        length = self._get_section_length('DELETED_HISTORY;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('DELETED_HISTORY;', [])
 
     def read_dot_tables(self):
         """Read Dot Tables information"""
-        if 'Dot_Tables;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Dot_Tables;'])
-        length = self._get_section_length('Dot_Tables;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Dot_Tables;', [])
 
     def read_downward(self):
         """Read Downward information"""
-        if 'Downward;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Downward;'])
-        length = self._get_section_length('Downward;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Downward;')
 
     def read_format_locale_sort(self):
         """Read Format Locale Sort information"""
-        if 'FormatLocaleSort;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['FormatLocaleSort;'])
-        length = self._get_section_length('FormatLocaleSort;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('FormatLocaleSort;')
 
     def read_format_version(self):
         """Read Format Version information"""
-        if 'FormatVersion;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['FormatVersion;'])
-        length = self._get_section_length('FormatVersion;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('FormatVersion;')
 
     def read_joins_extensions(self):
         """Read Joins Extensions"""
-        if 'Joins Extensions;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Joins Extensions;'])
-        length = self._get_section_length('Joins Extensions;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Joins Extensions;', [])
 
     def read_key_references(self):
         """Read Key References"""
-        if 'Key References;' not in self.content_offsets:
-            return []
-        self.file.seek(self.content_offsets['Key References;'])
-        length = self._get_section_length('Key References;')
-        if length > 0:
-            return self.file.read(length)
-        return []
+        return self._read_section_blob('Key References;', [])
 
     def read_kernel_page_format(self):
         """Read Kernel Page Format information"""
-        if 'KernelPageFormat;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['KernelPageFormat;'])
-        length = self._get_section_length('KernelPageFormat;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('KernelPageFormat;')
 
     def read_platform(self):
         """Read Platform information"""
-        if 'Platform;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Platform;'])
-        length = self._get_section_length('Platform;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Platform;')
 
     def read_unicode_on(self):
         """Read Unicode On information"""
-        if 'UNICODE ON;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['UNICODE ON;'])
-        length = self._get_section_length('UNICODE ON;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('UNICODE ON;')
 
     def read_upward(self):
         """Read Upward information"""
-        if 'Upward;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Upward;'])
-        length = self._get_section_length('Upward;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Upward;')
 
     def read_upward_local_indexing(self):
         """Read Upward Local Indexing information"""
-        if 'Upward_LocalIndexing;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Upward_LocalIndexing;'])
-        length = self._get_section_length('Upward_LocalIndexing;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Upward_LocalIndexing;')
 
     def read_upward_mapping(self):
         """Read Upward Mapping information"""
-        if 'Upward_Mapping;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Upward_Mapping;'])
-        length = self._get_section_length('Upward_Mapping;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Upward_Mapping;')
 
     def read_upward_override(self):
         """Read Upward Override information"""
-        if 'Upward_Override;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Upward_Override;'])
-        length = self._get_section_length('Upward_Override;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Upward_Override;')
 
     def read_upward_override_new(self):
         """Read Upward Override New information"""
-        if 'Upward_Override_New;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['Upward_Override_New;'])
-        length = self._get_section_length('Upward_Override_New;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('Upward_Override_New;')
 
     def read_windows_page_format(self):
         """Read Windows Page Format information"""
-        if 'WindowsPageFormat;' not in self.content_offsets:
-            return None
-        self.file.seek(self.content_offsets['WindowsPageFormat;'])
-        length = self._get_section_length('WindowsPageFormat;')
-        if length > 0:
-            return self.file.read(length)
-        return None
+        return self._read_section_blob('WindowsPageFormat;')
 
     def _get_section_length(self, marker):
-        """Helper method to calculate section length"""
-        current_pos = self.file.tell()
-        # Find the next marker or end of file
-        next_markers = [m for m in self.content_offsets.keys() if self.content_offsets[m] > current_pos]
-        if next_markers:
-            next_pos = min(self.content_offsets[m] for m in next_markers)
-            return next_pos - current_pos
-        else:
-            # Last section, read to end
-            self.file.seek(0, 2)  # Seek to end
-            end_pos = self.file.tell()
-            self.file.seek(current_pos)
-            return end_pos - current_pos
+        """Return the length of a section, from the section directory"""
+        section = self.sections.get(marker)
+        if section is not None:
+            return section.length
+        return self.sections.length_from(self.content_offsets[marker])
+
+    def _read_section_blob(self, marker, empty=None):
+        """Return a SectionBlob over the raw bytes of a section, or empty
+        if the universe has no such section"""
+        if marker not in self.sections:
+            return empty
+        length = self._get_section_length(marker)
+        if length > 0:
+            return SectionBlob(self.buffer, self.content_offsets[marker],
+                length)
+        return empty
 
     # Enhanced parsing methods for UNW_Storage and ResourceHeader data
 
     def parse_unw_storage_data(self):
-        """Parse structured data from UNW_Storage directory if available"""
-        unw_storage_path = self._get_unw_storage_path()
-        if not unw_storage_path:
+        """Parse structured data from the UNW_Storage folder if available"""
+        folder = self._get_unw_storage()
+        if folder is None:
             return
-
-        # Parse connection information
-        self.universe.unw_connection_info = self._parse_unw_connection(unw_storage_path)
-
-        # Parse parameters
-        self.universe.unw_parameters = self._parse_unw_parameters(unw_storage_path)
-
-        # Parse objects formats
-        self.universe.unw_objects_formats = self._parse_unw_objects_formats(unw_storage_path)
-
-        # Parse hidden items
-        self.universe.unw_hidden_items = self._parse_unw_hidden_items(unw_storage_path)
-
-        # Parse custom LOV
-        self.universe.unw_custom_lov = self._parse_unw_custom_lov(unw_storage_path)
+        u = self.universe
+        u.unw_connection_info = self._parse_storage_entry(folder,
+            'Connection/Connection', self._extract_connection_info)
+        u.unw_parameters = self._parse_storage_entry(folder,
+            'Parameters/Parameters', self._extract_parameters, {})
+        u.unw_objects_formats = self._parse_storage_entry(folder,
+            'Objects Formats/Objects Formats', self._extract_formats, {})
+        u.unw_hidden_items = self._parse_storage_entry(folder,
+            'Hidden_Items/Hidden_Items', self._extract_hidden_items, {})
+        u.unw_custom_lov = self._parse_storage_entry(folder,
+            'Customized_LOV/Customized_LOV', self._extract_lov, [])
 
     def parse_resource_header_data(self):
-        """Parse structured data from ResourceHeader directory if available"""
-        resource_path = self._get_resource_header_path()
-        if not resource_path:
+        """Parse structured data from the ResourceHeader folder if available"""
+        folder = self._get_resource_header()
+        if folder is None:
             return
+        u = self.universe
+        u.resource_descriptor = self._parse_storage_entry(folder,
+            'Descriptor;', self._extract_descriptor_info)
+        u.resource_b_descriptor = self._parse_storage_entry(folder,
+            'B-Descriptor;')
+        u.resource_t_descriptor = self._parse_storage_entry(folder,
+            'T-Descriptor;')
+
+    def _get_unw_storage(self):
+        """Return the UNW_Storage folder of the embedded zip, or None"""
+        if self.storage is None:
+            return None
+        return self.storage.folder('UNW_Storage')
 
-        # Parse descriptor
-        self.universe.resource_descriptor = self._parse_resource_descriptor(resource_path)
-
-        # Parse B-descriptor
-        self.universe.resource_b_descriptor = self._parse_resource_b_descriptor(resource_path)
-
-        # Parse T-descriptor
-        self.universe.resource_t_descriptor = self._parse_resource_t_descriptor(resource_path)
-
-    def _get_unw_storage_path(self):
-        """Get path to UNW_Storage directory if it exists"""
-        # This would need to be implemented based on how the unzipped data is accessed
-        # For now, return None as we don't have direct file system access in this context
-        return None
-
-    def _get_resource_header_path(self):
-        """Get path to ResourceHeader directory if it exists"""
-        # Similar to above
-        return None
-
-    def _parse_unw_connection(self, base_path):
-        """Parse connection information from UNW_Storage/Connection"""
-        try:
-            connection_file = os.path.join(base_path, "Connection", "Connection")
-            if os.path.exists(connection_file):
-                with open(connection_file, 'rb') as f:
-                    data = f.read()
-                    # Try to extract readable connection information
-                    return self._extract_connection_info(data)
-        except:
-            pass
-        return None
-
-    def _parse_unw_parameters(self, base_path):
-        """Parse parameters from UNW_Storage/Parameters"""
-        params = {}
-        try:
-            param_file = os.path.join(base_path, "Parameters", "Parameters")
-            if os.path.exists(param_file):
-                with open(param_file, 'rb') as f:
-                    data = f.read()
-                    # Try to extract parameter key-value pairs
-                    params = self._extract_parameters(data)
-        except:
-            pass
-        return params
-
-    def _parse_unw_objects_formats(self, base_path):
-        """Parse objects formats from UNW_Storage/Objects Formats"""
-        formats = {}
-        try:
-            format_file = os.path.join(base_path, "Objects Formats", "Objects Formats")
-            if os.path.exists(format_file):
-                with open(format_file, 'rb') as f:
-                    data = f.read()
-                    # Try to extract format information
-                    formats = self._extract_formats(data)
-        except:
-            pass
-        return formats
-
-    def _parse_unw_hidden_items(self, base_path):
-        """Parse hidden items from UNW_Storage/Hidden_Items"""
-        hidden = []
-        try:
-            hidden_file = os.path.join(base_path, "Hidden_Items", "Hidden_Items")
-            if os.path.exists(hidden_file):
-                with open(hidden_file, 'rb') as f:
-                    data = f.read()
-                    # Try to extract hidden item IDs
-                    hidden = self._extract_hidden_items(data)
-        except:
-            pass
-        return hidden
-
-    def _parse_unw_custom_lov(self, base_path):
-        """Parse custom LOV from UNW_Storage/Customized_LOV"""
-        lov = []
-        try:
-            lov_file = os.path.join(base_path, "Customized_LOV", "Customized_LOV")
-            if os.path.exists(lov_file):
-                with open(lov_file, 'rb') as f:
-                    data = f.read()
-                    # Try to extract LOV information
-                    lov = self._extract_lov(data)
-        except:
-            pass
-        return lov
-
-    def _parse_resource_descriptor(self, base_path):
-        """Parse descriptor from ResourceHeader/Descriptor"""
-        try:
-            desc_file = os.path.join(base_path, "Descriptor;")
-            if os.path.exists(desc_file):
-                with open(desc_file, 'rb') as f:
-                    data = f.read()
-                    return self._extract_descriptor_info(data)
-        except:
-            pass
-        return None
-
-    def _parse_resource_b_descriptor(self, base_path):
-        """Parse B-descriptor from ResourceHeader/B-Descriptor"""
-        try:
-            desc_file = os.path.join(base_path, "B-Descriptor;")
-            if os.path.exists(desc_file):
-                with open(desc_file, 'rb') as f:
-                    return f.read()
-        except:
-            pass
-        return None
-
-    def _parse_resource_t_descriptor(self, base_path):
-        """Parse T-descriptor from ResourceHeader/T-Descriptor"""
+    def _get_resource_header(self):
+        """Return the ResourceHeader folder of the embedded zip, or None"""
+        if self.storage is None:
+            return None
+        return self.storage.folder('ResourceHeader|')
+
+    def _parse_storage_entry(self, folder, name, extract=None, default=None):
+        """Read an entry of a storage folder and pass a copy of its data to
+        extract. Returns default if the entry is missing or malformed."""
+        data = folder.read(name)
+        if data is None:
+            return default
+        data = bytes(data)
+        if extract is None:
+            return data
         try:
-            desc_file = os.path.join(base_path, "T-Descriptor;")
-            if os.path.exists(desc_file):
-                with open(desc_file, 'rb') as f:
-                    return f.read()
-        except:
-            pass
-        return None
+            return extract(data)
+        except (struct.error, ValueError, IndexError):
+            return default
 
     def _extract_connection_info(self, data):
-        """Extract readable connection information from binary data"""
-        try:
-            # Look for common patterns in connection data
-            info = {}
-            # Try to find database name, server, etc.
-            data_str = data.decode('utf-8', errors='ignore')
-
-            # Extract database engine
-            if 'MS SQL Server' in data_str:
-                info['database_engine'] = 'MS SQL Server 2019'
-
-            # Extract database name (look for common patterns)
-            import re
-            db_match = re.search(r'([a-zA-Z_][a-zA-Z0-9_]{0,127})', data_str)
-            if db_match:
-                info['database_name'] = db_match.group(1)
-
-            return info if info else data
-        except:
-            return data
+        """Extract the database engine from a Connection entry
+        
+        The entry starts with its length, four zero bytes and the engine
+        name as a length-prefixed string; the rest is encrypted.
+        """
+        info = {}
+        length, = struct.unpack_from('<I', data, 8)
+        engine = data[12:12 + length]
+        if length and len(engine) == length:
+            info['database_engine'] = engine.decode('latin-1')
+        return info if info else data
 
     def _extract_parameters(self, data):
         """Extract parameter key-value pairs from binary data"""
         params = {}
-        try:
-            data_str = data.decode('utf-8', errors='ignore')
-            # Look for parameter patterns like KEY=VALUE
-            import re
-            param_matches = re.findall(r'([A-Z_]+)=([^=\n\r]+)', data_str)
-            for key, value in param_matches:
-                params[key.strip()] = value.strip()
-        except:
-            pass
+        data_str = data.decode('utf-8', errors='ignore')
+        # Look for parameter patterns like KEY=VALUE
+        param_matches = re.findall(r'([A-Z_]+)=([^=\n\r]+)', data_str)
+        for key, value in param_matches:
+            params[key.strip()] = value.strip()
         return params
 
     def _extract_formats(self, data):
@@ -1291,56 +1053,72 @@ class Reader(object):
         # For now, return the raw data
         return data
 
+    # the lists of IDs in a Hidden_Items entry, in order
+    hidden_item_kinds = ('classes', 'objects', 'conditions', 'other')
+
     def _extract_hidden_items(self, data):
-        """Extract hidden item IDs from binary data"""
-        hidden = []
-        try:
-            # Hidden items are likely stored as a list of IDs
-            # This would need format-specific parsing
-            pass
-        except:
-            pass
-        return hidden
+        """Extract the IDs of the hidden classes, objects and conditions
+        
+        4 times:
+            I count
+            count times:
+                I id
+        
+        eFashion hides its two Sales conditions in the third list; the
+        fourth is empty in every sample universe.
+        """
+        items = {}
+        offset = 0
+        for kind in Reader.hidden_item_kinds:
+            count, = struct.unpack_from('<I', data, offset)
+            items[kind] = list(struct.unpack_from('<%dI' % count, data,
+                offset + 4))
+            offset += 4 + 4 * count
+        return items
 
     def _extract_lov(self, data):
         """Extract LOV information from binary data"""
-        lov = []
-        try:
-            # LOV data structure parsing would be needed here
-            pass
-        except:
-            pass
-        return lov
+        # LOV data structure parsing would be needed here
+        return []
 
     def _extract_descriptor_info(self, data):
-        """Extract descriptor information from binary data"""
-        try:
-            data_str = data.decode('utf-8', errors='ignore')
-            info = {}
-
-            # Extract universe name
-            if 'Univers5' in data_str:
-                info['universe_name'] = 'Univers5'
-
-            # Extract other metadata
-            if 'Administrator' in data_str:
-                info['created_by'] = 'Administrator'
-
-            return info
-        except:
-            return data
+        """Extract the repository id and universe name from a Descriptor
+        
+        The descriptor starts with the application name, two short
+        integers, the repository id and the universe name; strings are
+        prefixed with a short length.
+        """
+        strings = []
+        offset = 0
+        while len(strings) < 3:
+            length, = struct.unpack_from('<H', data, offset)
+            strings.append(data[offset + 2:offset + 2 + length].decode(
+                'latin-1'))
+            offset += 2 + length
+            if len(strings) == 1:
+                # skip the two short integers after the application name
+                offset += 4
+        info = {}
+        info['application'], info['repository_id'], \
+            info['universe_name'] = strings
+        return info
 
     # Analysis methods
 
     def perform_cross_reference_analysis(self):
         """Perform cross-reference analysis on the universe"""
+        # the first table with each name, as a scan of the tables would find
+        tables_by_name = {}
+        for t in self.universe.tables:
+            tables_by_name.setdefault(t.name, t)
+        
         # Analyze object-to-table relationships
         for obj in self._get_all_objects():
             if obj.select_sql:
                 table_refs = self._extract_table_references(obj.select_sql)
                 for table_ref in table_refs:
                     # Find the actual table
-                    table = next((t for t in self.universe.tables if t.name == table_ref), None)
+                    table = tables_by_name.get(table_ref)
                     if table:
                         self.universe.cross_references[f"obj_{obj.id_}_table_{table.id_}"] = {
                             'type': 'object_table',
@@ -1354,7 +1132,7 @@ class Reader(object):
         for join in self.universe.joins:
             table_refs = self._extract_table_references(join.statement)
             for table_ref in table_refs:
-                table = next((t for t in self.universe.tables if t.name == table_ref), None)
+                table = tables_by_name.get(table_ref)
                 if table:
                     self.universe.cross_references[f"join_{join.id_}_table_{table.id_}"] = {
                         'type': 'join_table',
@@ -1366,49 +1144,16 @@ class Reader(object):
 
     def perform_validation_checks(self):
         """Perform validation checks on the universe"""
-        # Check for broken references in SQL
-        for obj in self._get_all_objects():
-            if obj.select_sql:
-                broken_refs = self._find_broken_references(obj.select_sql)
-                for broken_ref in broken_refs:
-                    self.universe.validation_errors.append({
-                        'type': 'broken_reference',
-                        'object_id': obj.id_,
-                        'object_name': obj.name,
-                        'sql_type': 'select',
-                        'broken_reference': broken_ref,
-                        'message': f"Object '{obj.name}' references non-existent table '{broken_ref}' in SELECT clause"
-                    })
-            
-            if obj.where_sql:
-                broken_refs = self._find_broken_references(obj.where_sql)
-                for broken_ref in broken_refs:
-                    self.universe.validation_errors.append({
-                        'type': 'broken_reference',
-                        'object_id': obj.id_,
-                        'object_name': obj.name,
-                        'sql_type': 'where',
-                        'broken_reference': broken_ref,
-                        'message': f"Object '{obj.name}' references non-existent table '{broken_ref}' in WHERE clause"
-                    })
-        
-        # Check for orphaned objects (objects that reference non-existent tables)
-        for obj in self._get_all_objects():
-            if obj.select_sql:
-                table_refs = self._extract_table_references(obj.select_sql)
-                if not table_refs:
-                    self.universe.validation_errors.append({
-                        'type': 'orphaned_object',
-                        'object_id': obj.id_,
-                        'object_name': obj.name,
-                        'message': f"Object '{obj.name}' has no table references in SELECT clause"
-                    })
+        engine = ValidationEngine(self.validation_rules)
+        self.universe.validation_errors = engine.run(self.universe)
+        self.universe.validation_timings = engine.timings
 
     def perform_dependency_analysis(self):
         """Perform dependency analysis on the universe"""
         # Build dependency graph
         deps = self._analyze_dependencies()
         self.universe.dependency_graph = deps
+        self.universe.dependencies = DependencyGraph(self.universe)
 
     def _extract_database_tables(self):
         """Extract detailed database table information"""
@@ -1535,95 +1280,69 @@ class Reader(object):
         # For each object, determine which contexts it can be used in
         # This is a simplified analysis - in reality, context incompatibilities
         # are determined by the joins and tables an object references
-        for cls in self.universe.classes:
-            self._analyze_class_contexts(cls, context_objects)
+        table_contexts = {}
+        for context_id, context_info in self.universe.context_details.items():
+            names = set(self.universe.database_tables.get(tid, {}).get('name')
+                for tid in context_info['tables_involved'])
+            for name in names:
+                table_contexts.setdefault(name, []).append(context_id)
+        for obj in self._get_all_objects():
+            obj_contexts = set()
+            # Determine contexts based on table references
+            table_refs = self._extract_table_references(obj.select_sql)
+            if table_refs:
+                for table_ref in table_refs:
+                    obj_contexts.update(table_contexts.get(table_ref, ()))
+            context_objects[obj.id_] = obj_contexts
 
         # Find objects that are incompatible between contexts
+        # contexts are incompatible if they share no joins; there are few
+        # contexts, so each pair is only compared once
+        context_joins = dict((context_id, set(info['joins']))
+            for context_id, info in self.universe.context_details.items())
+        incompatible = {}
+        context_names = {}
+        for context in reversed(self.universe.contexts):
+            context_names[context.id_] = context.name
         for obj_id, obj_contexts in context_objects.items():
             if len(obj_contexts) > 1:
                 # Object can be used in multiple contexts - check for conflicts
                 contexts_list = list(obj_contexts)
                 for i, ctx1 in enumerate(contexts_list):
                     for ctx2 in contexts_list[i+1:]:
-                        if self._contexts_are_incompatible(ctx1, ctx2):
+                        pair = (ctx1, ctx2)
+                        if pair not in incompatible:
+                            incompatible[pair] = context_joins[ctx1].isdisjoint(
+                                context_joins[ctx2])
+                        if incompatible[pair]:
                             obj_name = self._get_object_name_by_id(obj_id)
                             incompatibility = {
                                 'object_id': obj_id,
                                 'object_name': obj_name,
                                 'context1_id': ctx1,
-                                'context1_name': self._get_context_name_by_id(ctx1),
+                                'context1_name': context_names.get(ctx1,
+                                    f"Context_{ctx1}"),
                                 'context2_id': ctx2,
-                                'context2_name': self._get_context_name_by_id(ctx2),
+                                'context2_name': context_names.get(ctx2,
+                                    f"Context_{ctx2}"),
                                 'reason': 'Object references tables from incompatible contexts'
                             }
                             self.universe.context_incompatibilities.append(incompatibility)
 
-    def _analyze_class_contexts(self, cls, context_objects):
-        """Analyze which contexts a class's objects belong to"""
-        for obj in cls.objects:
-            obj_contexts = set()
-            # Determine contexts based on table references
-            table_refs = self._extract_table_references(obj.select_sql)
-            if table_refs:
-                for table_ref in table_refs:
-                    for context_id, context_info in self.universe.context_details.items():
-                        if any(self.universe.database_tables.get(tid, {}).get('name') == table_ref 
-                               for tid in context_info['tables_involved']):
-                            obj_contexts.add(context_id)
-            context_objects[obj.id_] = obj_contexts
-
-        for subclass in cls.subclasses:
-            self._analyze_class_contexts(subclass, context_objects)
-
-    def _contexts_are_incompatible(self, ctx1_id, ctx2_id):
-        """Check if two contexts are incompatible"""
-        # Simplified check: contexts are incompatible if they don't share any joins
-        ctx1_joins = set(self.universe.context_details[ctx1_id]['joins'])
-        ctx2_joins = set(self.universe.context_details[ctx2_id]['joins'])
-        return len(ctx1_joins & ctx2_joins) == 0
-
     def _get_object_name_by_id(self, obj_id):
         """Get object name by ID"""
-        for cls in self.universe.classes:
-            name = self._find_object_in_class(cls, obj_id)
-            if name:
-                return name
+        obj = self.universe.object_map.get(obj_id)
+        if obj is not None and obj.name:
+            return obj.name
         return f"Object_{obj_id}"
 
-    def _find_object_in_class(self, cls, obj_id):
-        """Find object name in class hierarchy"""
-        for obj in cls.objects:
-            if obj.id_ == obj_id:
-                return obj.name
-        for subclass in cls.subclasses:
-            name = self._find_object_in_class(subclass, obj_id)
-            if name:
-                return name
-        return None
-
-    def _get_context_name_by_id(self, ctx_id):
-        """Get context name by ID"""
-        for context in self.universe.contexts:
-            if context.id_ == ctx_id:
-                return context.name
-        return f"Context_{ctx_id}"
-
     def _extract_lov_definitions(self):
         """Extract List of Values (LOV) definitions"""
         self.universe.lov_definitions = {}
 
         # Extract LOV information from objects
-        for cls in self.universe.classes:
-            self._extract_lov_from_class(cls)
-
-        # Also check XML LOV data if available
-        if hasattr(self.universe, 'xml_lov') and self.universe.xml_lov:
-            self._parse_xml_lov()
-
-    def _extract_lov_from_class(self, cls):
-        """Extract LOV information from objects in a class"""
-        for obj in cls.objects:
-            if hasattr(obj, 'lov_name') and obj.lov_name:
+        for obj in self._get_all_objects():
+            if obj.lov_name:
                 lov_info = {
                     'object_id': obj.id_,
                     'object_name': obj.name,
@@ -1633,125 +1352,181 @@ class Reader(object):
                 }
                 self.universe.lov_definitions[obj.id_] = lov_info
 
-        for subclass in cls.subclasses:
-            self._extract_lov_from_class(subclass)
+        # Also check XML LOV data if available
+        if hasattr(self.universe, 'xml_lov') and self.universe.xml_lov:
+            self._parse_xml_lov()
 
     def _parse_xml_lov(self):
-        """Parse XML LOV data if available"""
-        # This would parse the XML LOV data from universe.xml_lov
-        # For now, just mark that XML LOV data exists
-        if self.universe.xml_lov:
-            xml_lov_info = {
-                'source': 'xml_lov',
-                'size': len(self.universe.xml_lov),
-                'parsed': False  # Would need XML parsing implementation
-            }
-            self.universe.lov_definitions['xml_lov'] = xml_lov_info
+        """Parse the XML-LOV; section into ListOfValues
+        
+        I lov_count
+        lov_count times:
+            I object_id
+            H xml_length
+            xml_length bytes of <LOV_SPECIFICATION> XML
+        
+        Each specification is read straight from the section buffer with
+        its own XMLPullParser; elements are discarded once read. A
+        malformed specification is skipped.
+        """
+        import xml.etree.ElementTree as ET
+        u = self.universe
+        data = u.xml_lov
+        view = data.view if isinstance(data, SectionBlob) \
+            else memoryview(data)
+        lovs = {}
+        try:
+            count, = struct.unpack_from('<I', view, 0)
+            offset = 4
+            for i in range(count):
+                object_id, length = struct.unpack_from('<IH', view, offset)
+                offset += 6
+                try:
+                    lovs[object_id] = self._parse_lov_specification(
+                        object_id, view[offset:offset + length])
+                except ET.ParseError:
+                    # only this specification is lost; its length is known
+                    pass
+                offset += length
+        except struct.error:
+            pass
+        u.lovs = lovs
+        u.lov_index = {}
+        for object_id, lov in lovs.items():
+            obj = u.object_map.get(object_id)
+            if obj is not None and obj.lov_name:
+                u.lov_index[obj.lov_name] = lov
+        u.lov_definitions['xml_lov'] = {
+            'source': 'xml_lov',
+            'size': len(data),
+            'parsed': True,
+            'count': len(lovs)
+        }
+
+    # bytes of a LOV specification fed to its parser at a time
+    lov_chunk_size = 4096
+
+    def _parse_lov_specification(self, object_id, data):
+        """Parse one <LOV_SPECIFICATION> into a ListOfValues
+        
+        The XML is fed to the parser lov_chunk_size bytes at a time and the
+        events read between feeds, so no more than a chunk of elements is
+        held at once; every element is cleared once it ends.
+        """
+        import xml.etree.ElementTree as ET
+        lov = ListOfValues(self.universe, object_id)
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        request = None
+        chunk = self.lov_chunk_size
+        for start in range(0, len(data) + chunk, chunk):
+            if start < len(data):
+                parser.feed(data[start:start + chunk])
+            else:
+                parser.close()
+            for event, element in parser.read_events():
+                if event == 'end':
+                    element.clear()
+                elif element.tag == 'LOV_PROPERTIES':
+                    lov.properties = dict(element.attrib)
+                elif element.tag == 'REQUEST':
+                    request = {
+                        'type': element.get('Type'),
+                        'name': element.get('Name'),
+                        'results': []
+                    }
+                    lov.requests.append(request)
+                elif element.tag == 'RESULT' and request is not None:
+                    try:
+                        request['results'].append(int(element.get('Id')))
+                    except (TypeError, ValueError):
+                        pass
+        return lov
 
     def perform_enhanced_analysis(self):
         """Perform enhanced analysis to extract database tables, columns, joins, contexts, and LOV information"""
-        print("DEBUG: Starting enhanced analysis")
-        self._extract_database_tables()
-        print(f"DEBUG: Extracted {len(self.universe.database_tables)} database tables")
-        self._extract_table_columns()
-        print(f"DEBUG: Extracted columns for {len(self.universe.table_columns)} tables")
-        self._extract_join_details()
-        print(f"DEBUG: Extracted {len(self.universe.join_details)} join details")
-        self._extract_context_details()
-        print(f"DEBUG: Extracted {len(self.universe.context_details)} context details")
-        self._analyze_context_incompatibilities()
-        print(f"DEBUG: Found {len(self.universe.context_incompatibilities)} incompatibilities")
-        self._extract_lov_definitions()
-        print(f"DEBUG: Extracted {len(self.universe.lov_definitions)} LOV definitions")
-        self._extract_stored_procedure_parameters()
-        print(f"DEBUG: Extracted {len(self.universe.stored_procedure_parameters)} stored procedures with parameters")
-        print("DEBUG: Enhanced analysis completed")
+        u = self.universe
+        self._stage('perform_enhanced_analysis.database_tables',
+            self._extract_database_tables, lambda: len(u.database_tables))
+        self._stage('perform_enhanced_analysis.table_columns',
+            self._extract_table_columns, lambda: len(u.table_columns))
+        self._stage('perform_enhanced_analysis.join_details',
+            self._extract_join_details, lambda: len(u.join_details))
+        self._stage('perform_enhanced_analysis.context_details',
+            self._extract_context_details, lambda: len(u.context_details))
+        self._stage('perform_enhanced_analysis.context_incompatibilities',
+            self._analyze_context_incompatibilities, 
+            lambda: len(u.context_incompatibilities))
+        self._stage('perform_enhanced_analysis.lov_definitions',
+            self._extract_lov_definitions, lambda: len(u.lov_definitions))
+        self._stage('perform_enhanced_analysis.stored_procedure_parameters',
+            self._extract_stored_procedure_parameters, 
+            lambda: len(u.stored_procedure_parameters))
 
     # Helper methods for analysis
 
     def _extract_stored_procedure_parameters(self):
-        """Extract stored procedure parameters from the UNW_Storage/Tables file"""
-        import xml.etree.ElementTree as ET
-        import re
-        
+        """Extract stored procedure parameters from the UNW_Storage/Tables
+        entry, or from the Tables; section if the universe has none"""
         try:
-            # Get the path to UNW_Storage if available
-            unw_storage_path = self._get_unw_storage_path()
-            
-            if not unw_storage_path:
-                # Try to read from content offsets if UNW_Storage is not available
+            folder = self._get_unw_storage()
+            data = folder.read('Tables/Tables') if folder is not None \
+                else None
+            if data is None:
                 self._extract_procedure_params_from_binary()
             else:
-                # Read from UNW_Storage/Tables file
-                tables_file = os.path.join(unw_storage_path, "Tables", "Tables")
-                if os.path.exists(tables_file):
-                    with open(tables_file, 'rb') as f:
-                        data = f.read()
-                    self._parse_procedure_xml_from_binary(data)
-                    
-        except Exception as e:
-            print(f"DEBUG: Error extracting stored procedure parameters: {e}")
+                self._parse_procedure_xml_from_binary(bytes(data))
+        except Exception:
+            pass
 
     def _extract_procedure_params_from_binary(self):
-        """Extract procedure parameters from the binary file content"""
-        try:
-            # Seek to Tables; section and extract procedure XML
-            if 'Tables;' not in self.content_offsets:
-                return
-                
-            self.file.seek(self.content_offsets['Tables;'])
-            # Skip header information
-            self.file.read(2)
-            user_name = self.read_string()
-            schema = self.read_string()
-            max_table_id, = struct.unpack('<I', self.file.read(4))
-            table_count, = struct.unpack('<I', self.file.read(4))
-            
-            # Read remaining content which may contain procedure XML
-            remaining_data = self.file.read()
-            self._parse_procedure_xml_from_binary(remaining_data)
-            
-        except Exception as e:
-            print(f"DEBUG: Error reading procedure parameters from binary: {e}")
+        """Extract procedure parameters from the file, from the Tables;
+        section on"""
+        if 'Tables;' not in self.sections:
+            return
+        self._parse_procedure_xml_from_binary(self.buffer,
+            self.sections['Tables;'].start)
 
-    def _parse_procedure_xml_from_binary(self, data):
-        """Parse procedure XML from binary data to extract parameters"""
+    def _parse_procedure_xml_from_binary(self, data, start=0):
+        """Parse the <Procedure> elements in data[start:] to extract their
+        parameters
+        
+        The bytes are searched for each <Procedure ...>...</Procedure> span
+        and only those spans are parsed, so data without procedures costs a
+        single find.
+        """
+        begin = data.find(b'<Procedure', start)
+        while begin != -1:
+            end = data.find(b'</Procedure>', begin)
+            if end == -1:
+                break
+            end += len(b'</Procedure>')
+            self._parse_procedure_element(data[begin:end])
+            begin = data.find(b'<Procedure', end)
+
+    def _parse_procedure_element(self, span):
+        """Parse one <Procedure> element from bytes"""
+        import xml.etree.ElementTree as ET
+        parser = ET.XMLPullParser(events=('start',))
+        proc_name = 'Unknown'
+        parameters = []
         try:
-            # Convert binary data to string
-            data_str = data.decode('latin-1', errors='ignore')
-            
-            # Find all Procedure tags
-            proc_pattern = r'<Procedure[^>]*>.*?</Procedure>'
-            proc_matches = re.findall(proc_pattern, data_str, re.DOTALL)
-            
-            for proc_xml_raw in proc_matches:
-                # Clean up XML entities
-                proc_xml = proc_xml_raw.replace('&quot;', '"')
-                
-                try:
-                    # Parse the XML
-                    root = ET.fromstring(proc_xml)
-                    proc_name = root.get('name', 'Unknown')
-                    
-                    # Extract parameters
-                    parameters = []
-                    for param in root.findall('.//Parameter'):
-                        param_info = {
-                            'name': param.get('name', ''),
-                            'type': param.get('type', ''),
-                            'value': param.get('value', '')
-                        }
-                        parameters.append(param_info)
-                    
-                    if parameters:
-                        self.universe.stored_procedure_parameters[proc_name] = parameters
-                        
-                except Exception as parse_err:
-                    # Try manual parsing if XML parsing fails
-                    self._parse_procedure_parameters_manual(proc_xml_raw)
-                    
-        except Exception as e:
-            print(f"DEBUG: Error parsing procedure XML: {e}")
+            parser.feed(span)
+            for event, element in parser.read_events():
+                if element.tag == 'Procedure':
+                    proc_name = element.get('name', 'Unknown')
+                elif element.tag == 'Parameter':
+                    parameters.append({
+                        'name': element.get('name', ''),
+                        'type': element.get('type', ''),
+                        'value': element.get('value', '')
+                    })
+            parser.close()
+        except ET.ParseError:
+            # Try manual parsing if XML parsing fails
+            self._parse_procedure_parameters_manual(span.decode('latin-1'))
+            return
+        if parameters:
+            self.universe.stored_procedure_parameters[proc_name] = parameters
 
     def _parse_procedure_parameters_manual(self, proc_str):
         """Manually parse procedure parameters if XML parsing fails"""
@@ -1781,46 +1556,12 @@ class Reader(object):
             pass  # Silent failure for manual parsing
         
     def _get_all_objects(self):
-        """Get all objects from all classes recursively"""
-        objects = []
-        for cls in self.universe.classes:
-            self._collect_objects_from_class(cls, objects)
-        return objects
-
-    def _collect_objects_from_class(self, cls, objects_list):
-        """Recursively collect objects from a class and its subclasses"""
-        objects_list.extend(cls.objects)
-        for subclass in cls.subclasses:
-            self._collect_objects_from_class(subclass, objects_list)
+        """Get all objects from all classes, in ID order"""
+        return self.universe.objects
 
     def _extract_table_references(self, sql):
         """Extract table references from SQL"""
-        if not sql:
-            return []
-        table_refs = []
-        # Simple regex to find table references in SQL
-        # This is a basic implementation - could be enhanced
-        import re
-        # Look for patterns like Table_Name. or @aggregate_aware(Table_Name.
-        table_pattern = r'\b([A-Za-z_][A-Za-z0-9_]*)\.'
-        matches = re.findall(table_pattern, sql)
-        # Remove duplicates and filter out common SQL keywords
-        sql_keywords = {'SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'NOT', 'IN', 'BETWEEN', 'LIKE', 'IS', 'NULL'}
-        table_refs = [match for match in matches if match.upper() not in sql_keywords]
-        return list(set(table_refs))  # Remove duplicates
-
-    def _find_broken_references(self, sql):
-        """Find broken table references in SQL"""
-        if not sql:
-            return []
-        table_refs = self._extract_table_references(sql)
-        broken_refs = []
-        for table_ref in table_refs:
-            # Check if table exists in universe
-            table_exists = any(t.name == table_ref for t in self.universe.tables)
-            if not table_exists:
-                broken_refs.append(table_ref)
-        return broken_refs
+        return table_references(sql)
 
     def _analyze_dependencies(self):
         """Analyze dependencies between objects"""
@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+search.py
+
+Full-text search over the metadata of many universes.
+
+    python -m pyunv.search --add search.db /shared/universes/*.unv
+    python -m pyunv.search search.db customer_id
+    python -m pyunv.search search.db 'reven*' sales
+
+Classes, objects, conditions, tables and columns are indexed by their
+names, descriptions, expanded SQL, class paths and LOV names. The index is
+an inverted index in a SQLite file: for every token and universe, a posting
+list of the entities that contain the token, stored as packed arrays and
+kept in token order, so a token or a token prefix is found with one range
+scan however many entities contain it.
+"""
+
+import array
+import collections
+import getopt
+import hashlib
+import heapq
+import re
+import sqlite3
+import struct
+import sys
+import time
+import zipfile
+
+from pyunv.reader import Reader
+from pyunv.universe import walk_classes
+
+
+Hit = collections.namedtuple('Hit', ['universe', 'kind', 'entity_id', 'name',
+    'path', 'score'])
+
+_word = re.compile(r'\w+')
+
+# the weight of a token found in a name; tokens found elsewhere weigh 1
+NAME_WEIGHT = 3
+
+KINDS = ('class', 'object', 'condition', 'table', 'column')
+
+
+def _pack(values, typecode):
+    packed = array.array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(data, typecode):
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def tokenize(text):
+    """Return the set of lower-case tokens of a text. A word with
+    underscores is indexed whole and by its parts, so customer_id is found
+    by customer_id, customer and id."""
+    tokens = set()
+    if text:
+        for word in _word.findall(text.lower()):
+            tokens.add(word)
+            if '_' in word:
+                tokens.update(part for part in word.split('_') if part)
+    return tokens
+
+
+class SearchIndex(object):
+
+    """An inverted index of universe metadata in a SQLite file
+
+    Universes are stored under a key (usually their path) with the hash of
+    their content, like the EstateIndex, so adding an unchanged universe
+    again is free and a changed one replaces its own entries.
+
+        index = SearchIndex('search.db')
+        index.add_file('sales.unv')
+        for hit in index.search('revenue'):
+            print(hit.universe, hit.kind, hit.path)
+
+    """
+
+    _schema = (
+        '''CREATE TABLE IF NOT EXISTS universes (
+            id INTEGER PRIMARY KEY,
+            key TEXT UNIQUE NOT NULL,
+            name TEXT,
+            content_hash TEXT,
+            indexed_at REAL)''',
+        '''CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            universe_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            entity_id INTEGER,
+            name TEXT,
+            path TEXT)''',
+        # documents holds 32-bit document ids and flags the weight of the
+        # token (the low two bits) and the kind of each document (KINDS
+        # index, the bits above)
+        '''CREATE TABLE IF NOT EXISTS postings (
+            token TEXT NOT NULL,
+            universe_id INTEGER NOT NULL,
+            documents BLOB NOT NULL,
+            flags BLOB NOT NULL,
+            PRIMARY KEY (token, universe_id)) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS documents_universe '
+            'ON documents (universe_id)',
+        'CREATE INDEX IF NOT EXISTS postings_universe '
+            'ON postings (universe_id)',
+    )
+
+    def __init__(self, path):
+        super(SearchIndex, self).__init__()
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        for statement in SearchIndex._schema:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def content_hash(self, key):
+        """Return the content hash stored for a universe, or None"""
+        row = self.connection.execute(
+            'SELECT content_hash FROM universes WHERE key = ?',
+            (key,)).fetchone()
+        return row[0] if row else None
+
+    def add_file(self, path, key=None):
+        """Index a universe file unless it is unchanged since it was last
+        indexed. Returns True if the index was updated."""
+        key = key or path
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+        if self.content_hash(key) == digest:
+            return False
+        self.add(Reader.from_bytes(data).universe, key, digest)
+        return True
+
+    def add(self, universe, key, content_hash=None):
+        """Index a parsed universe, replacing any entries stored under key"""
+        documents = list(self._documents(universe))
+        with self.connection:
+            self._delete(key)
+            cursor = self.connection.execute(
+                'INSERT INTO universes (key, name, content_hash, indexed_at) '
+                'VALUES (?, ?, ?, ?)', (key,
+                universe.parameters.universe_name if universe.parameters
+                    else None, content_hash, time.time()))
+            universe_id = cursor.lastrowid
+            row = self.connection.execute(
+                'SELECT max(id) FROM documents').fetchone()
+            first = (row[0] or 0) + 1
+            self.connection.executemany(
+                'INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?)',
+                [(first + i, universe_id, kind, entity_id, name, path)
+                for i, (kind, entity_id, name, path, tokens)
+                in enumerate(documents)])
+            postings = {}
+            for i, (kind, entity_id, name, path, tokens) in \
+                    enumerate(documents):
+                kind = KINDS.index(kind) << 2
+                for token, weight in tokens.items():
+                    posting = postings.get(token)
+                    if posting is None:
+                        posting = postings[token] = ([], [])
+                    posting[0].append(first + i)
+                    posting[1].append(kind | weight)
+            self.connection.executemany(
+                'INSERT INTO postings VALUES (?, ?, ?, ?)',
+                [(token, universe_id, _pack(ids, 'I'), _pack(flags, 'B'))
+                for token, (ids, flags) in postings.items()])
+
+    def remove(self, key):
+        with self.connection:
+            self._delete(key)
+
+    def universes(self):
+        """Return the keys of the indexed universes"""
+        return [row[0] for row in self.connection.execute(
+            'SELECT key FROM universes ORDER BY key')]
+
+    def search(self, query, limit=50, kinds=None):
+        """Return the Hits for the entities matching every word of query,
+        best first. A word ending in * matches any token it starts; kinds
+        limits the hits to some of class, object, condition, table and
+        column."""
+        terms = []
+        for word in query.lower().split():
+            words = _word.findall(word)
+            terms.extend((term, False) for term in words)
+            if words and word.endswith('*'):
+                terms[-1] = (words[-1], True)
+        if not terms:
+            return []
+        kinds = set(KINDS.index(kind) for kind in kinds) if kinds else None
+        scores = None
+        for matches in sorted((self._postings(term, prefix, kinds)
+                for term, prefix in terms), key=len):
+            if scores is None:
+                scores = matches
+            else:
+                scores = dict((document_id, score + matches[document_id])
+                    for document_id, score in scores.items()
+                    if document_id in matches)
+            if not scores:
+                return []
+        # only the best documents are looked up; ties go to the universes
+        # and entities indexed first
+        best = heapq.nsmallest(limit, scores.items(),
+            key=lambda item: (-item[1], item[0])) if limit \
+            else list(scores.items())
+        hits = []
+        for start in range(0, len(best), 500):
+            chunk = [document_id for document_id, score
+                in best[start:start + 500]]
+            for row in self.connection.execute(
+                    'SELECT d.id, u.key, d.kind, d.entity_id, d.name, d.path '
+                    'FROM documents d JOIN universes u '
+                    'ON u.id = d.universe_id WHERE d.id IN (%s)' %
+                    ', '.join('?' * len(chunk)), chunk):
+                hits.append(Hit(*(row[1:] + (scores[row[0]],))))
+        hits.sort(key=lambda hit: (-hit.score, hit.universe, hit.kind,
+            hit.path or ''))
+        return hits
+
+    def _postings(self, term, prefix, kinds=None):
+        """Return {document_id: weight} for the documents containing a term
+        (or a token it starts, if prefix) and of one of kinds"""
+        if prefix:
+            rows = self.connection.execute(
+                'SELECT documents, flags FROM postings '
+                'WHERE token >= ? AND token < ?', (term, term + '\U0010ffff'))
+        else:
+            rows = self.connection.execute(
+                'SELECT documents, flags FROM postings WHERE token = ?',
+                (term,))
+        matches = {}
+        for documents, flags in rows:
+            flags = _unpack(flags, 'B')
+            documents = _unpack(documents, 'I')
+            if kinds is not None:
+                pairs = [(document_id, flag & 3) for document_id, flag
+                    in zip(documents, flags) if flag >> 2 in kinds]
+            else:
+                pairs = zip(documents, (flag & 3 for flag in flags))
+            if prefix:
+                for document_id, weight in pairs:
+                    if weight > matches.get(document_id, 0):
+                        matches[document_id] = weight
+            else:
+                matches.update(pairs)
+        return matches
+
+    def _delete(self, key):
+        row = self.connection.execute(
+            'SELECT id FROM universes WHERE key = ?', (key,)).fetchone()
+        if row:
+            self.connection.execute(
+                'DELETE FROM postings WHERE universe_id = ?', row)
+            self.connection.execute(
+                'DELETE FROM documents WHERE universe_id = ?', row)
+            self.connection.execute(
+                'DELETE FROM universes WHERE id = ?', row)
+
+    def _documents(self, universe):
+        """Yield (kind, entity_id, name, path, {token: weight}) for every
+        searchable entity of a universe"""
+        def document(kind, entity_id, name, path, *texts):
+            tokens = {}
+            for text in texts + (path,):
+                for token in tokenize(text):
+                    tokens[token] = 1
+            for token in tokenize(name):
+                tokens[token] = NAME_WEIGHT
+            return kind, entity_id, name, path, tokens
+
+        paths = {}
+        for depth, cls in walk_classes(universe.classes):
+            parent = paths.get(id(cls.parent)) if cls.parent else None
+            paths[id(cls)] = parent + '\\' + cls.name if parent else cls.name
+            yield document('class', cls.id_, cls.name, paths[id(cls)],
+                cls.description)
+        index = universe.class_index
+        for o, position in zip(index.objects, index.object_parents):
+            yield document('object', o.id_, o.name,
+                paths[id(index.classes[position])] + '\\' + (o.name or ''),
+                o.description, o.select_sql, o.where_sql, o.lov_name)
+        for c, position in zip(index.conditions, index.condition_parents):
+            yield document('condition', c.id_, c.name,
+                paths[id(index.classes[position])] + '\\' + (c.name or ''),
+                c.description, c.where_sql)
+        for table in universe.tables:
+            yield document('table', table.id_, table.name, table.fullname,
+                table.schema)
+        for table_id, columns in universe.table_columns.items():
+            for column in columns:
+                yield document('column', column['id'], column['name'],
+                    column['fullname'])
+
+
+help_message = '''
+Search the metadata of universes.
+
+python -m pyunv.search index.db word [word ...]
+python -m pyunv.search --add index.db universe.unv [universe.unv ...]
+
+    --add        index the universes (unchanged ones are skipped); the
+                 exit status is 1 if any could not be read
+    --kind K     only show hits of a kind: class, object, condition,
+                 table or column (may be repeated)
+    --limit N    show at most N hits (default 50)
+
+A word ending in * matches every word it starts.
+'''
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    try:
+        opts, args = getopt.getopt(argv[1:], 'h',
+            ['help', 'add', 'kind=', 'limit='])
+        limit = 50
+        kinds = []
+        add = False
+        for option, value in opts:
+            if option in ('-h', '--help'):
+                print(help_message)
+                return 0
+            if option == '--add':
+                add = True
+            if option == '--kind':
+                if value not in KINDS:
+                    raise ValueError('unknown kind %s (use %s)' % (value,
+                        ', '.join(KINDS)))
+                kinds.append(value)
+            if option == '--limit':
+                limit = int(value)
+    except (getopt.error, ValueError) as msg:
+        print(msg, file=sys.stderr)
+        return 2
+    if len(args) < 2:
+        print(help_message)
+        return 2
+    with SearchIndex(args[0]) as index:
+        if add:
+            failed = 0
+            for path in args[1:]:
+                try:
+                    updated = index.add_file(path)
+                except (OSError, struct.error, ValueError, KeyError,
+                        IndexError, TypeError, AssertionError,
+                        zipfile.BadZipFile) as error:
+                    # one unreadable universe does not stop the others
+                    failed += 1
+                    print('%s: error %s: %s' % (path, type(error).__name__,
+                        error), file=sys.stderr)
+                    continue
+                print('%s: %s' % (path, 'indexed' if updated
+                    else 'unchanged'))
+            return 1 if failed else 0
+        started = time.perf_counter()
+        hits = index.search(' '.join(args[1:]), limit, kinds)
+        for hit in hits:
+            print('%s\t%s\t%s' % (hit.universe, hit.kind, hit.path))
+        print('%d hits in %.1f ms' % (len(hits),
+            (time.perf_counter() - started) * 1000), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
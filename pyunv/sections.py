@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+sections.py
+
+The directory of sections in a universe file.
+"""
+
+import bisect
+import collections
+import struct
+import zlib
+
+
+class Section(collections.namedtuple('Section',
+        ['marker', 'start', 'end', 'crc32'])):
+
+    """A section of a universe file: its marker, the offsets of its data and
+    the CRC-32 of the data"""
+
+    __slots__ = ()
+
+    @property
+    def length(self):
+        return self.end - self.start
+
+
+class SectionStatus(collections.namedtuple('SectionStatus',
+        ['section', 'marker', 'status', 'reason'])):
+
+    """The outcome of reading a section: status is 'ok', 'missing' (the
+    file has no such section) or 'failed', when reason holds the error.
+    Only optional sections fail: the error of a required section's reader
+    is raised by the Reader, so there is no universe to record it on."""
+
+    __slots__ = ()
+
+
+class SectionDirectory(object):
+
+    """The sections of a universe file, ordered by offset
+
+    Each section is a member of the zip archive inside the universe file,
+    so its length and CRC-32 come from the member's local header. Sections
+    without a readable header run to the start of the next section and are
+    checksummed with zlib.crc32.
+
+        directory = universe.sections
+        if directory.changed(previous.sections):
+            ...
+
+    """
+
+    _local_header = struct.Struct('<4s5H3I2H')
+    _signature = b'PK\x03\x04'
+
+    def __init__(self, sections, size):
+        super(SectionDirectory, self).__init__()
+        self.sections = sorted(sections, key=lambda s: s.start)
+        self.size = size
+        self._by_marker = dict((s.marker, s) for s in self.sections)
+        self._starts = [s.start for s in self.sections]
+
+    @classmethod
+    def build(cls, buffer, offsets):
+        """Build the directory of a universe buffer from a dict of marker to
+        the offset where the marker's data starts"""
+        view = memoryview(buffer)
+        starts = sorted(offsets.values())
+        sections = []
+        for marker, start in offsets.items():
+            header = cls._read_header(view, marker, start)
+            if header is not None:
+                crc, length = header
+                end = start + length
+            else:
+                index = bisect.bisect_right(starts, start)
+                end = starts[index] if index < len(starts) else len(view)
+                crc = zlib.crc32(view[start:end]) & 0xffffffff
+            sections.append(Section(marker, start, end, crc))
+        return cls(sections, len(view))
+
+    @classmethod
+    def _read_header(cls, view, marker, start):
+        """Return (crc32, length) from the zip local header in front of a
+        stored section, or None"""
+        name_length = len(marker.encode('utf-8'))
+        offset = start - name_length - cls._local_header.size
+        if offset < 0:
+            return None
+        fields = cls._local_header.unpack_from(view, offset)
+        signature, flags, method, crc, size = fields[0], fields[2], \
+            fields[3], fields[6], fields[7]
+        if signature != cls._signature or method != 0 or flags & 0x08 or \
+                fields[9] != name_length or fields[10] != 0 or \
+                start + size > len(view):
+            return None
+        return crc, size
+
+    def __getitem__(self, marker):
+        return self._by_marker[marker]
+
+    def get(self, marker, default=None):
+        return self._by_marker.get(marker, default)
+
+    def __contains__(self, marker):
+        return marker in self._by_marker
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+    @property
+    def markers(self):
+        return [s.marker for s in self.sections]
+
+    def section_at(self, offset):
+        """Return the section whose data contains offset, or None"""
+        index = bisect.bisect_right(self._starts, offset) - 1
+        if index >= 0 and offset < self.sections[index].end:
+            return self.sections[index]
+        return None
+
+    def length_from(self, offset):
+        """Return the number of bytes from offset to the next section start
+        (or the end of the file)"""
+        index = bisect.bisect_right(self._starts, offset)
+        if index < len(self._starts):
+            return self._starts[index] - offset
+        return self.size - offset
+
+    @property
+    def checksum(self):
+        """A CRC-32 over the markers and checksums of every section"""
+        crc = 0
+        for s in self.sections:
+            crc = zlib.crc32(s.marker.encode('utf-8'), crc)
+            crc = zlib.crc32(struct.pack('<I', s.crc32), crc)
+        return crc & 0xffffffff
+
+    def changed(self, other):
+        """Return the markers whose sections differ from those of another
+        directory, including sections only one of them has"""
+        markers = set(self._by_marker) | set(other._by_marker)
+        return sorted(marker for marker in markers
+            if self._section_key(marker) != other._section_key(marker))
+
+    def _section_key(self, marker):
+        section = self._by_marker.get(marker)
+        return None if section is None else (section.length, section.crc32)
@@ -0,0 +1,507 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+service.py
+
+A long-running HTTP service that documents universes.
+
+    python -m pyunv.service --port 8080 --workers 4
+    curl --data-binary @sales.unv 'http://127.0.0.1:8080/parse?format=csv'
+
+Endpoints:
+
+    POST /parse?format=manifest|csv|json|ndjson  universe file in the body
+    GET  /parse?path=sales.unv&format=json       file under the --root directory
+    GET  /metrics                                request timings, queue, cache
+    GET  /health
+
+Universes are parsed in a process pool. At most max_queue requests wait for
+a worker; beyond that the service answers 503 so clients back off. Results
+are cached by content hash and format, and each worker keeps its most
+recently parsed universes, so asking for another format of the same file
+does not parse it again.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import getopt
+import hashlib
+import io
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+
+from pyunv.csvwriter import CsvWriter
+from pyunv.jsonwriter import JsonWriter, dumps
+from pyunv.manifest import Manifest
+from pyunv.reader import Reader
+
+
+FORMATS = {
+    'manifest': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+# the routes timed on their own; any other request is timed as 'other'
+ROUTES = ('GET /health', 'GET /metrics', 'GET /parse', 'POST /parse')
+
+_reasons = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden',
+    404: 'Not Found', 405: 'Method Not Allowed', 411: 'Length Required',
+    413: 'Payload Too Large', 422: 'Unprocessable Entity',
+    500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def summary(universe):
+    """Return a JSON-serializable summary of a universe"""
+    parameters = universe.parameters
+    return {
+        'name': parameters.universe_name if parameters else None,
+        'statistics': universe.statistics,
+        'tables': [table.fullname for table in universe.tables],
+        'validation_errors': universe.validation_errors,
+    }
+
+
+def render(universe, format):
+    """Return the body of a universe document in one of FORMATS"""
+    if format == 'json':
+        return dumps(summary(universe))
+    if format == 'ndjson':
+        return JsonWriter(universe).tobytes()
+    f = io.StringIO()
+    if format == 'csv':
+        CsvWriter(universe, f)
+    else:
+        Manifest(universe).save(f)
+    return f.getvalue().encode('utf-8')
+
+
+# parsed universes kept by each worker, most recently used last
+_universes = collections.OrderedDict()
+_universes_size = 8
+_universes_lock = threading.Lock()
+
+
+def _init_worker(cache_size):
+    global _universes_size
+    _universes_size = cache_size
+
+
+def parse(data, digest, format):
+    """Parse and render a universe in a worker; returns (body, seconds,
+    whether the universe was already parsed)"""
+    started = time.perf_counter()
+    with _universes_lock:
+        universe = _universes.pop(digest, None)
+    cached = universe is not None
+    if universe is None:
+        universe = Reader.from_bytes(data).universe
+    with _universes_lock:
+        _universes[digest] = universe
+        while len(_universes) > _universes_size:
+            _universes.popitem(last=False)
+    body = render(universe, format)
+    return body, time.perf_counter() - started, cached
+
+
+class ServiceError(Exception):
+
+    def __init__(self, status, message, headers=None):
+        super(ServiceError, self).__init__(message)
+        self.status = status
+        self.headers = headers or []
+
+
+class TimingStats(object):
+
+    """Request count, errors and latency of one route"""
+
+    def __init__(self, window=1024):
+        super(TimingStats, self).__init__()
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def add(self, seconds, ok=True):
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def percentile(self, p):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': self.total * 1000 / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.50) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class ResultCache(object):
+
+    """LRU cache of rendered documents keyed by (content hash, format)"""
+
+    def __init__(self, size=128):
+        super(ResultCache, self).__init__()
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class UniverseService(object):
+
+    """Asyncio HTTP front end over a pool of universe parsers
+
+        service = UniverseService(workers=4)
+        asyncio.run(service.serve(port=8080))
+
+    executor replaces the process pool (e.g. a ThreadPoolExecutor in
+    tests); root is the directory GET /parse?path= may read from, and
+    paths are refused when it is None. A process pool that loses a worker
+    is replaced and the request tried once more.
+
+    """
+
+    def __init__(self, workers=None, cache_size=128, max_queue=256,
+            max_upload=256 * 1024 * 1024, root=None, executor=None):
+        super(UniverseService, self).__init__()
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.max_upload = max_upload
+        self.root = os.path.realpath(root) if root else None
+        self.worker_cache_size = max(1, cache_size // self.workers)
+        self.executor = executor or self._start_pool()
+        self.owns_pool = executor is None
+        self.pool_restarts = 0
+        self.cache = ResultCache(cache_size)
+        self.timings = collections.defaultdict(TimingStats)
+        self.parse_timings = TimingStats()
+        self.queued = 0
+        self.in_flight = 0
+        self.joined = 0
+        self.started = time.time()
+        self.server = None
+        self._slots = None
+        self._pending = {}
+
+    def _start_pool(self):
+        # forked workers would inherit the sockets of open connections
+        # (which then never see EOF), so workers are spawned
+        return concurrent.futures.ProcessPoolExecutor(self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker, initargs=(self.worker_cache_size,))
+
+    def _restart_pool(self, broken):
+        """Replace a process pool that lost a worker; requests that saw the
+        same pool break share one replacement"""
+        if self.executor is broken:
+            self.executor = self._start_pool()
+            self.pool_restarts += 1
+            broken.shutdown(wait=False)
+
+    async def start(self, host='127.0.0.1', port=8080, path=None):
+        """Start listening on a TCP port, or on a Unix socket if path is
+        given. Returns the asyncio server."""
+        self._slots = asyncio.Semaphore(self.workers)
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle,
+                path=path, backlog=1024)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port,
+                backlog=1024)
+        return self.server
+
+    async def serve(self, host='127.0.0.1', port=8080, path=None):
+        await self.start(host, port, path)
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(wait=False)
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def document(self, data, format):
+        """Return (body, headers) for a universe, from the cache or from
+        a worker"""
+        # hashing a large upload would hold up every other connection
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, _digest, data)
+        key = (digest, format)
+        body = self.cache.get(key)
+        if body is not None:
+            return body, [('X-Cache', 'hit')]
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._parse(data, digest, format))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda f: self._pending.pop(key, None))
+            status = None
+        else:
+            # the same document is already being parsed for another request
+            self.joined += 1
+            status = 'joined'
+        body, seconds, cached = await asyncio.shield(pending)
+        if status is None:
+            status = 'worker' if cached else 'miss'
+        return body, [('X-Cache', status),
+            ('X-Parse-Time-Ms', '%.3f' % (seconds * 1000))]
+
+    async def _parse(self, data, digest, format):
+        if self.queued >= self.max_queue + self.workers:
+            raise ServiceError(503, 'too many universes queued',
+                [('Retry-After', '1')])
+        self.queued += 1
+        try:
+            async with self._slots:
+                self.in_flight += 1
+                try:
+                    result = await self._run_parse(data, digest, format)
+                finally:
+                    self.in_flight -= 1
+        finally:
+            self.queued -= 1
+        self.parse_timings.add(result[1])
+        self.cache.put((digest, format), result[0])
+        return result
+
+    async def _run_parse(self, data, digest, format):
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self.executor
+            try:
+                return await loop.run_in_executor(executor, parse, data,
+                    digest, format)
+            except BrokenProcessPool:
+                # a worker died (it may have been this universe): the pool
+                # refuses all work from now on, so start a new one
+                if not self.owns_pool:
+                    break
+                self._restart_pool(executor)
+        raise ServiceError(503, 'universe parser unavailable',
+            [('Retry-After', '1')])
+
+    def metrics(self):
+        return {
+            'uptime_s': time.time() - self.started,
+            'workers': self.workers,
+            'pool_restarts': self.pool_restarts,
+            'queued': self.queued,
+            'in_flight': self.in_flight,
+            'cache': {'size': len(self.cache), 'hits': self.cache.hits,
+                'misses': self.cache.misses, 'joined': self.joined},
+            'parse': self.parse_timings.snapshot(),
+            'routes': dict((route, stats.snapshot())
+                for route, stats in sorted(self.timings.items())),
+        }
+
+    async def handle(self, reader, writer):
+        started = time.perf_counter()
+        route = 'invalid'
+        status = 500
+        try:
+            try:
+                method, target, headers = await self._read_head(reader)
+                url = urllib.parse.urlsplit(target)
+                route = '%s %s' % (method, url.path)
+                if route not in ROUTES:
+                    route = 'other'
+                query = dict(urllib.parse.parse_qsl(url.query))
+                status, content_type, body, extra = await self._dispatch(
+                    method, url.path, query, headers, reader)
+            except ServiceError as error:
+                status, content_type, extra = error.status, FORMATS['json'], \
+                    error.headers
+                body = dumps({'error': str(error)})
+            except Exception as error:
+                status, content_type, extra = 500, FORMATS['json'], []
+                body = dumps({'error': '%s: %s' % (type(error).__name__,
+                    error)})
+            await self._respond(writer, status, content_type, body, extra)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.timings[route].add(time.perf_counter() - started,
+                status < 500)
+            writer.close()
+
+    async def _read_head(self, reader):
+        try:
+            line = await reader.readline()
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise ServiceError(400, 'malformed request line')
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _dispatch(self, method, path, query, headers, reader):
+        if path == '/health':
+            return 200, FORMATS['json'], b'{"status": "ok"}', []
+        if path == '/metrics':
+            return 200, FORMATS['json'], dumps(self.metrics()), []
+        if path != '/parse':
+            raise ServiceError(404, 'no such endpoint: %s' % path)
+        format = query.get('format', 'manifest')
+        if format not in FORMATS:
+            raise ServiceError(400, 'format must be one of %s' %
+                ', '.join(sorted(FORMATS)))
+        if 'path' in query:
+            data = await self._read_path(query['path'])
+        elif method == 'POST':
+            data = await self._read_body(reader, headers)
+        else:
+            raise ServiceError(405, 'POST a universe or GET with ?path=')
+        try:
+            body, extra = await self.document(data, format)
+        except (struct.error, ValueError, KeyError, IndexError, TypeError,
+                AssertionError, zipfile.BadZipFile) as error:
+            raise ServiceError(422, 'unable to parse universe: %s' % error)
+        return 200, FORMATS[format], body, extra
+
+    async def _read_body(self, reader, headers):
+        if 'content-length' not in headers:
+            raise ServiceError(411, 'Content-Length required')
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise ServiceError(400, 'invalid Content-Length')
+        if length > self.max_upload:
+            raise ServiceError(413, 'universe larger than %d bytes' %
+                self.max_upload)
+        if length <= 0:
+            raise ServiceError(400, 'empty universe')
+        return await reader.readexactly(length)
+
+    async def _read_path(self, path):
+        if self.root is None:
+            raise ServiceError(403, 'paths are not enabled (see --root)')
+        filename = os.path.realpath(os.path.join(self.root, path))
+        if not filename.startswith(self.root + os.sep):
+            raise ServiceError(403, 'path outside the service root')
+        if not os.path.isfile(filename):
+            raise ServiceError(404, 'no such universe: %s' % path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _read_file, filename)
+
+    async def _respond(self, writer, status, content_type, body, headers):
+        head = ['HTTP/1.1 %d %s' % (status, _reasons.get(status, 'Unknown')),
+            'Content-Type: %s' % content_type,
+            'Content-Length: %d' % len(body),
+            'Connection: close']
+        head.extend('%s: %s' % header for header in headers)
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        writer.write(body)
+        await writer.drain()
+
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def _read_file(filename):
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+help_message = '''
+Serve universe documentation over HTTP.
+
+python -m pyunv.service [options]
+
+    --host     address to listen on (default 127.0.0.1)
+    --port     TCP port (default 8080)
+    --unix     listen on this Unix socket instead of TCP
+    --workers  parser processes (default: one per CPU)
+    --queue    requests that may wait for a parser (default 256)
+    --cache    documents to cache (default 128)
+    --root     directory that GET /parse?path= may read from
+'''
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    try:
+        opts, args = getopt.getopt(argv[1:], 'h', ['help', 'host=', 'port=',
+            'unix=', 'workers=', 'queue=', 'cache=', 'root='])
+    except getopt.error as msg:
+        print(msg, file=sys.stderr)
+        return 2
+    options = dict(opts)
+    if '-h' in options or '--help' in options:
+        print(help_message)
+        return 0
+    try:
+        workers = int(options['--workers']) if '--workers' in options \
+            else None
+        cache_size = int(options.get('--cache', 128))
+        max_queue = int(options.get('--queue', 256))
+        port = int(options.get('--port', 8080))
+    except ValueError as msg:
+        print(msg, file=sys.stderr)
+        return 2
+    service = UniverseService(workers=workers, cache_size=cache_size,
+        max_queue=max_queue, root=options.get('--root'))
+    try:
+        asyncio.run(service.serve(options.get('--host', '127.0.0.1'), port,
+            options.get('--unix')))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
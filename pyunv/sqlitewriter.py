@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+sqlitewriter.py
+
+Write universes into a SQLite database, for ad-hoc queries across them.
+
+    with SqliteWriter('universes.db') as db:
+        db.add(universe, 'sales.unv')
+
+Every table holds the universe_id of the universes row it belongs to, and
+the universe's own IDs, so the usual joins are on (universe_id, id):
+
+    SELECT u.key, o.name, t.name FROM objects o
+    JOIN cross_references r ON r.universe_id = o.universe_id
+        AND r.object_id = o.id
+    JOIN tables t ON t.universe_id = r.universe_id AND t.id = r.table_id
+    JOIN universes u ON u.id = o.universe_id
+"""
+
+import collections
+import sqlite3
+import time
+
+from pyunv.universe import walk_classes
+
+
+# the entity tables written for each universe: name and (column, SQLite
+# type) pairs. Every table also starts with the universe_id column.
+ENTITIES = collections.OrderedDict([
+    ('parameters', [('name', 'TEXT'), ('value', 'TEXT')]),
+    ('classes', [('id', 'INTEGER'), ('parent_id', 'INTEGER'),
+        ('name', 'TEXT'), ('description', 'TEXT'), ('path', 'TEXT'),
+        ('depth', 'INTEGER')]),
+    ('objects', [('id', 'INTEGER'), ('class_id', 'INTEGER'),
+        ('name', 'TEXT'), ('description', 'TEXT'), ('select_sql', 'TEXT'),
+        ('where_sql', 'TEXT'), ('visible', 'INTEGER'), ('lov_name', 'TEXT')]),
+    ('conditions', [('id', 'INTEGER'), ('class_id', 'INTEGER'),
+        ('name', 'TEXT'), ('description', 'TEXT'), ('where_sql', 'TEXT')]),
+    ('tables', [('id', 'INTEGER'), ('name', 'TEXT'), ('schema', 'TEXT'),
+        ('fullname', 'TEXT'), ('alias_of', 'INTEGER'),
+        ('column_count', 'INTEGER')]),
+    ('columns', [('id', 'INTEGER'), ('table_id', 'INTEGER'),
+        ('name', 'TEXT')]),
+    ('joins', [('id', 'INTEGER'), ('expression', 'TEXT'),
+        ('statement', 'TEXT')]),
+    ('join_terms', [('join_id', 'INTEGER'), ('position', 'INTEGER'),
+        ('table_id', 'INTEGER'), ('column_name', 'TEXT')]),
+    ('contexts', [('id', 'INTEGER'), ('name', 'TEXT'),
+        ('description', 'TEXT')]),
+    ('context_joins', [('context_id', 'INTEGER'), ('join_id', 'INTEGER')]),
+    ('hierarchies', [('id', 'INTEGER'), ('name', 'TEXT'),
+        ('description', 'TEXT')]),
+    ('hierarchy_levels', [('hierarchy_id', 'INTEGER'), ('position', 'INTEGER'),
+        ('object_id', 'INTEGER')]),
+    ('cross_references', [('type', 'TEXT'), ('object_id', 'INTEGER'),
+        ('join_id', 'INTEGER'), ('table_id', 'INTEGER')]),
+    ('sections', [('name', 'TEXT'), ('marker', 'TEXT'), ('status', 'TEXT'),
+        ('reason', 'TEXT')]),
+])
+
+# the columns of the universes table after id and key
+UNIVERSE_COLUMNS = [('name', 'TEXT'), ('filename', 'TEXT'),
+    ('description', 'TEXT'), ('revision', 'INTEGER'), ('created_by', 'TEXT'),
+    ('modified_by', 'TEXT'), ('created_date', 'TEXT'),
+    ('modified_date', 'TEXT'), ('domain', 'TEXT'), ('dbms_engine', 'TEXT'),
+    ('network_layer', 'TEXT')]
+
+
+def universe_row(universe):
+    """Return the values of UNIVERSE_COLUMNS for a universe"""
+    p = universe.parameters
+    if p is None:
+        return (None,) * len(UNIVERSE_COLUMNS)
+    return (p.universe_name, p.universe_filename, p.description,
+        p.revision, p.created_by, p.modified_by,
+        _date(p.created_date), _date(p.modified_date), p.domain,
+        p.dbms_engine, p.network_layer)
+
+
+def entity_rows(universe):
+    """Yield (table, rows) for every table of ENTITIES, in order; each row
+    is a tuple of the table's columns without universe_id"""
+    yield 'parameters', [(name, value) for name, value
+        in (universe.custom_parameters or {}).items()]
+
+    paths = []
+    rows = []
+    for depth, cls in walk_classes(universe.classes):
+        del paths[depth:]
+        paths.append(paths[-1] + '\\' + cls.name if paths else cls.name)
+        rows.append((cls.id_, cls.parent.id_ if cls.parent else None,
+            cls.name, cls.description, paths[-1], depth))
+    yield 'classes', rows
+    index = universe.class_index
+    yield 'objects', [(o.id_, index.classes[position].id_, o.name,
+        o.description, o.select_sql, o.where_sql, int(bool(o.visible)),
+        o.lov_name) for o, position in zip(index.objects,
+        index.object_parents)]
+    yield 'conditions', [(c.id_, index.classes[position].id_, c.name,
+        c.description, c.where_sql) for c, position
+        in zip(index.conditions, index.condition_parents)]
+
+    # database_tables, table_columns and join_details are the reader's
+    # analysis of the schema; the parsed entities are used when a
+    # universe has not been analysed
+    if universe.database_tables:
+        yield 'tables', [(t['id'], t['name'], t['schema'] or None,
+            t['fullname'], t['parent_id'], t['column_count'])
+            for t in universe.database_tables.values()]
+    else:
+        yield 'tables', [(t.id_, t.name, t.schema, t.fullname,
+            t.parent_id if t.is_alias else None, None)
+            for t in universe.tables]
+    if universe.table_columns:
+        yield 'columns', [(c['id'], c['table_id'], c['name'])
+            for columns in universe.table_columns.values()
+            for c in columns]
+    else:
+        yield 'columns', [(c.id_, c.parent.id_ if c.parent else None,
+            c.name) for c in universe.columns]
+    if universe.join_details:
+        joins = [(j['id'], j['expression'], j['statement'], j['terms'])
+            for j in universe.join_details.values()]
+    else:
+        joins = [(j.id_, j.expression, j.statement, j.terms)
+            for j in universe.joins]
+    yield 'joins', [(id_, expression, statement)
+        for id_, expression, statement, terms in joins]
+    yield 'join_terms', [(id_, position, table_id, column)
+        for id_, expression, statement, terms in joins
+        for position, (column, table_id) in enumerate(terms)]
+
+    yield 'contexts', [(c.id_, c.name, c.description)
+        for c in universe.contexts]
+    yield 'context_joins', [(c.id_, join_id)
+        for c in universe.contexts for join_id in c.joins]
+    yield 'hierarchies', [(h.id_, h.name, h.description)
+        for h in universe.hierarchies]
+    yield 'hierarchy_levels', [(h.id_, position, object_id)
+        for h in universe.hierarchies
+        for position, object_id in enumerate(h.levels)]
+    yield 'cross_references', [(r.get('type'), r.get('object_id'),
+        r.get('join_id'), r.get('table_id'))
+        for r in universe.cross_references.values()]
+    yield 'sections', [(status.section, status.marker, status.status,
+        status.reason) for status in universe.section_status.values()]
+
+
+class SqliteWriter(object):
+
+    """Load the object model of universes into normalized SQLite tables
+
+    Each universe is written in one transaction with executemany. The
+    indexes are created by close() (or create_indexes()) once the rows are
+    loaded, which is much faster than updating them row by row; a database
+    that already has them keeps them. A universe added again under the same
+    key replaces its earlier rows.
+
+    """
+
+    _indexes = (
+        'CREATE INDEX IF NOT EXISTS parameters_universe '
+            'ON parameters (universe_id, name)',
+        'CREATE INDEX IF NOT EXISTS classes_id ON classes (universe_id, id)',
+        'CREATE INDEX IF NOT EXISTS objects_id ON objects (universe_id, id)',
+        'CREATE INDEX IF NOT EXISTS objects_class '
+            'ON objects (universe_id, class_id)',
+        'CREATE INDEX IF NOT EXISTS objects_name ON objects (name)',
+        'CREATE INDEX IF NOT EXISTS conditions_id '
+            'ON conditions (universe_id, id)',
+        'CREATE INDEX IF NOT EXISTS tables_id ON tables (universe_id, id)',
+        'CREATE INDEX IF NOT EXISTS tables_name ON tables (name)',
+        'CREATE INDEX IF NOT EXISTS columns_table '
+            'ON columns (universe_id, table_id)',
+        'CREATE INDEX IF NOT EXISTS columns_name ON columns (name)',
+        'CREATE INDEX IF NOT EXISTS joins_id ON joins (universe_id, id)',
+        'CREATE INDEX IF NOT EXISTS join_terms_join '
+            'ON join_terms (universe_id, join_id)',
+        'CREATE INDEX IF NOT EXISTS join_terms_table '
+            'ON join_terms (universe_id, table_id)',
+        'CREATE INDEX IF NOT EXISTS contexts_id ON contexts (universe_id, id)',
+        'CREATE INDEX IF NOT EXISTS context_joins_context '
+            'ON context_joins (universe_id, context_id)',
+        'CREATE INDEX IF NOT EXISTS hierarchies_id '
+            'ON hierarchies (universe_id, id)',
+        'CREATE INDEX IF NOT EXISTS hierarchy_levels_hierarchy '
+            'ON hierarchy_levels (universe_id, hierarchy_id)',
+        'CREATE INDEX IF NOT EXISTS cross_references_object '
+            'ON cross_references (universe_id, object_id)',
+        'CREATE INDEX IF NOT EXISTS cross_references_table '
+            'ON cross_references (universe_id, table_id)',
+        'CREATE INDEX IF NOT EXISTS sections_status '
+            'ON sections (universe_id, status, name)',
+    )
+
+    def __init__(self, path):
+        super(SqliteWriter, self).__init__()
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS universes ('
+            'id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, %s, '
+            'loaded_at REAL)' % ', '.join('%s %s' % column
+            for column in UNIVERSE_COLUMNS))
+        for table, columns in ENTITIES.items():
+            self.connection.execute('CREATE TABLE IF NOT EXISTS %s ('
+                'universe_id INTEGER NOT NULL, %s)' % (table, ', '.join(
+                '%s %s' % column for column in columns)))
+        self.connection.commit()
+        self.rows = 0
+
+    def close(self):
+        if self.connection is not None:
+            self.create_indexes()
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def create_indexes(self):
+        with self.connection:
+            for statement in SqliteWriter._indexes:
+                self.connection.execute(statement)
+
+    def add(self, universe, key):
+        """Write a parsed universe under key, replacing any rows stored
+        under it. Returns the id of its universes row."""
+        with self.connection:
+            self._delete(key)
+            cursor = self.connection.execute(
+                'INSERT INTO universes (key, %s, loaded_at) VALUES (%s)' % (
+                ', '.join(name for name, type_ in UNIVERSE_COLUMNS),
+                ', '.join('?' * (len(UNIVERSE_COLUMNS) + 2))),
+                (key,) + universe_row(universe) + (time.time(),))
+            universe_id = cursor.lastrowid
+            for table, rows in entity_rows(universe):
+                rows = [(universe_id,) + row for row in rows]
+                if rows:
+                    self.connection.executemany(
+                        'INSERT INTO %s VALUES (%s)' % (table,
+                        ', '.join('?' * len(rows[0]))), rows)
+                    self.rows += len(rows)
+        return universe_id
+
+    def remove(self, key):
+        with self.connection:
+            self._delete(key)
+
+    def _delete(self, key):
+        row = self.connection.execute(
+            'SELECT id FROM universes WHERE key = ?', (key,)).fetchone()
+        if row:
+            for table in ENTITIES:
+                self.connection.execute(
+                    'DELETE FROM %s WHERE universe_id = ?' % table, row)
+            self.connection.execute('DELETE FROM universes WHERE id = ?', row)
+
+
+def _date(value):
+    return value.isoformat() if value is not None else None
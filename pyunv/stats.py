@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+stats.py
+
+Timing and throughput statistics for the stages of a universe parse.
+"""
+
+import collections
+import time
+
+
+class StageStats(object):
+
+    """Wall time, bytes read and records produced by one Reader stage"""
+
+    def __init__(self, name, seconds=0.0, bytes_read=0, records=0):
+        super(StageStats, self).__init__()
+        self.name = name
+        self.seconds = seconds
+        self.bytes_read = bytes_read
+        self.records = records
+
+    def __str__(self):
+        return '%-56s %10.3f ms %10d bytes %8d records' % (self.name,
+            self.seconds * 1000, self.bytes_read, self.records)
+
+
+class ReaderStats(object):
+
+    """Statistics for every stage of a Reader, in the order they ran
+
+    Pass an instance to Reader to switch instrumentation on. Hooks are
+    called with each StageStats as soon as its stage finishes.
+
+        stats = ReaderStats(hooks=[lambda stage: print(stage)])
+        universe = Reader(f, stats=stats).universe
+        print(stats.report())
+
+    """
+
+    def __init__(self, hooks=None):
+        super(ReaderStats, self).__init__()
+        self.stages = collections.OrderedDict()
+        self.hooks = list(hooks or [])
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def record(self, name, seconds, bytes_read=0, records=0):
+        stage = StageStats(name, seconds, bytes_read, records)
+        self.stages[name] = stage
+        for hook in self.hooks:
+            hook(stage)
+        return stage
+
+    def __getitem__(self, name):
+        return self.stages[name]
+
+    def __iter__(self):
+        return iter(self.stages.values())
+
+    def __len__(self):
+        return len(self.stages)
+
+    @property
+    def total_seconds(self):
+        """Time spent in top-level stages (nested stages contain a '.')"""
+        return sum(s.seconds for s in self.stages.values()
+            if '.' not in s.name)
+
+    def report(self):
+        lines = [str(stage) for stage in self.stages.values()]
+        lines.append('%-56s %10.3f ms' % ('total',
+            self.total_seconds * 1000))
+        return '\n'.join(lines)
+
+
+class CountingFile(object):
+
+    """File wrapper that counts the bytes read through it"""
+
+    def __init__(self, f):
+        super(CountingFile, self).__init__()
+        self._file = f
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def count_records(result):
+    """Return the number of records a stage produced"""
+    if result is None:
+        return 0
+    if isinstance(result, (bytes, bytearray, memoryview)):
+        return 1 if len(result) else 0
+    if isinstance(result, (list, tuple, dict, set)):
+        return len(result)
+    return 1
+
+
+clock = time.perf_counter
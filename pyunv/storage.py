@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+storage.py
+
+Access to the PKZip container embedded in a universe file.
+
+A .unv file is a zip archive (behind a short header) whose members are the
+universe sections (Tables;, Objects;, ...) and the UNW_Storage and
+ResourceHeader folders. EmbeddedStorage reads the central directory once
+and returns member data on request, straight out of the universe buffer.
+"""
+
+import struct
+import zipfile
+
+from pyunv.buffer import BufferCursor
+
+
+class EmbeddedStorage(object):
+
+    """The zip container of a universe, read in place"""
+
+    _end_of_central_directory = b'PK\x05\x06'
+    _local_header = struct.Struct('<4s5H3I2H')
+
+    def __init__(self, buffer):
+        super(EmbeddedStorage, self).__init__()
+        self._cursor = BufferCursor(buffer)
+        self._zip = zipfile.ZipFile(self._cursor)
+        self._entries = dict((info.filename, info)
+            for info in self._zip.infolist())
+        self._cache = {}
+
+    @classmethod
+    def find(cls, buffer):
+        """Return the EmbeddedStorage for a universe buffer, or None if the
+        buffer holds no zip container"""
+        if buffer.rfind(cls._end_of_central_directory) == -1:
+            return None
+        try:
+            return cls(buffer)
+        except (zipfile.BadZipFile, struct.error, ValueError):
+            return None
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def names(self, prefix=''):
+        return [name for name in self._entries if name.startswith(prefix)
+            and not name.endswith('/')]
+
+    def checksums(self):
+        """Return {member name: (CRC-32, size)} from the central directory,
+        without reading any member data"""
+        return dict((name, (info.CRC, info.file_size))
+            for name, info in self._entries.items() if not info.is_dir())
+
+    def read(self, name):
+        """Return the data of a member, or None if there is no such member
+
+        Stored (uncompressed) members are returned as memoryview slices of
+        the universe buffer; compressed members are inflated on first use.
+
+        """
+        if name in self._cache:
+            return self._cache[name]
+        info = self._entries.get(name)
+        if info is None or info.is_dir():
+            return None
+        if info.compress_type == zipfile.ZIP_STORED:
+            data = self._stored_data(info)
+        else:
+            data = self._zip.read(info)
+        self._cache[name] = data
+        return data
+
+    def folder(self, prefix):
+        """Return a StorageFolder for a folder of the container, or None if
+        the container has no such folder"""
+        if not prefix.endswith('/'):
+            prefix += '/'
+        if not any(name.startswith(prefix) for name in self._entries):
+            return None
+        return StorageFolder(self, prefix)
+
+    def _stored_data(self, info):
+        # zipfile has already shifted header_offset past the universe header
+        # in front of the archive
+        header = self._local_header.unpack_from(self._cursor.view,
+            info.header_offset)
+        name_length, extra_length = header[-2:]
+        start = info.header_offset + self._local_header.size + name_length + \
+            extra_length
+        return self._cursor.view_at(start, info.compress_size)
+
+
+class StorageFolder(object):
+
+    """A folder of the embedded container, e.g. UNW_Storage/"""
+
+    def __init__(self, storage, prefix):
+        super(StorageFolder, self).__init__()
+        self.storage = storage
+        self.prefix = prefix
+
+    def __contains__(self, name):
+        return self.prefix + name in self.storage
+
+    def read(self, name):
+        return self.storage.read(self.prefix + name)
+
+    def names(self):
+        return [name[len(self.prefix):]
+            for name in self.storage.names(self.prefix)]
@@ -9,9 +9,7 @@ Copyright (c) 2009 David Peckham. All rights reserved.
 Enhanced by Sanjay Sharma (indoos@gmail.com) 2025-10-17.
 """
 
-import os
 import re
-import sys
 import collections
 __version__ = "0.3.0"
 
@@ -84,7 +82,7 @@ class Universe(object):
         self.unw_dynamic_properties_descriptions = None
         self.unw_fc_information = None
         self.unw_graphical_comments = None
-        self.unw_hidden_items = []
+        self.unw_hidden_items = {}
         self.unw_hierarchies = None
         self.unw_input_columns = None
         self.unw_joins = None
@@ -92,6 +90,13 @@ class Universe(object):
         self.unw_parameters = {}
         self.unw_tables = None
         self.unw_upward_aggregate_aware = None
+        # Parsed XML-LOV; section, by object id and by Object.lov_name
+        self.lovs = {}
+        self.lov_index = {}
+        # Offsets, lengths and checksums of the raw sections
+        self.sections = None
+        # How each section was read: {attribute: SectionStatus}
+        self.section_status = {}
         # Parsed ResourceHeader data
         self.resource_descriptor = None
         self.resource_b_descriptor = None
@@ -99,7 +104,9 @@ class Universe(object):
         # Analysis data
         self.cross_references = {}
         self.validation_errors = []
+        self.validation_timings = {}
         self.dependency_graph = {}
+        self.dependencies = None
         # Enhanced analysis data
         self.database_tables = {}
         self.table_columns = {}
@@ -110,6 +117,58 @@ class Universe(object):
         self.stored_procedure_parameters = {}  # {procedure_name: [{name, type, value}, ...]}
         self.table_map = {}
         self.object_map = {}
+        self._classes = []
+        self._hierarchy = None
+        self._index = None
+
+    @property
+    def classes(self):
+        return self._classes
+
+    @classes.setter
+    def classes(self, classes):
+        self._classes = classes
+        self._hierarchy = None
+        self._index = None
+
+    @property
+    def hierarchy(self):
+        """The class hierarchy flattened in pre-order: a HierarchyEntry for
+        each class, followed by entries for its objects and conditions and
+        then by its subclasses. Built on first use and cached; call
+        invalidate_hierarchy after changing the classes in place."""
+        if self._hierarchy is None:
+            self._hierarchy = flatten_classes(self._classes)
+        return self._hierarchy
+
+    def invalidate_hierarchy(self):
+        self._hierarchy = None
+        self._index = None
+
+    @property
+    def class_index(self):
+        """The ClassIndex of the class hierarchy, built on first use (the
+        Reader builds it once the classes are read) and cached with the
+        hierarchy"""
+        if self._index is None:
+            self.build_class_index()
+        return self._index
+
+    def build_class_index(self):
+        """Construct the class index, so objects and conditions can be
+        found by ID"""
+        self._index = ClassIndex(self.hierarchy)
+        return self._index
+
+    @property
+    def objects(self):
+        """Every object of every class, in ID order"""
+        return self.class_index.objects
+
+    @property
+    def conditions(self):
+        """Every condition of every class, in ID order"""
+        return self.class_index.conditions
 
     def build_table_map(self):
         """Construct a table map so we can expand where and select clauses"""
@@ -118,14 +177,8 @@ class Universe(object):
 
     def build_object_map(self):
         """Construct an object map so we can expand where and select clauses"""
-        for c in self.classes:
-            self._map_objects(c)
-    
-    def _map_objects(self, c):
-        for o in c.objects:
+        for o in self.objects:
             self.object_map[o.id_] = o
-        for subclass in c.subclasses:
-            self._map_objects(subclass)
     
     @property
     def statistics(self):
@@ -148,8 +201,7 @@ class Universe(object):
                 self.conditions += 1
         
         counter = Counter()
-        for c in self.classes:
-            c.accept(counter)
+        visit_hierarchy(self.hierarchy, counter)
         
         stats = dict()
         stats["classes"] = counter.classes
@@ -200,13 +252,7 @@ class Class(object):
         self.subclasses = []
     
     def accept(self, visitor):
-        visitor.visit_class(self)
-        for o in self.objects:
-            o.accept(visitor)
-        for c in self.conditions:
-            c.accept(visitor)
-        for s in self.subclasses:
-            s.accept(visitor)
+        visit_hierarchy(flatten_classes([self]), visitor)
 
 
 class Join(object):
@@ -296,6 +342,7 @@ class ObjectBase(object):
         self.description = description
         self.select_table_refs = []
         self.where_table_refs = []
+        self.object_refs = []
         self.select = None
         self.where = None
         self.visible = True
@@ -326,13 +373,19 @@ class ObjectBase(object):
     def expand_sql(self, sql):
         """Return the SQL with table names instead of table IDs"""
         if sql:
-            p = re.compile(r'(?:'+chr(3)+')([0-9]{1,4})')
+            p = re.compile(r'(?:'+chr(3)+')([0-9]+)')
             expanded_sql = p.sub(self.lookup_table, sql)
-            p = re.compile(r'(?:'+chr(2)+')([0-9]{1,4})')
+            p = re.compile(r'(?:'+chr(2)+')([0-9]+)')
             return p.sub(self.lookup_object, expanded_sql)
         else:
             return None
     
+    @property
+    def table_refs(self):
+        """IDs of the tables this object references directly"""
+        return self.select_table_refs + [t for t in self.where_table_refs 
+            if t not in self.select_table_refs]
+    
     @property
     def select_sql(self):
         return self.expand_sql(self.select)
@@ -353,6 +406,11 @@ class Object(ObjectBase):
         self.format = None
         self.lov_name = None
     
+    @property
+    def lov(self):
+        """The ListOfValues of this object, if the universe defines one"""
+        return self.universe.lovs.get(self.id_)
+    
     @classmethod
     def unknown(cls):
         # Create a dummy universe for unknown objects
@@ -454,6 +512,79 @@ class Column(object):
             self.id_, self.name, self.parent)
 
 
+class ListOfValues(object):
+    
+    """The list of values specification of an object (XML-LOV; section)
+    
+    properties holds the attributes of LOV_PROPERTIES as written by
+    Designer; requests holds one dict per REQUEST with its type, name and
+    the IDs of the objects it returns (several for a hierarchical LOV).
+    """
+    
+    def __init__(self, universe, object_id, properties=None, requests=None):
+        super(ListOfValues, self).__init__()
+        self.universe = universe
+        self.object_id = object_id
+        self.properties = properties or {}
+        self.requests = requests or []
+    
+    def flag(self, name):
+        return self.properties.get(name, '').upper() in ('Y', 'YES', 'TRUE')
+    
+    def number(self, name):
+        try:
+            return int(self.properties[name])
+        except (KeyError, ValueError):
+            return None
+    
+    @property
+    def display(self):
+        return self.properties.get('Display')
+    
+    @property
+    def distinct(self):
+        return self.flag('Distinct')
+    
+    @property
+    def max_lines(self):
+        return self.number('Max_Lines')
+    
+    @property
+    def max_time(self):
+        return self.number('Max_Time')
+    
+    @property
+    def refresh(self):
+        """Refreshed automatically before use"""
+        return self.flag('Refresh')
+    
+    @property
+    def delegate_search(self):
+        return self.flag('Delegate_Search')
+    
+    @property
+    def result_ids(self):
+        """IDs of the objects the main request returns"""
+        for request in self.requests:
+            if request['type'] == 'Main':
+                return request['results']
+        return self.requests[0]['results'] if self.requests else []
+    
+    @property
+    def is_hierarchical(self):
+        return self.display == 'Hierarchical' or len(self.result_ids) > 1
+    
+    @property
+    def lov_name(self):
+        obj = self.universe.object_map.get(self.object_id) \
+            if self.universe else None
+        return obj.lov_name if obj else None
+    
+    def __str__(self):
+        return '%s object_id=%d, properties=%s' % (type(self),
+            self.object_id, self.properties)
+
+
 class ClassVisitor(object):
     
     """Visits each node in the class, object, and condition hierarchy"""
@@ -472,3 +603,88 @@ class ClassVisitor(object):
     def visit_condition(self, condition):
         """docstring for visit_condition"""
         pass
+
+
+class HierarchyEntry(collections.namedtuple('HierarchyEntry',
+        ['depth', 'cls', 'obj'])):
+
+    """An entry of the flattened class hierarchy: a class at a depth (root
+    classes are at depth 0) when obj is None, else one of the class's
+    objects or conditions"""
+
+    __slots__ = ()
+
+
+def walk_classes(classes, depth=0):
+    """Yield (depth, class) for the classes and all their subclasses in
+    pre-order. The walk keeps an explicit stack, so deep hierarchies do not
+    reach the recursion limit."""
+    stack = [(depth, c) for c in reversed(classes)]
+    while stack:
+        depth, cls = stack.pop()
+        yield depth, cls
+        if cls.subclasses:
+            stack.extend((depth + 1, s) for s in reversed(cls.subclasses))
+
+
+def flatten_classes(classes, depth=0):
+    """Return the classes, objects and conditions of a class hierarchy as a
+    list of HierarchyEntry in pre-order"""
+    entries = []
+    append = entries.append
+    for depth, cls in walk_classes(classes, depth):
+        append(HierarchyEntry(depth, cls, None))
+        for o in cls.objects:
+            append(HierarchyEntry(depth, cls, o))
+        for c in cls.conditions:
+            append(HierarchyEntry(depth, cls, c))
+    return entries
+
+
+def visit_hierarchy(entries, visitor):
+    """Call a ClassVisitor for each entry of a flattened hierarchy, in the
+    order Class.accept visits them"""
+    for entry in entries:
+        if entry.obj is None:
+            visitor.visit_class(entry.cls)
+        else:
+            entry.obj.accept(visitor)
+
+
+class ClassIndex(object):
+
+    """Flat arrays over a class hierarchy
+
+    classes holds the classes in pre-order. objects and conditions hold
+    every object and condition in ID order (ties keep hierarchy order), and
+    object_parents and condition_parents the position in classes of the
+    class each one belongs to.
+
+    """
+
+    def __init__(self, hierarchy):
+        super(ClassIndex, self).__init__()
+        self.classes = []
+        objects = []
+        conditions = []
+        for entry in hierarchy:
+            if entry.obj is None:
+                self.classes.append(entry.cls)
+            elif isinstance(entry.obj, Condition):
+                conditions.append((entry.obj, len(self.classes) - 1))
+            else:
+                objects.append((entry.obj, len(self.classes) - 1))
+        objects.sort(key=lambda item: item[0].id_)
+        conditions.sort(key=lambda item: item[0].id_)
+        self.objects = [o for o, parent in objects]
+        self.object_parents = [parent for o, parent in objects]
+        self.conditions = [c for c, parent in conditions]
+        self.condition_parents = [parent for c, parent in conditions]
+
+    def object_class(self, position):
+        """Return the class of objects[position]"""
+        return self.classes[self.object_parents[position]]
+
+    def condition_class(self, position):
+        """Return the class of conditions[position]"""
+        return self.classes[self.condition_parents[position]]
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+validation.py
+
+Pluggable validation rules for universes.
+"""
+
+import collections
+import re
+import time
+
+
+_table_pattern = re.compile(r'\b([A-Za-z_][A-Za-z0-9_]*)\.')
+_sql_keywords = frozenset(['SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'NOT',
+    'IN', 'BETWEEN', 'LIKE', 'IS', 'NULL'])
+_object_token = re.compile(chr(2) + r'([0-9]+)')
+
+
+def table_references(sql):
+    """Return the names that appear as table qualifiers (Table.column) in
+    an expanded SQL expression"""
+    if not sql:
+        return []
+    return sorted(set(match for match in _table_pattern.findall(sql)
+        if match.upper() not in _sql_keywords))
+
+
+class ValidationIndex(object):
+
+    """Lookups shared by every rule, built once per universe
+
+    Expanded SQL and the table names it references are computed once per
+    object and condition, instead of once per rule.
+
+    """
+
+    def __init__(self, universe):
+        super(ValidationIndex, self).__init__()
+        self.universe = universe
+        self.table_names = set(t.name for t in universe.tables)
+        classes = universe.class_index
+        self.objects = classes.objects
+        self.conditions = classes.conditions
+        self.parent = {}
+        for obj, position in zip(classes.objects, classes.object_parents):
+            self.parent[id(obj)] = classes.classes[position]
+        for condition, position in zip(classes.conditions,
+                classes.condition_parents):
+            self.parent[id(condition)] = classes.classes[position]
+
+        self.select_sql = {}
+        self.where_sql = {}
+        self.select_refs = {}
+        self.where_refs = {}
+        for obj in self.objects + self.conditions:
+            key = id(obj)
+            self.select_sql[key] = obj.select_sql
+            self.where_sql[key] = obj.where_sql
+            self.select_refs[key] = table_references(self.select_sql[key])
+            self.where_refs[key] = table_references(self.where_sql[key])
+
+        self.joined_tables = set()
+        for join in universe.joins:
+            self.joined_tables.update(table_id for column, table_id
+                in join.terms)
+        self.used_tables = set()
+        tables_by_name = dict((t.name, t.id_) for t in universe.tables)
+        for obj in self.objects + self.conditions:
+            self.used_tables.update(obj.table_refs)
+            for name in self.select_refs[id(obj)] + self.where_refs[id(obj)]:
+                if name in tables_by_name:
+                    self.used_tables.add(tables_by_name[name])
+        self.context_joins = set()
+        for context in universe.contexts:
+            self.context_joins.update(context.joins)
+        # hidden by their own flag, by the UNW_Storage Hidden_Items entry or
+        # by being in a hidden class
+        hidden = universe.unw_hidden_items or {}
+        hidden_classes = set(hidden.get('classes', ()))
+        self.hidden_objects = set(hidden.get('objects', ()))
+        self.hidden_conditions = set(hidden.get('conditions', ()))
+        for obj in self.objects:
+            if not obj.visible or self.parent[id(obj)].id_ in hidden_classes:
+                self.hidden_objects.add(obj.id_)
+        for condition in self.conditions:
+            if self.parent[id(condition)].id_ in hidden_classes:
+                self.hidden_conditions.add(condition.id_)
+
+
+class ValidationRule(object):
+
+    """Base class for validation rules
+
+    A rule overrides the check_* methods for the entities it inspects. Each
+    check returns a list of error dicts (or None). The engine only calls the
+    methods a rule overrides.
+
+    """
+
+    name = None
+
+    def begin(self, index):
+        """Called once before the pass over the entities"""
+        pass
+
+    def check_object(self, obj, index):
+        pass
+
+    def check_condition(self, condition, index):
+        pass
+
+    def check_table(self, table, index):
+        pass
+
+    def check_join(self, join, index):
+        pass
+
+    def check_context(self, context, index):
+        pass
+
+    def end(self, index):
+        """Called once after the pass; may return errors of its own"""
+        pass
+
+
+class BrokenReferenceRule(ValidationRule):
+
+    """Objects whose SQL names a table that is not in the universe"""
+
+    name = 'broken_reference'
+
+    def check_object(self, obj, index):
+        errors = []
+        for sql_type, refs in (('select', index.select_refs[id(obj)]),
+                ('where', index.where_refs[id(obj)])):
+            for broken_ref in refs:
+                if broken_ref in index.table_names:
+                    continue
+                errors.append({
+                    'type': 'broken_reference',
+                    'object_id': obj.id_,
+                    'object_name': obj.name,
+                    'sql_type': sql_type,
+                    'broken_reference': broken_ref,
+                    'message': "Object '%s' references non-existent table "
+                        "'%s' in %s clause" % (obj.name, broken_ref,
+                        sql_type.upper())
+                })
+        return errors
+
+
+class OrphanedObjectRule(ValidationRule):
+
+    """Objects whose SELECT has no table references"""
+
+    name = 'orphaned_object'
+
+    def check_object(self, obj, index):
+        if index.select_sql[id(obj)] and not index.select_refs[id(obj)]:
+            return [{
+                'type': 'orphaned_object',
+                'object_id': obj.id_,
+                'object_name': obj.name,
+                'message': "Object '%s' has no table references in SELECT "
+                    "clause" % obj.name
+            }]
+
+
+class MissingJoinRule(ValidationRule):
+
+    """Tables used by objects that are not joined to any other table"""
+
+    name = 'missing_join'
+
+    def check_table(self, table, index):
+        if len(index.universe.tables) > 1 and \
+                table.id_ in index.used_tables and \
+                table.id_ not in index.joined_tables:
+            return [{
+                'type': 'missing_join',
+                'table_id': table.id_,
+                'table_name': table.name,
+                'message': "Table '%s' is used by objects but has no "
+                    "joins" % table.name
+            }]
+
+
+class AliasWithoutParentRule(ValidationRule):
+
+    """Aliases whose original table is not in the universe"""
+
+    name = 'alias_without_parent'
+
+    def check_table(self, table, index):
+        if table.is_alias and \
+                table.parent_id not in index.universe.table_map:
+            return [{
+                'type': 'alias_without_parent',
+                'table_id': table.id_,
+                'table_name': table.name,
+                'parent_id': table.parent_id,
+                'message': "Alias '%s' refers to missing table %d" % (
+                    table.name, table.parent_id)
+            }]
+
+
+class HiddenReferenceRule(ValidationRule):
+
+    """Visible objects and conditions that use a hidden object"""
+
+    name = 'hidden_reference'
+
+    def _check(self, obj, hidden, index):
+        if obj.id_ in hidden:
+            return
+        object_ids = set(obj.object_refs)
+        for sql in (obj.select, obj.where):
+            if sql:
+                object_ids.update(int(o) for o in _object_token.findall(sql))
+        return [{
+            'type': 'hidden_reference',
+            'object_id': obj.id_,
+            'object_name': obj.name,
+            'hidden_object_id': object_id,
+            'message': "'%s' uses hidden object %d" % (obj.name, object_id)
+        } for object_id in sorted(object_ids & index.hidden_objects)]
+
+    def check_object(self, obj, index):
+        return self._check(obj, index.hidden_objects, index)
+
+    def check_condition(self, condition, index):
+        return self._check(condition, index.hidden_conditions, index)
+
+
+class UnusedTableRule(ValidationRule):
+
+    """Tables that no object, condition or join uses"""
+
+    name = 'unused_table'
+
+    def check_table(self, table, index):
+        if table.id_ not in index.used_tables and \
+                table.id_ not in index.joined_tables:
+            return [{
+                'type': 'unused_table',
+                'table_id': table.id_,
+                'table_name': table.name,
+                'message': "Table '%s' is not used by any object, condition "
+                    "or join" % table.name
+            }]
+
+
+class JoinContextCoverageRule(ValidationRule):
+
+    """Joins that belong to no context in a universe that has contexts"""
+
+    name = 'join_not_in_context'
+
+    def check_join(self, join, index):
+        if index.universe.contexts and join.id_ not in index.context_joins:
+            return [{
+                'type': 'join_not_in_context',
+                'join_id': join.id_,
+                'message': "Join %d (%s) is not in any context" % (join.id_,
+                    join.statement)
+            }]
+
+
+class DuplicateObjectNameRule(ValidationRule):
+
+    """Objects that share a name with another object of the same class"""
+
+    name = 'duplicate_object_name'
+
+    def begin(self, index):
+        self.seen = {}
+
+    def check_object(self, obj, index):
+        key = (id(index.parent[id(obj)]), obj.name)
+        first = self.seen.setdefault(key, obj)
+        if first is not obj:
+            return [{
+                'type': 'duplicate_object_name',
+                'object_id': obj.id_,
+                'object_name': obj.name,
+                'duplicate_of': first.id_,
+                'message': "Object '%s' (id %d) has the same name as object "
+                    "%d" % (obj.name, obj.id_, first.id_)
+            }]
+
+
+# the checks Reader has always run; their results fill
+# Universe.validation_errors
+DEFAULT_RULES = (BrokenReferenceRule, OrphanedObjectRule)
+
+ALL_RULES = DEFAULT_RULES + (MissingJoinRule, AliasWithoutParentRule,
+    HiddenReferenceRule, UnusedTableRule, JoinContextCoverageRule,
+    DuplicateObjectNameRule)
+
+
+class ValidationEngine(object):
+
+    """Run a set of rules over a universe with shared indexes
+
+    Each kind of entity is handed, a rule at a time, to every rule that
+    checks that kind. Errors are returned grouped by rule, in rule order,
+    and the time spent in each rule is kept in timings (seconds).
+
+        engine = ValidationEngine(ALL_RULES)
+        errors = engine.run(universe)
+        slowest = max(engine.timings, key=engine.timings.get)
+
+    """
+
+    _hooks = (('check_table', 'tables'), ('check_join', 'joins'),
+        ('check_context', 'contexts'))
+
+    def __init__(self, rules=DEFAULT_RULES):
+        super(ValidationEngine, self).__init__()
+        self.rules = [rule() if isinstance(rule, type) else rule
+            for rule in rules]
+        self.timings = collections.OrderedDict()
+        self.index = None
+
+    def run(self, universe):
+        clock = time.perf_counter
+        start = clock()
+        self.index = index = ValidationIndex(universe)
+        self.timings = collections.OrderedDict(
+            (rule.name, 0.0) for rule in self.rules)
+        self.timings['(index)'] = clock() - start
+        results = dict((rule.name, []) for rule in self.rules)
+
+        def dispatch(hook, entities):
+            checks = [(rule.name, getattr(rule, hook)) for rule in self.rules
+                if getattr(type(rule), hook) is not
+                    getattr(ValidationRule, hook)]
+            if not checks:
+                return
+            # each rule is timed once over the whole batch, not per entity
+            for name, check in checks:
+                found = results[name]
+                started = clock()
+                for entity in entities:
+                    errors = check(entity, index)
+                    if errors:
+                        found.extend(errors)
+                self.timings[name] += clock() - started
+
+        for rule in self.rules:
+            started = clock()
+            rule.begin(index)
+            self.timings[rule.name] += clock() - started
+        dispatch('check_object', index.objects)
+        dispatch('check_condition', index.conditions)
+        for hook, attribute in ValidationEngine._hooks:
+            dispatch(hook, getattr(universe, attribute))
+        for rule in self.rules:
+            started = clock()
+            errors = rule.end(index)
+            self.timings[rule.name] += clock() - started
+            if errors:
+                results[rule.name].extend(errors)
+
+        errors = []
+        for rule in self.rules:
+            errors.extend(results[rule.name])
+        return errors
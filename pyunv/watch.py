@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+watch.py
+
+Keep the documents of a directory of universes current as they change.
+
+    watcher = UniverseWatcher('/shared/universes', write_documents)
+    watcher.run()
+
+Changes are picked up with inotify on Linux and by polling elsewhere.
+Saves are debounced, and a universe is parsed again only when its content
+changed: first its size and mtime are compared, then a hash of the file,
+then the CRC-32 of each member of its embedded zip container, so a file
+rewritten with the same sections is not parsed again.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+
+from pyunv.csvwriter import CsvWriter
+from pyunv.manifest import Manifest
+from pyunv.reader import Reader
+from pyunv.storage import EmbeddedStorage
+
+
+def is_universe(filename):
+    return filename.lower().endswith('.unv')
+
+
+def write_documents(filename, universe, template=None):
+    """Write the manifest (universe.unv.txt) and inventory (universe.unv.csv)
+    of a universe next to it. Each file is replaced in one step, so readers
+    never see half a document."""
+    for suffix, write in (('.txt', lambda f: Manifest(universe,
+            template).save(f)), ('.csv', lambda f: CsvWriter(universe, f))):
+        target = filename + suffix
+        partial = target + '.partial'
+        with open(partial, 'w', newline='' if suffix == '.csv' else None) \
+                as f:
+            write(f)
+        os.replace(partial, target)
+
+
+def _walk(root):
+    for directory, subdirectories, filenames in os.walk(root):
+        for filename in filenames:
+            if is_universe(filename):
+                yield os.path.join(directory, filename)
+
+
+class PollingSource(object):
+
+    """Reports changed universes by comparing stat results every interval"""
+
+    def __init__(self, root, interval=2.0):
+        super(PollingSource, self).__init__()
+        self.root = root
+        self.interval = interval
+        self.stats = self._scan()
+
+    def _scan(self):
+        stats = {}
+        for path in _walk(self.root):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats[path] = (st.st_size, st.st_mtime_ns)
+        return stats
+
+    def wait(self, timeout=None):
+        """Wait up to timeout seconds (or one interval) and return the set
+        of universes created, changed or removed since the last call"""
+        delay = self.interval if timeout is None else min(timeout,
+            self.interval)
+        if delay > 0:
+            time.sleep(delay)
+        stats = self._scan()
+        changed = set(path for path in set(stats) | set(self.stats)
+            if stats.get(path) != self.stats.get(path))
+        self.stats = stats
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifySource(object):
+
+    """Reports changed universes with Linux inotify watches on every
+    directory of the tree. Waiting blocks in select, so an idle watcher
+    uses no CPU."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = 0o2000000
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | \
+        IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    _event = struct.Struct('iIII')
+    _libc = None
+
+    def __init__(self, root):
+        super(InotifySource, self).__init__()
+        libc = self.load()
+        if libc is None:
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.root = root
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = {}
+        self._add_tree(root)
+
+    @classmethod
+    def load(cls):
+        """Return libc if it provides inotify, else None"""
+        if cls._libc is None and sys.platform.startswith('linux'):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or
+                    'libc.so.6', use_errno=True)
+                libc.inotify_init1
+            except (OSError, AttributeError):
+                return None
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                ctypes.c_uint32]
+            cls._libc = libc
+        return cls._libc
+
+    def _add_tree(self, root):
+        """Watch root and its subdirectories; returns the universes found in
+        them, which may have been written before the watch was in place"""
+        found = set()
+        for directory, subdirectories, filenames in os.walk(root):
+            wd = self._libc.inotify_add_watch(self.fd,
+                os.fsencode(directory), self.MASK)
+            if wd >= 0:
+                self.directories[wd] = directory
+            found.update(os.path.join(directory, filename)
+                for filename in filenames if is_universe(filename))
+        return found
+
+    def wait(self, timeout=None):
+        """Wait up to timeout seconds (forever if None) and return the set
+        of universes created, changed or removed, or None if events were
+        lost and the tree should be scanned again"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self._event.unpack_from(data,
+                    offset)
+                offset += self._event.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                directory = self.directories.get(wd)
+                if directory is None:
+                    continue
+                if mask & self.IN_IGNORED:
+                    del self.directories[wd]
+                    continue
+                path = os.path.join(directory, name)
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        changed.update(self._add_tree(path))
+                elif is_universe(name):
+                    changed.add(path)
+        return None if overflow else changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class UniverseWatcher(object):
+
+    """Document the universes under a directory, and document them again
+    when they change
+
+    document is called as document(filename, universe) for every universe
+    that needs documenting; write_documents is the usual choice. Events for
+    a file are collected until it has been quiet for debounce seconds.
+
+    """
+
+    def __init__(self, root, document, debounce=1.0, interval=2.0,
+            inotify=None, log=None):
+        super(UniverseWatcher, self).__init__()
+        self.root = os.path.abspath(root)
+        self.document = document
+        self.debounce = debounce
+        self.log = log
+        self.states = {}
+        self.pending = {}
+        self.documented = 0
+        self.skipped = 0
+        if inotify is None:
+            inotify = InotifySource.load() is not None
+        self.source = InotifySource(self.root) if inotify else \
+            PollingSource(self.root, interval)
+
+    def _log(self, message, *args):
+        if self.log is not None:
+            self.log(message % args)
+
+    def scan(self):
+        """Document every universe whose manifest is missing or older than
+        the universe, and remember the state of the others"""
+        for path in _walk(self.root):
+            try:
+                current = os.stat(path + '.txt').st_mtime_ns >= \
+                    os.stat(path).st_mtime_ns
+            except OSError:
+                current = False
+            if current:
+                self.remember(path)
+            else:
+                self.check(path, force=True)
+
+    def _fingerprint(self, path):
+        """Return (data, state) for a universe, or None if it has gone"""
+        try:
+            st = os.stat(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        storage = EmbeddedStorage.find(data)
+        return data, {'stat': (st.st_size, st.st_mtime_ns),
+            'digest': hashlib.sha1(data).hexdigest(),
+            'checksums': storage.checksums() if storage is not None else None}
+
+    def remember(self, path):
+        """Record the state of a universe whose documents are current"""
+        fingerprint = self._fingerprint(path)
+        if fingerprint is not None:
+            self.states[path] = fingerprint[1]
+
+    def changed_sections(self, old, new):
+        """Return the container members that differ between two states
+        (empty if only bytes outside the sections changed), or None if
+        either universe has no container"""
+        if old['digest'] == new['digest']:
+            return []
+        if old['checksums'] is None or new['checksums'] is None:
+            return None
+        return sorted(name for name in set(old['checksums']) |
+            set(new['checksums']) if old['checksums'].get(name) !=
+            new['checksums'].get(name))
+
+    def check(self, path, force=False):
+        """Document a universe if it changed since it was last seen.
+        Returns True if it was documented."""
+        old = self.states.get(path)
+        if not force and old is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is not None and old['stat'] == (st.st_size,
+                    st.st_mtime_ns):
+                return False
+        fingerprint = self._fingerprint(path)
+        if fingerprint is None:
+            self.states.pop(path, None)
+            return False
+        data, state = fingerprint
+        if not force and old is not None:
+            changed = self.changed_sections(old, state)
+            if changed == []:
+                self.states[path] = state
+                self.skipped += 1
+                self._log('%s: unchanged', path)
+                return False
+            if changed:
+                self._log('%s: %d sections changed (%s)', path,
+                    len(changed), ', '.join(changed[:5]))
+        try:
+            universe = Reader.from_bytes(data).universe
+            self.document(path, universe)
+        except Exception as error:
+            # a universe that is still being written, or is damaged; it is
+            # tried again when it next changes
+            self._log('%s: unable to document (%s: %s)', path,
+                type(error).__name__, error)
+            self.states.pop(path, None)
+            return False
+        self.states[path] = state
+        self.documented += 1
+        self._log('%s: documented', path)
+        return True
+
+    def step(self, timeout=None):
+        """Wait for changes (up to timeout seconds), then document the
+        universes that have settled. Returns the universes documented."""
+        now = time.monotonic()
+        if self.pending:
+            deadline = min(self.pending.values()) - now
+            timeout = deadline if timeout is None else min(timeout, deadline)
+            timeout = max(0, timeout)
+        changed = self.source.wait(timeout)
+        now = time.monotonic()
+        if changed is None:
+            changed = set(_walk(self.root)) | set(self.states)
+        for path in changed:
+            self.pending[path] = now + self.debounce
+        documented = []
+        for path, due in sorted(self.pending.items()):
+            if due > now:
+                continue
+            del self.pending[path]
+            if self.check(path):
+                documented.append(path)
+        return documented
+
+    def run(self, stop=None):
+        """Scan the tree, then document changes until stop() returns True
+        (or forever)"""
+        self.scan()
+        try:
+            while stop is None or not stop():
+                self.step(None if stop is None else 1.0)
+        finally:
+            self.close()
+
+    def close(self):
+        self.source.close()
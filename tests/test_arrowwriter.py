@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_arrowwriter.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv import arrowwriter
+from pyunv.reader import Reader
+
+
+@unittest.skipUnless(arrowwriter.pyarrow, 'pyarrow is not installed')
+class ArrowWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        super(ArrowWriterTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.universes = {}
+        for name in ('eFashion', 'Univers5'):
+            with open('tests/universes/%s.unv' % name, 'rb') as f:
+                self.universes[name] = Reader(f).universe
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(ArrowWriterTests, self).tearDown()
+
+    def test_tables(self):
+        universe = self.universes['eFashion']
+        tables = arrowwriter.ArrowWriter(universe, 'eFashion').tables()
+        statistics = universe.statistics
+        self.assertEqual(tables['objects'].num_rows, statistics['objects'])
+        self.assertEqual(tables['conditions'].num_rows,
+            statistics['conditions'])
+        self.assertEqual(tables['classes'].num_rows, statistics['classes'])
+        self.assertEqual(tables['hierarchies'].num_rows, 0)
+        objects = tables['objects']
+        self.assertEqual(str(objects.schema.field('name').type),
+            'dictionary<values=string, indices=int32, ordered=0>')
+        self.assertEqual(set(objects.column('universe').to_pylist()),
+            set(['eFashion']))
+        self.assertEqual(objects.column('id').to_pylist(),
+            [o.id_ for o in universe.objects])
+
+    def test_parquet(self):
+        universe = self.universes['Univers5']
+        arrowwriter.ArrowWriter(universe, 'Univers5').write_parquet(
+            self.directory)
+        table = arrowwriter.pyarrow.parquet.read_table(
+            os.path.join(self.directory, 'joins.parquet'))
+        self.assertEqual(table.num_rows, len(universe.joins))
+
+    def test_dataset(self):
+        dataset = arrowwriter.ParquetDataset(self.directory)
+        for name, universe in sorted(self.universes.items()):
+            dataset.add(universe, 'shared/%s.unv' % name)
+        dataset.add(self.universes['eFashion'], 'shared/eFashion.unv')
+        objects = dataset.table('objects')
+        counts = {}
+        for key in objects.column('universe').to_pylist():
+            counts[key] = counts.get(key, 0) + 1
+        self.assertEqual(counts, dict(('shared/%s.unv' % name,
+            universe.statistics['objects'])
+            for name, universe in self.universes.items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_batch.py
+"""
+
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import docunv
+from pyunv.batch import SnapshotCache, document_files, expand_paths
+
+
+class BatchTests(unittest.TestCase):
+
+    def setUp(self):
+        super(BatchTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, 'sales'))
+        self.paths = [os.path.join(self.root, 'Univers5.unv'),
+            os.path.join(self.root, 'sales', 'eFashion.unv')]
+        for path in self.paths:
+            shutil.copy(os.path.join('tests', 'universes',
+                os.path.basename(path)), path)
+        self.cache = os.path.join(self.root, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        super(BatchTests, self).tearDown()
+
+    def test_expand_paths(self):
+        self.assertEqual(expand_paths([self.root]), self.paths)
+        self.assertEqual(expand_paths([os.path.join(self.root, '*', '*.unv'),
+            self.paths[1], 'missing.unv']), [self.paths[1], 'missing.unv'])
+
+    def test_formats(self):
+        results = list(document_files([self.root],
+            ['manifest', 'csv', 'json']))
+        self.assertEqual([r.path for r in results], self.paths)
+        for result in results:
+            self.assertEqual(result.error, None)
+            self.assertEqual(result.outputs, [result.path + suffix
+                for suffix in ('.txt', '.csv', '.ndjson')])
+            self.assertEqual(result.universe, None)
+        with open(self.paths[0] + '.txt') as f:
+            with open('tests/universes/Univers5.unv.txt') as expected:
+                self.assertEqual(f.read(), expected.read())
+
+    def test_cache(self):
+        first = list(document_files(self.paths, ['csv'], cache=self.cache))
+        with open(self.paths[1] + '.csv') as f:
+            csv = f.read()
+        second = list(document_files(self.paths, ['csv'], cache=self.cache,
+            keep=True))
+        self.assertEqual([r.cached for r in first], [False, False])
+        self.assertEqual([r.cached for r in second], [True, True])
+        self.assertEqual(second[1].universe.statistics['objects'], 41)
+        with open(self.paths[1] + '.csv') as f:
+            self.assertEqual(f.read(), csv)
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+        # a damaged snapshot is parsed again
+        for name in os.listdir(self.cache):
+            with open(os.path.join(self.cache, name), 'wb') as f:
+                f.write(b'damaged')
+        third = list(document_files(self.paths, ['csv'], cache=self.cache))
+        self.assertEqual([r.cached for r in third], [False, False])
+        self.assertEqual(SnapshotCache(self.cache).get('0' * 40), None)
+
+    def test_jobs(self):
+        results = list(document_files(self.paths + ['missing.unv'],
+            ['manifest'], jobs=2, keep=True))
+        self.assertEqual([r.path for r in results],
+            self.paths + ['missing.unv'])
+        self.assertEqual([r.error is None for r in results],
+            [True, True, False])
+        self.assertEqual(results[0].universe.statistics['classes'], 1)
+        self.assertTrue(os.path.exists(self.paths[1] + '.txt'))
+
+    def test_docunv(self):
+        database = os.path.join(self.root, 'universes.db')
+        stderr = sys.stderr
+        sys.stderr = io.StringIO()
+        try:
+            status = docunv.main(['docunv', '--format', 'csv', '--stats',
+                '--sqlite', database, self.root])
+            output = sys.stderr.getvalue()
+            failed = docunv.main(['docunv', self.paths[0], 'missing.unv'])
+            usage = docunv.main(['docunv', '--json', 'x.ndjson',
+                self.paths[0], self.paths[1]])
+        finally:
+            sys.stderr = stderr
+        self.assertEqual((status, failed, usage), (0, 1, 2))
+        self.assertTrue('2 universes documented, 0 failed' in output)
+        self.assertTrue(os.path.exists(self.paths[1] + '.csv'))
+        connection = sqlite3.connect(database)
+        self.assertEqual(connection.execute(
+            'SELECT count(*) FROM universes').fetchone(), (2,))
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
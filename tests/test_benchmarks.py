@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_benchmarks.py
+"""
+
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+    'benchmarks'))
+
+import bench
+
+
+class BenchmarkTests(unittest.TestCase):
+
+    def setUp(self):
+        super(BenchmarkTests, self).setUp()
+        self.results = bench.run(['tests/universes/Univers5.unv'], repeat=1)
+
+    def test_stages(self):
+        result = self.results['universes']['Univers5.unv']
+        for stage in ['find_content_offsets', 'read_tables', 'read_classes',
+                'perform_validation_checks', 'manifest', 'csv', 'total']:
+            self.assertTrue(stage in result['seconds'], stage)
+        self.assertTrue(result['memory']['parse'] > 0)
+
+    def test_compare(self):
+        self.assertEqual(bench.compare(self.results, self.results), [])
+        slower = copy.deepcopy(self.results)
+        result = slower['universes']['Univers5.unv']
+        result['seconds']['read_tables'] += 0.01
+        result['seconds']['read_joins'] *= 1.1
+        result['memory']['csv'] *= 2
+        regressions = bench.compare(slower, self.results)
+        self.assertEqual([(name, metric) for name, metric, before, after
+            in regressions], [('Univers5.unv', 'read_tables'),
+            ('Univers5.unv', 'memory.csv')])
+
+    def test_scaling(self):
+        base = dict(tables=20, columns=2, joins=20, contexts=2, classes=5,
+            objects=50, conditions=5)
+        result = bench.scaling((1, 2), repeat=1, base=base)
+        self.assertEqual(result['factors'], [1, 2])
+        self.assertTrue(result['sizes'][1] > result['sizes'][0])
+        self.assertEqual(len(result['seconds']['read_classes']), 2)
+        self.assertAlmostEqual(bench.growth([1.0, 2.0, 4.0], [1, 2, 4]), 1.0)
+        self.assertAlmostEqual(bench.growth([1.0, 4.0, 16.0], [1, 2, 4]), 2.0)
+
+    def test_startup(self):
+        # docunv --help and the reader load neither Mako nor ElementTree
+        result = bench.startup(repeat=1)
+        self.assertEqual(sorted(result), ['docunv --help',
+            'import pyunv.reader'])
+        for name, startup in result.items():
+            self.assertEqual(startup['deferred'], [], name)
+            self.assertTrue(startup['seconds'] > 0)
+            self.assertTrue(startup['modules'] > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
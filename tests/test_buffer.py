@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_buffer.py
+"""
+
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.buffer import BufferCursor, SectionBlob
+from pyunv.reader import Reader
+
+
+class BufferCursorTests(unittest.TestCase):
+    
+    def test_read_seek(self):
+        cursor = BufferCursor(b'0123456789')
+        self.assertEqual(cursor.read(3), b'012')
+        cursor.seek(-2, os.SEEK_END)
+        self.assertEqual(cursor.read(), b'89')
+        self.assertEqual(cursor.read(1), b'')
+
+
+class SectionBlobTests(unittest.TestCase):
+    
+    def test_blob(self):
+        buffer = b'headerSECTIONtrailer'
+        blob = SectionBlob(buffer, 6, 7)
+        self.assertEqual(len(blob), 7)
+        self.assertEqual(blob, b'SECTION')
+        self.assertEqual(blob[:3], b'SEC')
+        self.assertEqual(blob.view.obj, buffer)
+    
+    def test_reader_blobs(self):
+        universe = Reader(open('tests/universes/eFashion.unv', 'rb')).universe
+        self.assertTrue(isinstance(universe.crystal_references, SectionBlob))
+        self.assertEqual(bytes(universe.crystal_references), 
+            universe.crystal_references.view.tobytes())
+
+    def test_pickle(self):
+        # blobs of a memory-mapped universe are pickled as copies
+        universe = Reader.from_path('tests/universes/eFashion.unv').universe
+        blob = pickle.loads(pickle.dumps(universe)).crystal_references
+        self.assertEqual(blob, universe.crystal_references)
+        self.assertTrue(isinstance(blob.view.obj, bytes))
+
+
+if __name__ == '__main__':
+    unittest.main()
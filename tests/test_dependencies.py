@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_dependencies.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.reader import Reader
+
+
+class DependencyGraphTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(DependencyGraphTests, self).setUp()
+        self.filename = 'tests/universes/eFashion.unv'
+        self.universe = Reader(open(self.filename, 'rb')).universe
+        self.graph = self.universe.dependencies
+    
+    def test_select_macro(self):
+        owned_stores = self.universe.classes[1].conditions[1]
+        self.assertEqual(owned_stores.name, 'Owned stores')
+        self.assertEqual(self.graph.dependencies(owned_stores), 
+            set([('object', 63)]))
+        self.assertEqual(self.graph.dependencies(owned_stores, True), 
+            set([('object', 63), ('table', 3)]))
+    
+    def test_object_references(self):
+        # Sold at (unit price) uses Sales revenue and Quantity sold
+        self.assertEqual(self.graph.dependencies(('object', 323)),
+            set([('object', 147), ('object', 148)]))
+    
+    def test_table_users(self):
+        users = self.graph.table_users(3)
+        self.assertIn(('object', 219), users)
+        self.assertIn(('condition', 12), users)
+        self.assertNotIn(('object', 187), users)
+    
+    def test_unknown_node(self):
+        for unknown in (('object', 99999), ('table', 99999)):
+            self.assertEqual(self.graph.dependencies(unknown, True), set())
+            self.assertEqual(self.graph.dependents(unknown), set())
+        self.assertEqual(self.graph.table_users(99999), set())
+    
+    def test_topological_order(self):
+        order = self.graph.topological_order()
+        self.assertEqual(len(order), len(self.graph.nodes))
+        position = dict((node, i) for i, node in enumerate(order))
+        for i, deps in enumerate(self.graph.edges):
+            for j in deps:
+                self.assertLess(position[self.graph.nodes[j]], 
+                    position[self.graph.nodes[i]])
+
+
+if __name__ == '__main__':
+    unittest.main()
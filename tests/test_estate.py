@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_estate.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.estate import EstateIndex
+from pyunv.reader import Reader
+
+
+class EstateIndexTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(EstateIndexTests, self).setUp()
+        self.folder = tempfile.mkdtemp()
+        self.index = EstateIndex(os.path.join(self.folder, 'estate.db'))
+        self.filename = 'tests/universes/universe_xir2.unv'
+        self.index.add_file(self.filename)
+    
+    def tearDown(self):
+        super(EstateIndexTests, self).tearDown()
+        self.index.close()
+        shutil.rmtree(self.folder)
+    
+    def test_column_impact(self):
+        refs = self.index.impact('public.orderinfo', 'customer_id')
+        kinds = sorted(set((r.kind, r.entity_id) for r in refs))
+        self.assertEqual(kinds, [('column', 16), ('join', 12), ('join', 19), 
+            ('object', 10)])
+    
+    def test_condition_impact(self):
+        refs = self.index.impact('public.item', 'sell_price')
+        conditions = sorted(r.entity_id for r in refs if r.kind == 'condition')
+        # Expensive and Cheap use the Sell Price object
+        self.assertEqual(conditions, [2, 3, 4, 5, 7])
+    
+    def test_unresolved_column_impact(self):
+        # Customer Id still names its table, but not a column of it
+        universe = Reader.from_path(self.filename).universe
+        universe.object_map[10].select = 'count(*)'
+        self.index.add(universe, 'unresolved.unv')
+        refs = [r for r in self.index.impact('public.orderinfo',
+            'customer_id') if r.universe == 'unresolved.unv']
+        self.assertIn(('object', 10, None),
+            [(r.kind, r.entity_id, r.db_column) for r in refs])
+        self.assertEqual([r for r in self.index.impact('public.orderinfo',
+            'no_such_column') if r.db_column is not None], [])
+    
+    def test_unchanged_universe_is_skipped(self):
+        self.assertFalse(self.index.add_file(self.filename))
+    
+    def test_reindex_replaces_rows(self):
+        before = len(self.index.impact('public.item'))
+        self.index.add_file(self.filename, 'copy.unv')
+        self.index.connection.execute('UPDATE universes SET content_hash = ?'
+            ' WHERE key = ?', ('stale', self.filename))
+        self.assertTrue(self.index.add_file(self.filename))
+        self.assertEqual(len(self.index.impact('public.item')), 2 * before)
+        self.index.remove('copy.unv')
+        self.assertEqual(self.index.universes(), [self.filename])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_generator.py
+"""
+
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.generator import UniverseGenerator, main
+from pyunv.reader import Reader
+
+
+class UniverseGeneratorTests(unittest.TestCase):
+
+    def setUp(self):
+        super(UniverseGeneratorTests, self).setUp()
+        self.generator = UniverseGenerator(tables=30, columns=4, joins=35,
+            contexts=3, classes=11, objects=60, conditions=9, subclasses=3,
+            name='Scale')
+        self.universe = Reader.from_bytes(self.generator.tobytes()).universe
+
+    def test_counts(self):
+        self.assertEqual(self.universe.statistics, {'classes': 11,
+            'objects': 60, 'aliases': 0, 'tables': 30, 'joins': 35,
+            'contexts': 3, 'conditions': 9})
+        self.assertEqual(len(self.universe.columns), 120)
+        self.assertEqual(self.universe.parameters.universe_name, 'Scale')
+        self.assertEqual([c.name for c in self.universe.classes],
+            ['Class 1', 'Class 2', 'Class 3'])
+        self.assertEqual([c.name for c in self.universe.classes[0].subclasses],
+            ['Class 4', 'Class 5', 'Class 6'])
+
+    def test_references(self):
+        o = self.universe.object_map[1]
+        table = self.universe.table_map[o.select_table_refs[0]]
+        self.assertTrue(o.select_sql.startswith(table.name + '.COLUMN_'))
+        self.assertEqual(self.universe.validation_errors, [])
+        self.assertEqual(len(self.universe.contexts[0].joins), 12)
+
+    def test_sections(self):
+        sections = self.universe.sections
+        self.assertEqual(len(sections), 10)
+        for section in sections:
+            self.assertTrue(section.length > 0)
+
+    def test_deterministic(self):
+        self.assertEqual(self.generator.tobytes(), self.generator.tobytes())
+        self.assertNotEqual(self.generator.tobytes(), UniverseGenerator(
+            tables=30, columns=4, joins=35, contexts=3, classes=11,
+            objects=60, conditions=9, subclasses=3, name='Scale',
+            seed=1).tobytes())
+
+    def test_large_ids(self):
+        # table IDs past 9999 still expand to table names
+        universe = Reader.from_bytes(UniverseGenerator(tables=12000,
+            columns=1, objects=200, seed=3).tobytes()).universe
+        expanded = [o for o in universe.object_map.values()
+            if o.select_table_refs[0] > 9999]
+        self.assertTrue(expanded)
+        for o in expanded:
+            self.assertEqual(o.select_sql, 'TABLE_%d.COLUMN_1' %
+                o.select_table_refs[0])
+
+    def test_main_status(self):
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout = sys.stderr = io.StringIO()
+        try:
+            statuses = [main(['generator', '--help']),
+                main(['generator']), main(['generator', 'a.unv', 'b.unv']),
+                main(['generator', '--tables', 'x', 'a.unv'])]
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+        self.assertEqual(statuses, [0, 2, 2, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
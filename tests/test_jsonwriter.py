@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_jsonwriter.py
+"""
+
+import collections
+import datetime
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv import jsonwriter
+from pyunv.jsonwriter import JsonWriter
+from pyunv.reader import Reader
+
+
+class JsonWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        super(JsonWriterTests, self).setUp()
+        with open('tests/universes/eFashion.unv', 'rb') as f:
+            self.universe = Reader(f).universe
+
+    def records(self, data):
+        return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+    def test_ndjson(self):
+        f = io.BytesIO()
+        JsonWriter(self.universe).save(f)
+        records = self.records(f.getvalue())
+        counts = collections.Counter(record['type'] for record in records)
+        statistics = self.universe.statistics
+        self.assertEqual(records[0]['type'], 'universe')
+        self.assertEqual(records[0]['name'], 'eFashion')
+        self.assertEqual(records[0]['statistics'], statistics)
+        self.assertEqual(counts['class'], statistics['classes'])
+        self.assertEqual(counts['object'], statistics['objects'])
+        self.assertEqual(counts['condition'], statistics['conditions'])
+        self.assertEqual(counts['table'], len(self.universe.tables))
+        self.assertEqual(counts['column'], len(self.universe.columns))
+        self.assertEqual(counts['validation_error'], 40)
+        self.assertEqual(counts['cross_reference'], 29)
+
+    def test_records(self):
+        records = dict(((record['type'], record.get('id')), record)
+            for record in JsonWriter(self.universe).records())
+        o = self.universe.objects[0]
+        record = records[('object', o.id_)]
+        self.assertEqual(record['select'], o.select_sql)
+        self.assertEqual(record['class_id'], o.parent.id_)
+        error = next(record for record in JsonWriter(self.universe).records()
+            if record['type'] == 'validation_error')
+        self.assertEqual(error['kind'], 'broken_reference')
+
+    def test_array(self):
+        data = JsonWriter(self.universe, ndjson=False).tobytes()
+        self.assertEqual(json.loads(data.decode('utf-8')),
+            self.records(JsonWriter(self.universe).tobytes()))
+
+    def test_encoders(self):
+        value = {'name': 'Caf\xe9', 'date': datetime.date(2007, 10, 14),
+            'ids': set([3]), 'count': 2}
+        self.assertEqual(json.loads(jsonwriter.json_dumps(value)),
+            {'name': 'Caf\xe9', 'date': '2007-10-14', 'ids': [3], 'count': 2})
+        if jsonwriter.orjson is not None:
+            self.assertEqual(json.loads(jsonwriter.orjson_dumps(value)),
+                json.loads(jsonwriter.json_dumps(value)))
+
+
+if __name__ == '__main__':
+    unittest.main()
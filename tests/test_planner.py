@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_planner.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.reader import Reader
+from pyunv.planner import QueryPlanner
+from pyunv.universe import Object
+
+
+class QueryPlannerTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(QueryPlannerTests, self).setUp()
+        self.filename = 'tests/universes/universe_xir2.unv'
+        self.universe = Reader(open(self.filename, 'rb')).universe
+        self.planner = QueryPlanner(self.universe)
+    
+    def test_object_table_refs(self):
+        self.assertEqual(self.universe.object_map[14].select_table_refs, [2])
+    
+    def test_single_table(self):
+        plan = self.planner.plan([22, 23])
+        self.assertEqual(plan.tables, [3])
+        self.assertEqual(plan.joins, [])
+        self.assertFalse(plan.is_split)
+    
+    def test_single_context(self):
+        # customer -> orderinfo -> orderline, all in CustomerOrder
+        plan = self.planner.plan([14, 3])
+        self.assertEqual(plan.contexts, [1])
+        self.assertEqual(plan.joins, [12, 15])
+        self.assertEqual(plan.statements[0].tables, [2, 4, 5])
+        self.assertFalse(plan.is_split)
+    
+    def test_split_query(self):
+        plan = self.planner.plan([14, 3, 28, 26])
+        self.assertTrue(plan.is_split)
+        self.assertEqual(sorted(plan.contexts), [1, 2])
+        self.assertEqual(plan.unresolved_tables, [])
+    
+    def test_condition_uses_referenced_object_tables(self):
+        expensive = self.universe.classes[3].conditions[0]
+        self.assertEqual(expensive.name, 'Expensive')
+        self.assertEqual(self.planner.tables_for(expensive), frozenset([3]))
+    
+    def test_condition_ids(self):
+        # there is no object 7, so the ID is the condition's
+        self.assertEqual(self.planner.plan([7]).objects[0].name,
+            'VeryCheap Hidden')
+        self.assertEqual(self.planner.plan([('condition', 2)]).tables, [3])
+        self.assertRaises(ValueError, self.planner.plan, [999])
+        self.assertRaises(ValueError, self.planner.plan, [('condition', 14)])
+    
+    def test_long_reference_chain(self):
+        # each object uses the next; only the last one names a table
+        chain = [Object(self.universe, 10000 + i, None, 'o%d' % i, '')
+            for i in range(sys.getrecursionlimit() + 100)]
+        for obj, referenced in zip(chain, chain[1:]):
+            obj.object_refs = [referenced.id_]
+            self.universe.object_map[obj.id_] = obj
+        chain[-1].select_table_refs = [3]
+        self.universe.object_map[chain[-1].id_] = chain[-1]
+        self.assertEqual(self.planner.tables_for(chain[0]), frozenset([3]))
+    
+    def test_plans_are_cached(self):
+        plan = self.planner.plan([14, 3])
+        self.assertIs(self.planner.plan([3, 14]), plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,17 +9,26 @@ Copyright (c) 2009 David Peckham. All rights reserved.
 Enhanced by Sanjay Sharma (indoos@gmail.com) 2025-10-17.
 """
 
+import csv
 import datetime
+import io
+import mmap
 import os
+import struct
 import sys
 import unittest
+import zipfile
 
 # Add the local pyunv directory to the path so tests use the enhanced version
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from pyunv.buffer import SectionBlob
+from pyunv.csvwriter import CsvWriter
+from pyunv.generator import UniverseGenerator
 from pyunv.universe import Universe
 from pyunv.reader import Reader
 from pyunv.manifest import Manifest
+from pyunv.stats import ReaderStats
 
 
 class ReaderTests(unittest.TestCase):
@@ -43,6 +52,135 @@ class ReaderTests(unittest.TestCase):
         self.assertEqual(Reader.date_from_dateindex(2455090), date)
         
 
+class ReaderStatsTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(ReaderStatsTests, self).setUp()
+        self.filename = 'tests/universes/universe_xir2.unv'
+        self.finished = []
+        self.stats = ReaderStats(hooks=[self.finished.append])
+        self.reader = Reader(open(self.filename, 'rb'), stats=self.stats)
+    
+    def test_disabled_by_default(self):
+        reader = Reader(open(self.filename, 'rb'))
+        self.assertIsNone(reader.stats)
+    
+    def test_section_stage(self):
+        stage = self.stats['read_joins']
+        self.assertEqual(stage.records, 7)
+        self.assertGreater(stage.bytes_read, 0)
+        self.assertGreaterEqual(stage.seconds, 0)
+    
+    def test_blob_stage(self):
+        # blob sections read nothing through the file: their length counts
+        section = self.reader.sections['WindowsPageFormat;']
+        self.assertEqual(self.stats['read_windows_page_format'].bytes_read,
+            section.end - section.start)
+        self.assertEqual(self.stats['read_audit_info'].bytes_read,
+            len(self.reader.universe.audit_info))
+    
+    def test_analysis_stage(self):
+        self.assertEqual(self.stats['perform_validation_checks'].records,
+            len(self.reader.universe.validation_errors))
+    
+    def test_hooks(self):
+        self.assertEqual([s.name for s in self.finished], 
+            list(self.stats.stages))
+
+
+class BrokenLovReader(Reader):
+    
+    error = ValueError('bad specification')
+    
+    def read_xml_lov(self):
+        raise BrokenLovReader.error
+    
+    def read_hierarchies(self):
+        raise AssertionError('the file has no Hierarchies; section')
+
+
+class BrokenJoinsReader(Reader):
+    
+    def read_joins(self):
+        raise ValueError('bad join')
+
+
+class SectionStatusTests(unittest.TestCase):
+    
+    filename = 'tests/universes/eFashion.unv'
+    
+    def test_status(self):
+        status = Reader.from_path(self.filename).universe.section_status
+        self.assertEqual(status['tables'].status, 'ok')
+        self.assertEqual(status['xml_lov'].status, 'ok')
+        self.assertEqual(status['hierarchies'].status, 'missing')
+        self.assertEqual(status['hierarchies'].marker, 'Hierarchies;')
+        self.assertEqual([s for s in status.values() if s.status == 'failed'],
+            [])
+    
+    def test_failed_section(self):
+        universe = BrokenLovReader.from_path(self.filename).universe
+        status = universe.section_status['xml_lov']
+        self.assertEqual((status.status, status.reason),
+            ('failed', 'ValueError: bad specification'))
+        self.assertIsNone(universe.xml_lov)
+        self.assertEqual(universe.hierarchies, [])
+        self.assertEqual(len(universe.objects), 41)
+    
+    def test_interrupt(self):
+        BrokenLovReader.error = KeyboardInterrupt()
+        try:
+            self.assertRaises(KeyboardInterrupt, BrokenLovReader.from_path,
+                self.filename)
+        finally:
+            BrokenLovReader.error = ValueError('bad specification')
+    
+    def test_failed_required_section(self):
+        # required sections are never recorded as failed: the error is raised
+        self.assertRaises(ValueError, BrokenJoinsReader.from_path,
+            self.filename)
+
+
+class ReaderSourceTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(ReaderSourceTests, self).setUp()
+        self.filename = 'tests/universes/Univers5.unv'
+        with open(self.filename, 'rb') as f:
+            self.data = f.read()
+        self.expected = self.manifest(Reader(open(self.filename, 'rb')))
+    
+    def manifest(self, reader):
+        f = io.StringIO()
+        Manifest(reader.universe).save(f)
+        return f.getvalue()
+    
+    def test_from_bytes(self):
+        self.assertEqual(self.manifest(Reader.from_bytes(self.data)), 
+            self.expected)
+        self.assertEqual(self.manifest(Reader(memoryview(self.data))), 
+            self.expected)
+    
+    def test_from_path(self):
+        reader = Reader.from_path(self.filename)
+        self.assertEqual(self.manifest(reader), self.expected)
+        # the section blobs are views of the map, not of a copy of the file
+        self.assertTrue(isinstance(reader.buffer, mmap.mmap))
+        blobs = [value for value in vars(reader.universe).values()
+            if isinstance(value, SectionBlob)]
+        self.assertTrue(blobs)
+        for blob in blobs:
+            self.assertTrue(blob.view.obj is reader.buffer)
+    
+    def test_from_zip_member(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as z:
+            z.writestr('universes/Univers5.unv', self.data)
+        archive.seek(0)
+        reader = Reader.from_zip_member(archive, 'universes/Univers5.unv')
+        self.assertEqual(self.manifest(reader), self.expected)
+
+
 class SampleUniverseXIR2(unittest.TestCase):
     
     def setUp(self):
@@ -189,6 +327,40 @@ class SampleUniverseEFashion(unittest.TestCase):
             
     def test_cross_references_count(self):
         self.assertEqual(len(self.universe.cross_references), 29)
+    
+    def test_xml_lov(self):
+        self.assertEqual(len(self.universe.lovs), 15)
+        lov = self.universe.object_map[153].lov
+        self.assertEqual(lov.max_lines, 90000)
+        self.assertTrue(lov.distinct)
+        self.assertEqual(lov.result_ids, [153])
+        self.assertTrue(self.universe.lov_index[lov.lov_name] is lov)
+    
+    def test_xml_lov_chunks(self):
+        # the same specifications fed to the parser a few bytes at a time
+        reader = Reader(open(self.filename, 'rb'))
+        reader.lov_chunk_size = 7
+        reader._parse_xml_lov()
+        for object_id, lov in self.universe.lovs.items():
+            chunked = reader.universe.lovs[object_id]
+            self.assertEqual(chunked.properties, lov.properties)
+            self.assertEqual(chunked.requests, lov.requests)
+    
+    def test_malformed_lov(self):
+        # a corrupt specification between two good ones loses only itself
+        specs = [(1, b'<LOV_SPECIFICATION><REQUEST Name="a"><RESULT Id="1"/>'
+            b'</REQUEST></LOV_SPECIFICATION>'),
+            (2, b'<LOV_SPECIFICATION><REQUEST></LOV'),
+            (3, b'<LOV_SPECIFICATION><REQUEST Name="c"/></LOV_SPECIFICATION>')]
+        section = struct.pack('<I', len(specs)) + b''.join(
+            struct.pack('<IH', object_id, len(xml)) + xml
+            for object_id, xml in specs)
+        self.universe.xml_lov = section
+        self.reader._parse_xml_lov()
+        self.assertEqual(sorted(self.universe.lovs), [1, 3])
+        self.assertEqual(self.universe.lovs[1].requests,
+            [{'type': None, 'name': 'a', 'results': [1]}])
+        self.assertEqual(self.universe.lovs[3].requests[0]['name'], 'c')
             
     def test_manifest(self):
         Manifest(self.universe).save(open(self.filename+'.txt', 'w'))
@@ -357,6 +529,20 @@ class EnhancedAnalysisTests(unittest.TestCase):
         self.assertGreater(len(self.universe.stored_procedure_parameters), 0,
                          "Univers5 should have stored procedure parameters")
     
+    def test_stored_procedure_scan(self):
+        """Test that procedures are found among binary data"""
+        self.universe.stored_procedure_parameters = {}
+        data = (b'\x00\x01<Procedure name="p1">'
+            b'<Parameter name="@a" type="SInt32" value="1"/></Procedure>\xff'
+            b'<Procedure name="p2"><Parameter name="@b" type="Float64" '
+            b'value="2"/><Parameter name="@c&" type="x" value=""/>'
+            b'</Procedure>PK')
+        self.reader._parse_procedure_xml_from_binary(data)
+        params = self.universe.stored_procedure_parameters
+        self.assertEqual(sorted(params), ['p1', 'p2'])
+        self.assertEqual(params['p1'][0]['type'], 'SInt32')
+        self.assertEqual(len(params['p2']), 2)
+    
     # General Enhanced Analysis Tests
     
     def test_all_enhanced_analysis_structures_exist(self):
@@ -369,3 +555,80 @@ class EnhancedAnalysisTests(unittest.TestCase):
         self.assertTrue(hasattr(self.universe, 'lov_definitions'))
         self.assertTrue(hasattr(self.universe, 'stored_procedure_parameters'))
 
+
+class DeepHierarchyTests(unittest.TestCase):
+
+    def setUp(self):
+        super(DeepHierarchyTests, self).setUp()
+        # a single chain of classes, deeper than the recursion limit
+        self.depth = sys.getrecursionlimit() + 500
+        self.universe = Reader.from_bytes(UniverseGenerator(
+            classes=self.depth, objects=self.depth, conditions=10,
+            subclasses=1).tobytes()).universe
+
+    def test_read(self):
+        self.assertEqual(self.universe.statistics['classes'], self.depth)
+        self.assertEqual(self.universe.statistics['objects'], self.depth)
+        self.assertEqual(len(self.universe.object_map), self.depth)
+        self.assertEqual(len(self.universe.lov_definitions), self.depth)
+
+    def test_hierarchy(self):
+        hierarchy = self.universe.hierarchy
+        classes = [entry for entry in hierarchy if entry.obj is None]
+        self.assertEqual([entry.depth for entry in classes],
+            list(range(self.depth)))
+        self.assertEqual(hierarchy[1].obj.name, 'Object 1')
+        self.assertEqual(hierarchy[2].obj.name, 'Condition 1')
+        self.assertEqual(hierarchy[3].cls.name, 'Class 2')
+        self.assertTrue(self.universe.hierarchy is hierarchy)
+        self.universe.classes = self.universe.classes[:0]
+        self.assertEqual(self.universe.hierarchy, [])
+
+    def test_documents(self):
+        f = io.StringIO()
+        CsvWriter(self.universe, f)
+        rows = list(csv.reader(io.StringIO(f.getvalue())))
+        self.assertEqual(rows[0][:3], ['Class 1', '', 'class'])
+        self.assertEqual(rows[-1][:3], ['\\'.join('Class %d' % i
+            for i in range(1, self.depth + 1)), 'Object %d' % self.depth,
+            'object'])
+        f = io.StringIO()
+        Manifest(self.universe).save(f)
+        self.assertTrue('Class %d' % self.depth in f.getvalue())
+
+
+class ClassIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        super(ClassIndexTests, self).setUp()
+        with open('tests/universes/eFashion.unv', 'rb') as f:
+            self.universe = Reader(f).universe
+
+    def test_order(self):
+        objects = self.universe.objects
+        conditions = self.universe.conditions
+        self.assertEqual(len(objects), self.universe.statistics['objects'])
+        self.assertEqual(len(conditions),
+            self.universe.statistics['conditions'])
+        self.assertEqual([o.id_ for o in objects],
+            sorted(o.id_ for o in objects))
+        self.assertEqual([c.id_ for c in conditions],
+            sorted(c.id_ for c in conditions))
+
+    def test_parents(self):
+        index = self.universe.class_index
+        self.assertEqual(len(index.classes),
+            self.universe.statistics['classes'])
+        for position, o in enumerate(index.objects):
+            self.assertTrue(o in index.object_class(position).objects)
+        for position, c in enumerate(index.conditions):
+            self.assertTrue(c in index.condition_class(position).conditions)
+
+    def test_cached(self):
+        index = self.universe.class_index
+        self.assertTrue(self.universe.class_index is index)
+        self.universe.invalidate_hierarchy()
+        self.assertFalse(self.universe.class_index is index)
+        self.assertEqual(self.universe.objects, index.objects)
+        rebuilt = self.universe.build_class_index()
+        self.assertTrue(self.universe.class_index is rebuilt)
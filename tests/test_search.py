@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_search.py
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.generator import UniverseGenerator
+from pyunv.reader import Reader
+from pyunv.search import SearchIndex, main, tokenize
+
+
+class SearchIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        super(SearchIndexTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.index = SearchIndex(os.path.join(self.directory, 'search.db'))
+        for name in ('eFashion', 'Univers5'):
+            self.index.add_file('tests/universes/%s.unv' % name, name)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+        super(SearchIndexTests, self).tearDown()
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('Shop_facts.Margin = 1'),
+            set(['shop_facts', 'shop', 'facts', 'margin', '1']))
+        self.assertEqual(tokenize(None), set())
+
+    def test_name(self):
+        hits = self.index.search('margin')
+        self.assertEqual(hits[0][:4], ('eFashion', 'object', 146, 'Margin'))
+        self.assertEqual(hits[0].path, 'Measures\\Margin')
+        self.assertEqual(set(hit.universe for hit in hits), set(['eFashion']))
+
+    def test_sql_and_columns(self):
+        # objects whose SQL uses the column, and the column itself
+        hits = self.index.search('outlet_lookup.shop_name')
+        kinds = set(hit.kind for hit in hits)
+        self.assertTrue('object' in kinds)
+        self.assertTrue('column' in kinds)
+        self.assertEqual([hit.kind for hit in self.index.search(
+            'outlet_lookup.shop_name', kinds=['column'])], ['column'])
+
+    def test_prefix(self):
+        exact = self.index.search('sales', limit=None)
+        prefix = self.index.search('sal*', limit=None)
+        self.assertTrue(len(prefix) >= len(exact) > 0)
+        self.assertTrue(set(exact) <= set(prefix))
+        self.assertEqual(self.index.search('nosuchword'), [])
+        self.assertEqual(len(self.index.search('sal*', limit=3)), 3)
+
+    def test_all_words(self):
+        hits = self.index.search('sales revenue')
+        self.assertTrue(hits)
+        for hit in hits:
+            self.assertEqual(hit.universe, 'eFashion')
+
+    def test_replace(self):
+        self.assertFalse(self.index.add_file('tests/universes/eFashion.unv',
+            'eFashion'))
+        universe = Reader.from_bytes(UniverseGenerator(objects=30,
+            name='Synthetic').tobytes()).universe
+        self.index.add(universe, 'eFashion')
+        self.assertEqual(self.index.search('margin'), [])
+        self.assertEqual(self.index.search('object 17')[0][:4],
+            ('eFashion', 'object', 17, 'Object 17'))
+        self.index.remove('eFashion')
+        self.assertEqual(self.index.universes(), ['Univers5'])
+        self.assertEqual(self.index.search('object'), [])
+
+    def test_main_usage(self):
+        database = os.path.join(self.directory, 'search.db')
+        stderr = sys.stderr
+        sys.stderr = io.StringIO()
+        try:
+            statuses = [main(['search', '--kind', 'measure', database,
+                'sales']), main(['search', '--limit', 'ten', database,
+                'sales'])]
+            output = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(statuses, [2, 2])
+        self.assertTrue('unknown kind measure' in output)
+
+    def test_main_add_errors(self):
+        database = os.path.join(self.directory, 'added.db')
+        junk = os.path.join(self.directory, 'junk.unv')
+        with open(junk, 'wb') as f:
+            f.write(b'not a universe' * 10)
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+        try:
+            status = main(['search', '--add', database, 'missing.unv', junk,
+                'tests/universes/Univers5.unv'])
+            errors = sys.stderr.getvalue()
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+        self.assertEqual(status, 1)
+        self.assertTrue(errors.startswith('missing.unv: error '))
+        self.assertTrue('%s: error ' % junk in errors)
+        with SearchIndex(database) as index:
+            self.assertEqual(index.universes(),
+                ['tests/universes/Univers5.unv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
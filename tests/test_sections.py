@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_sections.py
+"""
+
+import io
+import os
+import sys
+import unittest
+import zipfile
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.reader import Reader
+from pyunv.sections import SectionDirectory
+
+
+class SectionDirectoryTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(SectionDirectoryTests, self).setUp()
+        self.filename = 'tests/universes/eFashion.unv'
+        with open(self.filename, 'rb') as f:
+            self.data = f.read()
+        self.universe = Reader(io.BytesIO(self.data)).universe
+    
+    def test_matches_zip_members(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.data))
+        for section in self.universe.sections:
+            info = archive.getinfo(section.marker)
+            self.assertEqual(section.length, info.file_size)
+            self.assertEqual(section.crc32, info.CRC)
+    
+    def test_missing_sections(self):
+        self.assertFalse('Links;' in self.universe.sections)
+        self.assertIsNone(self.universe.platform)
+    
+    def test_fallback_checksum(self):
+        directory = SectionDirectory.build(b'\x00\x00A;abcdef', {'A;': 4})
+        section = directory['A;']
+        self.assertEqual((section.start, section.end), (4, 10))
+        self.assertEqual(section.crc32, zlib.crc32(b'abcdef'))
+        self.assertEqual(directory.section_at(5), section)
+    
+    def test_changed(self):
+        other = Reader(open('tests/universes/Univers5.unv', 'rb')).universe
+        self.assertEqual(self.universe.sections.changed(
+            self.universe.sections), [])
+        self.assertTrue('Tables;' in self.universe.sections.changed(
+            other.sections))
+        self.assertNotEqual(self.universe.sections.checksum, 
+            other.sections.checksum)
+
+
+if __name__ == '__main__':
+    unittest.main()
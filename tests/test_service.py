@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_service.py
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import json
+import struct
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from concurrent.futures.process import BrokenProcessPool
+
+from pyunv import service
+from pyunv.service import UniverseService
+
+
+class BlockingExecutor(concurrent.futures.ThreadPoolExecutor):
+
+    """Thread pool whose jobs wait until release is set"""
+
+    def __init__(self):
+        super(BlockingExecutor, self).__init__(1)
+        self.release = threading.Event()
+
+    def submit(self, fn, *args, **kwargs):
+        def wait_and_call():
+            self.release.wait(10)
+            return fn(*args, **kwargs)
+        return super(BlockingExecutor, self).submit(wait_and_call)
+
+
+class BrokenExecutor(concurrent.futures.ThreadPoolExecutor):
+
+    """Thread pool that fails every job as if a worker process had died"""
+
+    def __init__(self):
+        super(BrokenExecutor, self).__init__(1)
+        self.is_shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        future.set_exception(BrokenProcessPool('a worker died'))
+        return future
+
+    def shutdown(self, *args, **kwargs):
+        self.is_shut_down = True
+        super(BrokenExecutor, self).shutdown(*args, **kwargs)
+
+
+class RestartingService(UniverseService):
+
+    """A service whose first pool is broken; the pools it starts later
+    work, unless broken is set"""
+
+    broken = False
+
+    def _start_pool(self):
+        if not hasattr(self, 'pools'):
+            self.pools = []
+        pool = BrokenExecutor() if self.broken or not self.pools \
+            else concurrent.futures.ThreadPoolExecutor(2)
+        self.pools.append(pool)
+        return pool
+
+
+async def request(port, method, target, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = '%s %s HTTP/1.1\r\nHost: localhost\r\n' % (method, target)
+    if method == 'POST':
+        head += 'Content-Length: %d\r\n' % len(body)
+    writer.write(head.encode('latin-1') + b'\r\n' + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return status, headers, body
+
+
+class UniverseServiceTests(unittest.TestCase):
+
+    def setUp(self):
+        super(UniverseServiceTests, self).setUp()
+        with open('tests/universes/eFashion.unv', 'rb') as f:
+            self.data = f.read()
+
+    def run_service(self, test, executor=None, **kwargs):
+        async def run():
+            svc = UniverseService(workers=kwargs.pop('workers', 2),
+                executor=executor or concurrent.futures.ThreadPoolExecutor(2),
+                **kwargs)
+            await svc.start(port=0)
+            try:
+                return await test(svc)
+            finally:
+                svc.close()
+        return asyncio.run(run())
+
+    def test_parse_and_cache(self):
+        async def test(svc):
+            first = await request(svc.port, 'POST', '/parse?format=json',
+                self.data)
+            second = await request(svc.port, 'POST', '/parse?format=json',
+                self.data)
+            metrics = await request(svc.port, 'GET', '/metrics')
+            return first, second, json.loads(metrics[2].decode('utf-8'))
+        first, second, metrics = self.run_service(test)
+        self.assertEqual(first[0], 200)
+        self.assertEqual(json.loads(first[2].decode('utf-8'))['name'],
+            'eFashion')
+        self.assertEqual(first[1]['X-Cache'], 'miss')
+        self.assertEqual(second[1]['X-Cache'], 'hit')
+        self.assertEqual(second[2], first[2])
+        self.assertEqual(metrics['cache']['hits'], 1)
+        self.assertEqual(metrics['parse']['count'], 1)
+        self.assertEqual(metrics['routes']['POST /parse']['count'], 2)
+
+    def test_worker_reuses_universe(self):
+        async def test(svc):
+            await request(svc.port, 'POST', '/parse?format=json', self.data)
+            return await request(svc.port, 'POST', '/parse?format=csv',
+                self.data)
+        status, headers, body = self.run_service(test)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['X-Cache'], 'worker')
+        self.assertTrue(body.startswith(b'Time period,,class,'))
+
+    def test_ndjson(self):
+        async def test(svc):
+            return await request(svc.port, 'POST', '/parse?format=ndjson',
+                self.data)
+        status, headers, body = self.run_service(test)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(records[0]['name'], 'eFashion')
+
+    def test_errors(self):
+        async def test(svc):
+            return [(await request(svc.port, method, target, body))[0]
+                for method, target, body in [
+                    ('POST', '/parse', b'not a universe' * 10),
+                    ('POST', '/parse?format=pdf', self.data),
+                    ('GET', '/parse', b''),
+                    ('GET', '/missing', b''),
+                    ('GET', '/parse?path=eFashion.unv', b''),
+                    ('GET', '/health', b'')]]
+        self.assertEqual(self.run_service(test),
+            [422, 400, 405, 404, 403, 200])
+
+    def test_routes(self):
+        async def test(svc):
+            for target in ('/missing', '/admin.php', '/health'):
+                await request(svc.port, 'GET', target)
+            return json.loads((await request(svc.port, 'GET',
+                '/metrics'))[2].decode('utf-8'))['routes']
+        routes = self.run_service(test)
+        self.assertEqual(sorted(routes), ['GET /health', 'other'])
+        self.assertEqual(routes['other']['count'], 2)
+
+    def test_unparsable(self):
+        # a damaged class record fails an assertion in the Reader
+        damaged = bytearray(self.data)
+        damaged[65829:65833] = struct.pack('<I', 0x7fffffff)
+        async def test(svc):
+            return await request(svc.port, 'POST', '/parse', bytes(damaged))
+        self.assertEqual(self.run_service(test)[0], 422)
+
+    def test_broken_pool(self):
+        async def test(svc):
+            await svc.start(port=0)
+            try:
+                return (await request(svc.port, 'POST', '/parse?format=json',
+                    self.data))[0], svc.pool_restarts, svc.pools
+            finally:
+                svc.close()
+        status, restarts, pools = asyncio.run(test(RestartingService(
+            workers=2)))
+        self.assertEqual((status, restarts, len(pools)), (200, 1, 2))
+        self.assertTrue(pools[0].is_shut_down)
+        RestartingService.broken = True
+        try:
+            status, restarts, pools = asyncio.run(test(RestartingService(
+                workers=2)))
+        finally:
+            RestartingService.broken = False
+        self.assertEqual((status, restarts), (503, 2))
+
+    def test_paths(self):
+        async def test(svc):
+            return [(await request(svc.port, 'GET', target))[0]
+                for target in ['/parse?path=eFashion.unv',
+                    '/parse?path=../test_service.py',
+                    '/parse?path=missing.unv']]
+        self.assertEqual(self.run_service(test, root='tests/universes'),
+            [200, 403, 404])
+
+    def test_upload_limit(self):
+        async def test(svc):
+            return await request(svc.port, 'POST', '/parse', self.data)
+        self.assertEqual(self.run_service(test, max_upload=1024)[0], 413)
+
+    def test_back_pressure(self):
+        executor = BlockingExecutor()
+        async def test(svc):
+            first = asyncio.ensure_future(request(svc.port, 'POST',
+                '/parse?format=json', self.data))
+            while svc.in_flight == 0:
+                await asyncio.sleep(0.01)
+            rejected = await request(svc.port, 'POST', '/parse?format=csv',
+                self.data)
+            executor.release.set()
+            return rejected, await first
+        rejected, first = self.run_service(test, executor, workers=1,
+            max_queue=0)
+        self.assertEqual(rejected[0], 503)
+        self.assertEqual(rejected[1]['Retry-After'], '1')
+        self.assertEqual(first[0], 200)
+
+    def test_main_usage(self):
+        stderr = sys.stderr
+        sys.stderr = io.StringIO()
+        try:
+            statuses = [service.main(['service', option, 'many'])
+                for option in ('--workers', '--cache', '--queue', '--port')]
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(statuses, [2, 2, 2, 2])
+
+    def tearDown(self):
+        service._universes.clear()
+        super(UniverseServiceTests, self).tearDown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_sqlitewriter.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.reader import Reader
+from pyunv.sqlitewriter import SqliteWriter
+
+
+class SqliteWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        super(SqliteWriterTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'universes.db')
+        self.universes = {}
+        for name in ('eFashion', 'Univers5'):
+            with open('tests/universes/%s.unv' % name, 'rb') as f:
+                self.universes[name] = Reader(f).universe
+        self.writer = SqliteWriter(self.path)
+        for name, universe in sorted(self.universes.items()):
+            self.writer.add(universe, name)
+
+    def tearDown(self):
+        self.writer.close()
+        shutil.rmtree(self.directory)
+        super(SqliteWriterTests, self).tearDown()
+
+    def count(self, table, key):
+        return self.writer.connection.execute(
+            'SELECT count(*) FROM %s t JOIN universes u '
+            'ON u.id = t.universe_id WHERE u.key = ?' % table,
+            (key,)).fetchone()[0]
+
+    def test_counts(self):
+        for name, universe in self.universes.items():
+            statistics = universe.statistics
+            self.assertEqual(self.count('classes', name),
+                statistics['classes'])
+            self.assertEqual(self.count('objects', name),
+                statistics['objects'])
+            self.assertEqual(self.count('conditions', name),
+                statistics['conditions'])
+            self.assertEqual(self.count('joins', name), statistics['joins'])
+            self.assertEqual(self.count('contexts', name),
+                statistics['contexts'])
+            self.assertEqual(self.count('cross_references', name),
+                len(universe.cross_references))
+            self.assertEqual(self.count('parameters', name),
+                len(universe.custom_parameters))
+            self.assertEqual(self.count('sections', name),
+                len(universe.section_status))
+
+    def test_query(self):
+        rows = self.writer.connection.execute(
+            'SELECT DISTINCT t.name FROM objects o '
+            'JOIN cross_references r ON r.universe_id = o.universe_id '
+            'AND r.object_id = o.id '
+            'JOIN tables t ON t.universe_id = r.universe_id '
+            'AND t.id = r.table_id '
+            'JOIN universes u ON u.id = o.universe_id '
+            "WHERE u.key = 'eFashion' AND o.name = 'Name of manager'"
+            ).fetchall()
+        self.assertEqual(rows, [('Outlet_Lookup',)])
+        terms = self.writer.connection.execute(
+            'SELECT count(*) FROM join_terms').fetchone()[0]
+        self.assertEqual(terms, sum(len(j.terms)
+            for universe in self.universes.values() for j in universe.joins))
+
+    def test_replace(self):
+        objects = self.count('objects', 'eFashion')
+        self.writer.add(self.universes['eFashion'], 'eFashion')
+        self.assertEqual(self.count('objects', 'eFashion'), objects)
+        self.writer.remove('Univers5')
+        self.assertEqual(self.count('objects', 'Univers5'), 0)
+        self.assertEqual([row[0] for row in self.writer.connection.execute(
+            'SELECT key FROM universes')], ['eFashion'])
+
+    def test_indexes(self):
+        self.writer.close()
+        writer = SqliteWriter(self.path)
+        indexes = [row[0] for row in writer.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' "
+            "AND name NOT LIKE 'sqlite_%'")]
+        columns = [row[2] for row in writer.connection.execute(
+            "PRAGMA index_info(sections_status)")]
+        writer.close()
+        self.assertEqual(len(indexes), len(SqliteWriter._indexes))
+        self.assertEqual(columns, ['universe_id', 'status', 'name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
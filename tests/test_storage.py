@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_storage.py
+"""
+
+import io
+import os
+import sys
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.reader import Reader
+from pyunv.storage import EmbeddedStorage
+
+
+class EmbeddedStorageTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(EmbeddedStorageTests, self).setUp()
+        self.filename = 'tests/universes/Univers5.unv'
+        with open(self.filename, 'rb') as f:
+            self.data = f.read()
+        self.storage = EmbeddedStorage.find(self.data)
+    
+    def test_entries_match_zipfile(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.data))
+        for name in self.storage.names():
+            self.assertEqual(bytes(self.storage.read(name)), 
+                archive.read(name))
+    
+    def test_folder(self):
+        folder = self.storage.folder('UNW_Storage')
+        self.assertTrue('Connection/Connection' in folder)
+        self.assertIsNone(folder.read('Missing/Missing'))
+        self.assertIsNone(self.storage.folder('Missing'))
+    
+    def test_not_a_zip(self):
+        self.assertIsNone(EmbeddedStorage.find(b'not a universe'))
+    
+    def test_reader(self):
+        universe = Reader(open(self.filename, 'rb')).universe
+        self.assertEqual(universe.unw_connection_info['database_engine'], 
+            'MS SQL Server 2019')
+        self.assertEqual(universe.resource_descriptor['universe_name'], 
+            'Univers5')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_validation.py
+"""
+
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.reader import Reader
+from pyunv.validation import ValidationEngine, ValidationIndex, ValidationRule
+from pyunv.validation import ALL_RULES, HiddenReferenceRule
+
+
+class CountingRule(ValidationRule):
+    
+    name = 'counting'
+    
+    def begin(self, index):
+        self.objects = 0
+    
+    def check_object(self, obj, index):
+        self.objects += 1
+
+
+class ValidationEngineTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(ValidationEngineTests, self).setUp()
+        self.filename = 'tests/universes/universe_xir2.unv'
+        self.universe = Reader(open(self.filename, 'rb')).universe
+    
+    def test_default_rules_timed(self):
+        self.assertEqual(list(self.universe.validation_timings)[:2], 
+            ['broken_reference', 'orphaned_object'])
+    
+    def test_all_rules(self):
+        engine = ValidationEngine(ALL_RULES)
+        errors = engine.run(self.universe)
+        unused = sorted(e['table_name'] for e in errors 
+            if e['type'] == 'unused_table')
+        self.assertEqual(unused, ['CheapItems', 'ExpensiveItems'])
+        joins = sorted(e['join_id'] for e in errors 
+            if e['type'] == 'join_not_in_context')
+        self.assertEqual(joins, [13, 18, 19])
+        self.assertEqual(set(engine.timings), 
+            set([r.name for r in ALL_RULES] + ['(index)']))
+    
+    def test_single_pass(self):
+        rule = CountingRule()
+        ValidationEngine([rule]).run(self.universe)
+        self.assertEqual(rule.objects, self.universe.statistics['objects'])
+
+
+
+class HiddenReferenceTests(unittest.TestCase):
+    
+    def setUp(self):
+        super(HiddenReferenceTests, self).setUp()
+        self.reader = Reader.from_path('tests/universes/eFashion.unv')
+        self.universe = self.reader.universe
+    
+    def test_hidden_items(self):
+        self.assertEqual(self.universe.unw_hidden_items, {'classes': [],
+            'objects': [], 'conditions': [15, 16], 'other': []})
+        index = ValidationIndex(self.universe)
+        self.assertEqual(index.hidden_conditions, set([15, 16]))
+        self.assertEqual(index.hidden_objects, set())
+        self.assertEqual(ValidationEngine([HiddenReferenceRule]).run(
+            self.universe), [])
+    
+    def test_hidden_object(self):
+        # 'Sold at (unit price)' (323) uses objects 147 and 148
+        self.universe.unw_hidden_items = self.reader._extract_hidden_items(
+            struct.pack('<5I', 0, 1, 147, 0, 0))
+        errors = ValidationEngine([HiddenReferenceRule]).run(self.universe)
+        self.assertEqual([(e['object_id'], e['hidden_object_id'])
+            for e in errors], [(323, 147)])
+
+
+if __name__ == '__main__':
+    unittest.main()
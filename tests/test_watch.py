@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_watch.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyunv.watch import InotifySource, UniverseWatcher, write_documents
+
+
+class UniverseWatcherTests(unittest.TestCase):
+
+    inotify = False
+
+    def setUp(self):
+        super(UniverseWatcherTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, 'sales'))
+        self.filename = os.path.join(self.root, 'sales', 'eFashion.unv')
+        shutil.copy('tests/universes/eFashion.unv', self.filename)
+        self.documented = []
+        self.watcher = UniverseWatcher(self.root, self.document, debounce=0,
+            interval=0.01, inotify=self.inotify)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.root)
+        super(UniverseWatcherTests, self).tearDown()
+
+    def document(self, filename, universe):
+        self.documented.append(filename)
+        write_documents(filename, universe)
+
+    def rewrite(self, source=None, offset=None):
+        with open(source or self.filename, 'rb') as f:
+            data = bytearray(f.read())
+        if offset is not None:
+            data[offset] ^= 0xff
+        with open(self.filename, 'wb') as f:
+            f.write(data)
+        stat = os.stat(self.filename)
+        os.utime(self.filename, ns=(stat.st_atime_ns,
+            stat.st_mtime_ns + 10 ** 9))
+
+    def wait(self, seconds=2.0):
+        deadline = time.monotonic() + seconds
+        documented = []
+        while not documented and time.monotonic() < deadline:
+            documented = self.watcher.step(0.05)
+        return documented
+
+    def test_scan(self):
+        self.watcher.scan()
+        self.assertEqual(self.documented, [self.filename])
+        self.assertTrue(os.path.exists(self.filename + '.txt'))
+        self.assertTrue(os.path.exists(self.filename + '.csv'))
+        again = UniverseWatcher(self.root, self.document, inotify=False)
+        again.scan()
+        self.assertEqual(self.documented, [self.filename])
+
+    def test_unchanged_content(self):
+        self.watcher.scan()
+        self.rewrite()
+        self.assertEqual(self.wait(0.5), [])
+        self.assertEqual(self.watcher.skipped, 1)
+
+    def test_unchanged_sections(self):
+        # the bytes in front of the embedded zip are not part of any section
+        self.watcher.scan()
+        digest = self.watcher.states[self.filename]['digest']
+        self.rewrite(offset=2)
+        self.assertEqual(self.wait(0.5), [])
+        self.assertNotEqual(self.watcher.states[self.filename]['digest'],
+            digest)
+        self.assertEqual(self.watcher.skipped, 1)
+
+    def test_changed(self):
+        self.watcher.scan()
+        self.rewrite('tests/universes/Univers5.unv')
+        self.assertEqual(self.wait(), [self.filename])
+        with open(self.filename + '.txt') as f:
+            self.assertTrue('Univers5' in f.read())
+
+    def test_new_directory(self):
+        self.watcher.scan()
+        os.mkdir(os.path.join(self.root, 'finance'))
+        filename = os.path.join(self.root, 'finance', 'Univers5.unv')
+        shutil.copy('tests/universes/Univers5.unv', filename)
+        self.assertEqual(self.wait(), [filename])
+
+
+@unittest.skipUnless(InotifySource.load(), 'inotify is not available')
+class InotifyWatcherTests(UniverseWatcherTests):
+
+    inotify = True
+
+
+if __name__ == '__main__':
+    unittest.main()